@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+import redis.asyncio as aioredis
+from fastapi import Response
+from prometheus_client import Counter
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+USE_REDIS_CACHE = os.getenv("USE_REDIS_CACHE", "false").lower() == "true"
+# Share the data version through Redis so bumps from the Celery workers reach
+# every API process. On whenever REDIS_URL is configured (and always with
+# USE_REDIS_CACHE); without it only bumps made in the same process invalidate.
+USE_REDIS_VERSION = USE_REDIS_CACHE or os.getenv(
+    "USE_REDIS_VERSION", "true" if "REDIS_URL" in os.environ else "false"
+).lower() == "true"
+
+CACHE_TTL_SECONDS = float(os.getenv("API_CACHE_TTL", 60))
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", 1024))
+# How often the API re-reads the shared data version from Redis
+VERSION_POLL_SECONDS = float(os.getenv("API_CACHE_VERSION_POLL", 1))
+
+VERSION_KEY = "n8n_pop:data_version"
+KEY_PREFIX = "n8n_pop:cache:"
+
+CACHE_HITS = Counter('api_cache_hits_total', 'Response cache hits', ['tier'])
+CACHE_MISSES = Counter('api_cache_misses_total', 'Response cache misses', ['tier'])
+CACHE_EVICTIONS = Counter('api_cache_evictions_total', 'Response cache evictions', ['reason'])
+
+logger = logging.getLogger(__name__)
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    headers: Dict[str, str]
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            CACHE_EVICTIONS.labels(reason="expired").inc()
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            CACHE_EVICTIONS.labels(reason="capacity").inc()
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class ResponseCache:
+    """Two tier response cache keyed by data version and normalized params.
+
+    Writers bump the data version after committing (see bump_data_version),
+    which makes every existing key unreachable; stale entries then age out
+    of the LRU. With ``shared_version`` the version is read from Redis (at
+    most every VERSION_POLL_SECONDS), so writes from other processes
+    invalidate too; otherwise only the in-process TTL bounds their
+    staleness. ``use_redis`` adds Redis as a second cache tier.
+    """
+
+    def __init__(self, local: TTLCache = None, use_redis: bool = USE_REDIS_CACHE,
+                 shared_version: bool = USE_REDIS_VERSION):
+        self.local = local or TTLCache()
+        self.use_redis = use_redis
+        self.shared_version = use_redis or shared_version
+        self._redis = None
+        self._version = 0
+        self._version_checked_at = 0.0
+
+    def _client(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(REDIS_URL)
+        return self._redis
+
+    async def version(self) -> int:
+        if not self.shared_version:
+            return self._version
+        now = time.monotonic()
+        if now - self._version_checked_at >= VERSION_POLL_SECONDS:
+            try:
+                self._version = int(await self._client().get(VERSION_KEY) or 0)
+                self._version_checked_at = now
+            except Exception as e:
+                logger.warning(f"Could not read cache version from Redis: {e}")
+        return self._version
+
+    def bump_local(self):
+        self._version += 1
+        self._version_checked_at = 0.0
+
+    async def key(self, route: str, params: Dict[str, Any]) -> str:
+        return make_key(route, params, await self.version())
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        value = self.local.get(key)
+        if value is not None:
+            CACHE_HITS.labels(tier="local").inc()
+            return value
+        CACHE_MISSES.labels(tier="local").inc()
+
+        if not self.use_redis:
+            return None
+        try:
+            raw = await self._client().get(KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"Redis cache read failed: {e}")
+            return None
+        if raw is None:
+            CACHE_MISSES.labels(tier="redis").inc()
+            return None
+
+        CACHE_HITS.labels(tier="redis").inc()
+        payload = json.loads(raw)
+        value = CachedResponse(payload["body"].encode(), payload["headers"])
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: CachedResponse):
+        self.local.set(key, value)
+        if not self.use_redis:
+            return
+        payload = json.dumps({"body": value.body.decode(), "headers": value.headers})
+        try:
+            await self._client().set(KEY_PREFIX + key, payload, ex=int(self.local.ttl) or None)
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {e}")
+
+def make_key(route: str, params: Dict[str, Any], version: int) -> str:
+    # None and "" mean "not given", they must not produce a different key than omitting it
+    normalized = {k: v for k, v in params.items() if v is not None and v != ""}
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{route}:{version}:{digest}"
+
+response_cache = ResponseCache()
+
+async def bump_data_version():
+    """Invalidate cached responses, called by writers after they commit."""
+    response_cache.bump_local()
+    if not response_cache.shared_version:
+        return
+    # Short lived client: writers run on whatever event loop the caller owns
+    client = aioredis.from_url(REDIS_URL)
+    try:
+        await client.incr(VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Could not bump cache version: {e}")
+    finally:
+        await client.aclose()
+
+async def cached_response(
+    route: str,
+    params: Dict[str, Any],
+    build: Callable[[], Awaitable[CachedResponse]],
+    media_type: str = "application/json",
+) -> Response:
+    key = await response_cache.key(route, params)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return Response(cached.body, media_type=media_type, headers={**cached.headers, "X-Cache": "HIT"})
+
+    fresh = await build()
+    await response_cache.set(key, fresh)
+    return Response(fresh.body, media_type=media_type, headers={**fresh.headers, "X-Cache": "MISS"})
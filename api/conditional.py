@@ -0,0 +1,111 @@
+import os
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from api.cache import CachedResponse, cached_response
+from api.db.models import IngestWatermark, Workflow
+from ingest.history import COMPACTION_STAMP_SOURCE
+from ingest.leaderboards import STAMP_SOURCE
+
+# Cache-Control max-age per route; data only changes when an ingest run commits
+CACHE_MAX_AGE = {
+    "workflows": int(os.getenv("CACHE_MAX_AGE_LIST", 60)),
+    "search": int(os.getenv("CACHE_MAX_AGE_SEARCH", 60)),
+    "trending": int(os.getenv("CACHE_MAX_AGE_LIST", 60)),
+    "stats": int(os.getenv("CACHE_MAX_AGE_LIST", 60)),
+    "workflow": int(os.getenv("CACHE_MAX_AGE_DETAIL", 300)),
+    "history": int(os.getenv("CACHE_MAX_AGE_DETAIL", 300)),
+    "clusters": int(os.getenv("CACHE_MAX_AGE_LIST", 60)),
+    "cluster": int(os.getenv("CACHE_MAX_AGE_DETAIL", 300)),
+    "leaderboards": int(os.getenv("CACHE_MAX_AGE_LEADERBOARDS", 300)),
+}
+DEFAULT_MAX_AGE = 60
+
+async def table_stamp(db) -> Optional[datetime]:
+    """When any workflow last changed; an index-only lookup on idx_updated_at."""
+    return await db.scalar(select(func.max(Workflow.updated_at)))
+
+async def row_stamp(db, id: int) -> Optional[datetime]:
+    return await db.scalar(select(Workflow.updated_at).where(Workflow.id == id))
+
+async def history_stamp(db, id: int) -> Optional[datetime]:
+    """The row's updated_at, or the last snapshot compaction if that is newer.
+
+    Compaction deletes snapshots without touching the workflow row. None when
+    the workflow does not exist.
+    """
+    compacted = select(IngestWatermark.high_water).where(
+        IngestWatermark.source == COMPACTION_STAMP_SOURCE
+    ).scalar_subquery()
+    # greatest() skips NULLs, so a never compacted table falls back to updated_at
+    return await db.scalar(select(func.greatest(Workflow.updated_at, compacted)).where(Workflow.id == id))
+
+async def leaderboards_stamp(db) -> Optional[datetime]:
+    return await db.scalar(select(IngestWatermark.high_water).where(IngestWatermark.source == STAMP_SOURCE))
+
+def make_etag(route: str, params: Dict[str, Any], stamp: Optional[datetime]) -> str:
+    normalized = sorted((k, str(v)) for k, v in params.items() if v is not None and v != "")
+    version = stamp.isoformat() if stamp else "empty"
+    digest = hashlib.sha1(f"{route}|{normalized}|{version}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, W/ prefixes are ignored
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+def _http_date(stamp: datetime) -> str:
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return format_datetime(stamp.astimezone(timezone.utc), usegmt=True)
+
+def is_not_modified(request: Request, etag: str, stamp: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    # If-Modified-Since only counts when If-None-Match is absent
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and stamp is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        stamp = stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)
+        return stamp.replace(microsecond=0) <= since
+    return False
+
+async def conditional_response(
+    request: Request,
+    route: str,
+    params: Dict[str, Any],
+    stamp: Optional[datetime],
+    build: Callable[[], Awaitable[CachedResponse]],
+) -> Response:
+    """cached_response with ETag/Last-Modified validators and Cache-Control.
+
+    The validators derive from ``stamp`` (when the underlying data last
+    changed), so a matching If-None-Match or If-Modified-Since is answered
+    with 304 before the query or serialization runs.
+    """
+    headers = {
+        "ETag": make_etag(route, params, stamp),
+        "Cache-Control": f"public, max-age={CACHE_MAX_AGE.get(route, DEFAULT_MAX_AGE)}",
+    }
+    if stamp is not None:
+        headers["Last-Modified"] = _http_date(stamp)
+
+    # Without a stamp there is nothing to validate against (a missing row, so
+    # "If-None-Match: *" must not match); build runs and returns the 404
+    if stamp is not None and is_not_modified(request, headers["ETag"], stamp):
+        return Response(status_code=304, headers=headers)
+
+    # The stamp is part of the cache key too, so a body is never served under
+    # a newer ETag than the data it was built from
+    response = await cached_response(route, {**params, "_stamp": stamp}, build)
+    response.headers.update(headers)
+    return response
@@ -0,0 +1,84 @@
+"""Additive upgrades for databases created by an older release.
+
+Base.metadata.create_all only creates missing tables, it never alters an
+existing one. ensure_schema adds the columns and indexes introduced since,
+so a deployed database picks them up at startup. migrations/schema.sql
+describes a fresh database.
+"""
+import logging
+from typing import Dict, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateColumn, CreateIndex
+from .base import Base
+
+logger = logging.getLogger(__name__)
+
+_dialect = postgresql.dialect()
+
+# Indexes whose definition changed under the same name, mapped to a fragment
+# only the current definition has; an older one is dropped and rebuilt
+REDEFINED_INDEXES = {
+    # Keyset pagination needs the id tiebreaker
+    "idx_score": "id DESC",
+}
+
+# Indexes of older releases that nothing queries anymore
+DROPPED_INDEXES = [
+    # Superseded by idx_search_vector on the stored tsvector
+    "idx_normalized_title_gin",
+]
+
+def add_column_sql(column) -> str:
+    ddl = f"ALTER TABLE {column.table.name} ADD COLUMN IF NOT EXISTS {CreateColumn(column).compile(dialect=_dialect)}"
+    for fk in column.foreign_keys:
+        ddl += f" REFERENCES {fk.column.table.name} ({fk.column.name})"
+        if fk.ondelete:
+            ddl += f" ON DELETE {fk.ondelete}"
+    return ddl
+
+def schema_upgrades(columns: Dict[Tuple[str, str], bool], indexes: Dict[str, str]) -> List[str]:
+    """DDL bringing the database up to Base.metadata.
+
+    ``columns`` maps (table, column) to whether the column is nullable and
+    ``indexes`` maps index names to their definition, both as found in the
+    database. Returns nothing when it is up to date.
+    """
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            nullable = columns.get((table.name, column.name))
+            if nullable is None:
+                statements.append(add_column_sql(column))
+            elif nullable and not column.nullable and column.server_default is not None:
+                # Columns that used to be optional, backfill with the default first
+                statements.append(f"UPDATE {table.name} SET {column.name} = DEFAULT WHERE {column.name} IS NULL")
+                statements.append(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} SET NOT NULL")
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            definition = indexes.get(index.name)
+            marker = REDEFINED_INDEXES.get(index.name)
+            if definition is not None and marker and marker not in definition:
+                statements.append(f"DROP INDEX {index.name}")
+                definition = None
+            if definition is None:
+                statements.append(str(CreateIndex(index, if_not_exists=True).compile(dialect=_dialect)))
+    statements.extend(f"DROP INDEX {name}" for name in DROPPED_INDEXES if name in indexes)
+    return statements
+
+async def ensure_schema(conn):
+    """Apply schema_upgrades, after create_all. Index builds on a large table
+    block its writes while they run."""
+    # The API replicas all run this on startup
+    await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": "ensure_schema"})
+    result = await conn.execute(text(
+        "SELECT table_name, column_name, is_nullable = 'YES' FROM information_schema.columns "
+        "WHERE table_schema = current_schema()"
+    ))
+    columns = {(table, column): nullable for table, column, nullable in result.all()}
+    result = await conn.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema()"
+    ))
+    indexes = dict(result.all())
+    for statement in schema_upgrades(columns, indexes):
+        logger.info(f"Schema upgrade: {statement}")
+        await conn.execute(text(statement))
@@ -1,8 +1,17 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Numeric, Index, UniqueConstraint
-from sqlalchemy.dialects.postgresql import JSONB, ARRAY
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, JSON, Numeric, Float, Index, UniqueConstraint, ForeignKey, Computed, cast, literal_column
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from .base import Base
 
+def metric_value(metrics, name: str):
+    """``(metrics->>'name')::float``, the exact form the metric expression indexes use.
+
+    The key is inlined rather than bound: a bind parameter would not match
+    the index expression in generic (prepared) plans.
+    """
+    return cast(metrics.op("->>")(literal_column(f"'{name}'")), Float)
+
 class Workflow(Base):
     __tablename__ = "workflows"
 
@@ -13,22 +22,103 @@ class Workflow(Base):
     workflow = Column(Text, nullable=False)
     normalized_title = Column(Text, nullable=True)
     country = Column(String(32), nullable=True)
+    canonical_id = Column(Integer, ForeignKey("canonical_workflows.id", ondelete="SET NULL"), nullable=True)
     popularity_metrics = Column(JSONB, nullable=False)
     latest_metrics = Column(JSONB, nullable=True)
-    score = Column(Numeric, default=0)
+    score = Column(Numeric, nullable=False, default=0, server_default="0")
+
+    # Velocity, maintained by the upsert from the previous and latest observation
+    previous_metrics = Column(JSONB, nullable=True)
+    metrics_observed_at = Column(DateTime(timezone=True), nullable=True)
+    views_per_hour = Column(Float, nullable=False, default=0, server_default="0")
+    likes_per_hour = Column(Float, nullable=False, default=0, server_default="0")
+    comments_per_hour = Column(Float, nullable=False, default=0, server_default="0")
+    trending_score = Column(Float, nullable=False, default=0, server_default="0")
     
     first_seen = Column(DateTime(timezone=True), server_default=func.now())
-    last_seen = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     inserted_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
+    # Deprecated: no longer written, metric history lives in workflow_metric_snapshots
     raw_snapshots = Column(ARRAY(JSONB), nullable=True)
 
+    # Stored so full-text queries don't recompute to_tsvector per row
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed("to_tsvector('english', coalesce(normalized_title, ''))", persisted=True),
+    ))
+
     __table_args__ = (
         UniqueConstraint('platform', 'source_id', name='uq_platform_source_id'),
         Index('idx_platform_country', 'platform', 'country'),
-        Index('idx_score', score.desc()),
-        # Note: GIN index for text search usually requires raw SQL DDL or specific dialect usage.
-        # We will add it via migration or raw SQL if needed, but for now we stick to standard core.
-        # Index('idx_normalized_title_gin', 'normalized_title', postgresql_using='gin') 
+        # Keyset pagination indexes: (sort column, id) with and without the filters
+        Index('idx_score', score.desc(), id.desc()),
+        Index('idx_last_seen', last_seen.desc(), id.desc()),
+        Index('idx_platform_country_score', 'platform', 'country', score.desc(), id.desc()),
+        Index('idx_platform_country_last_seen', 'platform', 'country', last_seen.desc(), id.desc()),
+        Index('idx_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('idx_canonical_id', 'canonical_id'),
+        Index('idx_trending_score', trending_score.desc(), id.desc()),
+        # max(updated_at) stamps ETags and Last-Modified
+        Index('idx_updated_at', updated_at),
+        # /workflows/stats aggregates and filters; queries must use metric_value to match
+        Index('idx_latest_views', metric_value(latest_metrics, 'views')),
+        Index('idx_latest_likes', metric_value(latest_metrics, 'likes')),
+        Index('idx_latest_like_ratio', metric_value(latest_metrics, 'like_to_view_ratio')),
+    )
+
+class WorkflowMetricSnapshot(Base):
+    """Append-only metric history, one row per workflow per observation.
+
+    Range partitioned by month on collected_at; partitions are created and
+    dropped by ingest.history.
+    """
+    __tablename__ = "workflow_metric_snapshots"
+
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"), primary_key=True)
+    collected_at = Column(DateTime(timezone=True), primary_key=True)
+    metrics = Column(JSONB, nullable=False)
+
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (collected_at)"},
+    )
+
+class IngestWatermark(Base):
+    """Per-source high-water mark for incremental fetching."""
+    __tablename__ = "ingest_watermarks"
+
+    source = Column(String(64), primary_key=True)
+    high_water = Column(DateTime(timezone=True), nullable=True)
+    last_id = Column(Integer, nullable=True)
+    # Validators of the last full response, for conditional requests
+    etag = Column(Text, nullable=True)
+    last_modified = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class CanonicalWorkflow(Base):
+    """A cluster of near-duplicate workflows across platforms.
+
+    title is the token key shared by the members (see ingest.clustering),
+    the totals are maintained incrementally as members are upserted.
+    """
+    __tablename__ = "canonical_workflows"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(Text, nullable=False)
+    member_count = Column(Integer, nullable=False, server_default="0")
+    platforms = Column(ARRAY(String(32)), nullable=True)
+    total_views = Column(BigInteger, nullable=False, server_default="0")
+    total_likes = Column(BigInteger, nullable=False, server_default="0")
+    total_comments = Column(BigInteger, nullable=False, server_default="0")
+    total_score = Column(Numeric, nullable=False, server_default="0")
+    max_score = Column(Numeric, nullable=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('title', name='uq_canonical_title'),
+        # Needs the pg_trgm extension
+        Index('idx_canonical_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('idx_canonical_total_score', total_score.desc(), id.desc()),
     )
@@ -0,0 +1,93 @@
+import os
+import io
+import csv
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Optional, Sequence
+
+from sqlalchemy import select
+
+from api.db.base import ReadSessionLocal
+from api.db.models import Workflow
+from api.ndjson import NDJSON_MEDIA_TYPE
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 5000))
+
+# WorkflowRead's stored fields (not collected_at, which is input only) plus
+# latest_metrics for bulk consumers; read as plain columns so no ORM objects are built
+EXPORT_COLUMNS = (
+    Workflow.id,
+    Workflow.platform,
+    Workflow.source_id,
+    Workflow.source_url,
+    Workflow.workflow,
+    Workflow.normalized_title,
+    Workflow.country,
+    Workflow.popularity_metrics,
+    Workflow.latest_metrics,
+    Workflow.canonical_id,
+    Workflow.score,
+    Workflow.first_seen,
+    Workflow.last_seen,
+    Workflow.inserted_at,
+    Workflow.updated_at,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": NDJSON_MEDIA_TYPE,
+    "csv": "text/csv",
+}
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _csv_value(value: Any):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def encode_ndjson(rows: Sequence[Sequence[Any]]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_default, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+def encode_csv(rows: Sequence[Sequence[Any]], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+def export_stmt(platform: Optional[str] = None, country: Optional[str] = None):
+    stmt = select(*EXPORT_COLUMNS)
+    if platform:
+        stmt = stmt.where(Workflow.platform == platform)
+    if country:
+        stmt = stmt.where(Workflow.country == country)
+    return stmt.order_by(Workflow.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+async def stream_export(stmt, fmt: str) -> AsyncIterator[bytes]:
+    """Encode the result of ``stmt`` one server-side cursor batch at a time.
+
+    Opens its own session: the response body is produced after the request
+    dependencies have been torn down.
+    """
+    if fmt == "csv":
+        yield encode_csv([], header=True)
+    async with ReadSessionLocal() as session:
+        result = await session.stream(stmt)
+        async for rows in result.partitions():
+            yield encode_csv(rows) if fmt == "csv" else encode_ndjson(rows)
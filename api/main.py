@@ -1,71 +1,522 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Header
+import os
+import json
+from fastapi import FastAPI, Depends, HTTPException, Query, Header, Response, Request
+from fastapi.responses import StreamingResponse
+from fastapi.exceptions import RequestValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, tuple_, func, cast, Float, text, or_
 from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 
-from api.db.base import get_db, engine, Base
-from api.db.models import Workflow
-from api.models.schemas import WorkflowCreate, WorkflowRead
-from ingest.tasks import upsert_workflows
+from api.db.base import get_read_db, engine, Base, dispose_engines
+from api.db.migrate import ensure_schema
+from api.db.models import Workflow, WorkflowMetricSnapshot, CanonicalWorkflow
+from api.models.schemas import (
+    WorkflowCreate, WorkflowRead, WorkflowSearchResult, WorkflowTrending, MetricSnapshotRead, ClusterRead, ClusterDetail,
+    LeaderboardEntry, WorkflowBatchGet, WorkflowBatchItem, WorkflowStats,
+)
+from api.pagination import MAX_PAGE_SIZE, InvalidCursor, encode_cursor, decode_cursor
+from api.cache import CachedResponse
+from api.conditional import conditional_response, table_stamp, row_stamp, history_stamp, leaderboards_stamp
+from api.ndjson import NDJSON_CONTENT_TYPES, iter_lines
+from api.projection import InvalidFields, LIST_FIELDS, VELOCITY_COLUMNS, parse_fields, list_columns, dump_rows
+from api.export import EXPORT_MEDIA_TYPES, export_stmt, stream_export
+from api.stats import STATS_BUCKETS, build_stats, stats_stmt
+from pydantic import TypeAdapter, ValidationError
+from ingest.tasks import upsert_workflows, USE_OPENSEARCH
+from ingest.search import search_workflows
+from ingest.history import ensure_partitions
+from ingest.leaderboards import ALL, LEADERBOARD_SIZE, ensure_leaderboards, leaderboards
 from prometheus_client import make_asgi_app
+from ingest.metrics import metrics_registry
+from api.metrics import observe_request
 
 app = FastAPI(title="n8n Workflow Popularity API")
 
 # Expose Prometheus metrics
-metrics_app = make_asgi_app()
+metrics_app = make_asgi_app(registry=metrics_registry())
 app.mount("/metrics", metrics_app)
+app.middleware("http")(observe_request)
 
 @app.on_event("startup")
 async def startup():
     # In production, use Alembic. For quick MVP dev, we can create tables.
     async with engine.begin() as conn:
+        # Trigram index on canonical_workflows.title
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
+        # create_all leaves existing tables alone, add what older releases lack
+        await ensure_schema(conn)
+        await ensure_partitions(conn)
+        await ensure_leaderboards(conn)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await dispose_engines()
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
-@app.post("/workflows/import")
+# Rows per upsert_workflows call when streaming NDJSON
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+# Per-line errors echoed back, the rest are only counted
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+WorkflowCreateList = TypeAdapter(List[WorkflowCreate])
+
+IMPORT_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": WorkflowCreate.model_json_schema()}},
+            "application/x-ndjson": {
+                "schema": {"type": "string", "description": "One WorkflowCreate JSON object per line"}
+            },
+        },
+    }
+}
+
+@app.post("/workflows/import", openapi_extra=IMPORT_OPENAPI)
 async def import_workflows(
-    items: List[WorkflowCreate], 
-    db: AsyncSession = Depends(get_db),
+    request: Request,
     # token: str = Depends(...) # Auth placeholder
 ):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        return await _import_ndjson(request)
+
+    try:
+        items = WorkflowCreateList.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
     # Convert Pydantic models to dicts for the upsert logic
-    data = [item.dict() for item in items]
+    data = [item.model_dump() for item in items]
     await upsert_workflows(data)
     return {"inserted": len(items), "status": "processed"}
 
+async def _import_ndjson(request: Request):
+    # Validate line by line and upsert every IMPORT_CHUNK_SIZE rows, so memory
+    # stays flat regardless of upload size. Invalid lines are skipped and reported.
+    inserted = 0
+    failed = 0
+    errors = []
+    batch = []
+
+    line_no = 0
+    async for line in iter_lines(request.stream()):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            item = WorkflowCreate.model_validate_json(line)
+        except ValidationError as e:
+            failed += 1
+            if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({"line": line_no, "errors": json.loads(e.json(include_url=False, include_input=False))})
+            continue
+
+        batch.append(item.model_dump())
+        if len(batch) >= IMPORT_CHUNK_SIZE:
+            inserted += await upsert_workflows(batch)
+            batch = []
+
+    if batch:
+        inserted += await upsert_workflows(batch)
+
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+        "status": "processed",
+    }
+
+SORT_COLUMNS = {
+    "score": Workflow.score,
+    "last_seen": Workflow.last_seen,
+}
+
 @app.get("/workflows", response_model=List[WorkflowRead])
 async def get_workflows(
+    request: Request,
     platform: Optional[str] = None,
     country: Optional[str] = None,
     sort: str = "score",
-    limit: int = 50,
-    offset: int = 0,
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma separated sparse fieldset, e.g. id,workflow,score"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    stmt = select(Workflow)
+    # Keyset pagination: pass the X-Next-Cursor header of one page as
+    # ?cursor= to get the next one. offset is kept for older clients.
+    sort = "last_seen" if sort == "last_seen" else "score"
+    sort_column = SORT_COLUMNS[sort]
+
+    try:
+        selected = parse_fields(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Only the columns the response needs, the cursor always needs id and the sort column
+    stmt = select(*list_columns(selected, required=("id", sort)))
     
     if platform:
         stmt = stmt.where(Workflow.platform == platform)
     if country:
         stmt = stmt.where(Workflow.country == country)
-        
-    if sort == "last_seen":
-        stmt = stmt.order_by(desc(Workflow.last_seen))
+
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor, sort)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+        stmt = stmt.where(tuple_(sort_column, Workflow.id) < tuple_(value, last_id))
+        offset = None
     else:
-        stmt = stmt.order_by(desc(Workflow.score))
-        
-    stmt = stmt.limit(limit).offset(offset)
-    
+        stmt = stmt.offset(offset)
+
+    stmt = stmt.order_by(desc(sort_column), desc(Workflow.id)).limit(limit)
+
+    async def build():
+        result = await db.execute(stmt)
+        rows = result.all()
+
+        headers = {}
+        if len(rows) == limit:
+            last = rows[-1]
+            headers["X-Next-Cursor"] = encode_cursor(sort, getattr(last, sort), last.id)
+        return CachedResponse(dump_rows(rows, selected), headers)
+
+    params = {
+        "platform": platform, "country": country, "sort": sort, "limit": limit, "offset": offset,
+        "cursor": cursor, "fields": ",".join(selected) if fields else None,
+    }
+    return await conditional_response(request, "workflows", params, await table_stamp(db), build)
+
+SearchResultList = TypeAdapter(List[WorkflowSearchResult])
+
+def _search_rank(query):
+    # Text relevance weighted by popularity, same shape as the OpenSearch ranking
+    return func.ts_rank(Workflow.search_vector, query) * func.ln(2 + func.greatest(cast(Workflow.score, Float), 0))
+
+async def _search_postgres(db, q, platform, country, limit, after):
+    query = func.websearch_to_tsquery('english', q)
+    rank = _search_rank(query).label("rank")
+
+    stmt = select(Workflow, rank).where(Workflow.search_vector.op("@@")(query))
+    if platform:
+        stmt = stmt.where(Workflow.platform == platform)
+    if country:
+        stmt = stmt.where(Workflow.country == country)
+    if after:
+        stmt = stmt.where(tuple_(_search_rank(query), Workflow.id) < tuple_(after[0], after[1]))
+    stmt = stmt.order_by(desc(rank), desc(Workflow.id)).limit(limit)
+
     result = await db.execute(stmt)
-    return result.scalars().all()
+    return [(item, float(item_rank)) for item, item_rank in result.all()]
+
+async def _search_opensearch(db, q, platform, country, limit, after):
+    hits = await search_workflows(q, platform, country, limit, search_after=list(after) if after else None)
+    if not hits:
+        return []
+    result = await db.execute(select(Workflow).where(Workflow.id.in_([workflow_id for workflow_id, _ in hits])))
+    by_id = {item.id: item for item in result.scalars()}
+    # Keep OpenSearch's order, skip documents whose row no longer exists
+    return [(by_id[workflow_id], rank) for workflow_id, rank in hits if workflow_id in by_id]
+
+@app.get("/workflows/search", response_model=List[WorkflowSearchResult])
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    platform: Optional[str] = None,
+    country: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Postgres full-text search on the stored search_vector column, or
+    # OpenSearch when USE_OPENSEARCH is on. Paginate with X-Next-Cursor.
+    backend = "opensearch" if USE_OPENSEARCH else "postgres"
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, backend)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+    async def build():
+        run = _search_opensearch if USE_OPENSEARCH else _search_postgres
+        matches = await run(db, q, platform, country, limit, after)
+
+        headers = {}
+        if len(matches) == limit:
+            last, last_rank = matches[-1]
+            headers["X-Next-Cursor"] = encode_cursor(backend, last_rank, last.id)
+        results = [
+            WorkflowSearchResult.model_validate({**WorkflowRead.model_validate(item).model_dump(), "rank": rank})
+            for item, rank in matches
+        ]
+        return CachedResponse(SearchResultList.dump_json(results), headers)
+
+    params = {"q": q, "platform": platform, "country": country, "limit": limit, "cursor": cursor}
+    return await conditional_response(request, "search", params, await table_stamp(db), build)
+
+# Only rows observed this recently can trend, stale rows keep their last score
+TRENDING_WINDOW_HOURS = int(os.getenv("TRENDING_WINDOW_HOURS", 72))
+TRENDING_FIELDS = list(WorkflowTrending.model_fields)
+
+def trending_window_start(now: Optional[datetime] = None) -> datetime:
+    # Truncated to the hour so the window, and the ETag built from it, only
+    # moves once an hour
+    now = (now or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    return now - timedelta(hours=TRENDING_WINDOW_HOURS)
+
+@app.get("/workflows/trending", response_model=List[WorkflowTrending])
+async def get_trending(
+    request: Request,
+    platform: Optional[str] = None,
+    country: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Fastest growing workflows by trending_score, the decayed score growth
+    # rate maintained at ingest. Paginate with X-Next-Cursor.
+    window_start = trending_window_start()
+    stmt = select(
+        *list_columns(LIST_FIELDS),
+        *(column.label(name) for name, column in VELOCITY_COLUMNS.items()),
+    ).where(
+        Workflow.trending_score > 0,
+        Workflow.last_seen >= window_start,
+    )
+    if platform:
+        stmt = stmt.where(Workflow.platform == platform)
+    if country:
+        stmt = stmt.where(Workflow.country == country)
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor, "trending_score")
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+        stmt = stmt.where(tuple_(Workflow.trending_score, Workflow.id) < tuple_(value, last_id))
+    stmt = stmt.order_by(desc(Workflow.trending_score), desc(Workflow.id)).limit(limit)
+
+    async def build():
+        result = await db.execute(stmt)
+        rows = result.all()
+        headers = {}
+        if len(rows) == limit:
+            last = rows[-1]
+            headers["X-Next-Cursor"] = encode_cursor("trending_score", last.trending_score, last.id)
+        return CachedResponse(dump_rows(rows, TRENDING_FIELDS), headers)
+
+    params = {
+        "platform": platform, "country": country, "limit": limit, "cursor": cursor,
+        "window_start": window_start,
+    }
+    return await conditional_response(request, "trending", params, await table_stamp(db), build)
+
+@app.get("/workflows/stats", response_model=WorkflowStats)
+async def get_stats(
+    request: Request,
+    platform: Optional[str] = None,
+    country: Optional[str] = None,
+    bucket: str = Query("day", pattern=f"^({'|'.join(STATS_BUCKETS)})$", description="date_trunc unit for last_seen"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_views: Optional[float] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Facet counts and metric aggregates, computed in one GROUPING SETS query
+    # and cached until the next ingest changes the table stamp
+    stmt = stats_stmt(bucket, platform, country, since, until, min_views)
+
+    async def build():
+        result = await db.execute(stmt)
+        stats = WorkflowStats.model_validate(build_stats(result.all(), bucket))
+        return CachedResponse(stats.model_dump_json().encode(), {})
+
+    params = {
+        "platform": platform, "country": country, "bucket": bucket,
+        "since": since, "until": until, "min_views": min_views,
+    }
+    return await conditional_response(request, "stats", params, await table_stamp(db), build)
+
+@app.get("/workflows/export")
+async def export_workflows(
+    platform: Optional[str] = None,
+    country: Optional[str] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    # Full filtered dump in id order, streamed from a server-side cursor
+    return StreamingResponse(
+        stream_export(export_stmt(platform, country), format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="workflows.{format}"'},
+    )
+
+# Refs per batch_get request; ids and pairs share one statement's bind parameters
+BATCH_GET_MAX_REFS = int(os.getenv("BATCH_GET_MAX_REFS", 500))
+
+BatchItemList = TypeAdapter(List[WorkflowBatchItem])
+
+@app.post("/workflows/batch_get", response_model=List[WorkflowBatchItem])
+async def batch_get_workflows(body: WorkflowBatchGet, db: AsyncSession = Depends(get_read_db)):
+    # One query for the whole batch: ids hit the primary key, (platform, source_id)
+    # pairs hit uq_platform_source_id. Results follow the order of body.refs.
+    if len(body.refs) > BATCH_GET_MAX_REFS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_GET_MAX_REFS} refs per request")
+
+    ids = {ref.id for ref in body.refs if ref.id is not None}
+    pairs = {(ref.platform, ref.source_id) for ref in body.refs if ref.id is None}
+    conditions = []
+    if ids:
+        conditions.append(Workflow.id.in_(ids))
+    if pairs:
+        conditions.append(tuple_(Workflow.platform, Workflow.source_id).in_(pairs))
+
+    result = await db.execute(select(Workflow).where(or_(*conditions)))
+    by_id = {}
+    by_source = {}
+    for row in result.scalars():
+        by_id[row.id] = row
+        by_source[(row.platform, row.source_id)] = row
+
+    items = []
+    for ref in body.refs:
+        row = by_id.get(ref.id) if ref.id is not None else by_source.get((ref.platform, ref.source_id))
+        items.append(WorkflowBatchItem(
+            ref=ref, found=row is not None, workflow=WorkflowRead.model_validate(row) if row is not None else None,
+        ))
+    return Response(BatchItemList.dump_json(items), media_type="application/json")
 
 @app.get("/workflows/{id}", response_model=WorkflowRead)
-async def get_workflow(id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Workflow).where(Workflow.id == id))
-    item = result.scalar_one_or_none()
-    if not item:
+async def get_workflow(request: Request, id: int, db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        result = await db.execute(select(Workflow).where(Workflow.id == id))
+        item = result.scalar_one_or_none()
+        if not item:
+            raise HTTPException(status_code=404, detail="Workflow not found")
+        return CachedResponse(WorkflowRead.model_validate(item).model_dump_json().encode(), {})
+
+    return await conditional_response(request, "workflow", {"id": id}, await row_stamp(db, id), build)
+
+SnapshotList = TypeAdapter(List[MetricSnapshotRead])
+
+@app.get("/workflows/{id}/history", response_model=List[MetricSnapshotRead])
+async def get_workflow_history(
+    request: Request,
+    id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Most recent `limit` observations in the window, returned oldest first
+    stmt = select(WorkflowMetricSnapshot).where(WorkflowMetricSnapshot.workflow_id == id)
+    if since:
+        stmt = stmt.where(WorkflowMetricSnapshot.collected_at >= since)
+    if until:
+        stmt = stmt.where(WorkflowMetricSnapshot.collected_at < until)
+    stmt = stmt.order_by(desc(WorkflowMetricSnapshot.collected_at)).limit(limit)
+
+    # Snapshots are written in the same transaction that touches updated_at,
+    # compaction is folded in separately
+    stamp = await history_stamp(db, id)
+    if stamp is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return item
+
+    async def build():
+        result = await db.execute(stmt)
+        snapshots = list(reversed(result.scalars().all()))
+        return CachedResponse(SnapshotList.dump_json(SnapshotList.validate_python(snapshots, from_attributes=True)), {})
+
+    params = {"id": id, "since": since, "until": until, "limit": limit}
+    return await conditional_response(request, "history", params, stamp, build)
+
+ClusterList = TypeAdapter(List[ClusterRead])
+
+@app.get("/clusters", response_model=List[ClusterRead])
+async def get_clusters(
+    request: Request,
+    platform: Optional[str] = None,
+    min_members: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Canonical workflows by aggregated score across all their platforms
+    stmt = select(CanonicalWorkflow).where(CanonicalWorkflow.member_count >= min_members)
+    if platform:
+        stmt = stmt.where(CanonicalWorkflow.platforms.any(platform))
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor, "total_score")
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+        stmt = stmt.where(tuple_(CanonicalWorkflow.total_score, CanonicalWorkflow.id) < tuple_(value, last_id))
+    stmt = stmt.order_by(desc(CanonicalWorkflow.total_score), desc(CanonicalWorkflow.id)).limit(limit)
+
+    async def build():
+        result = await db.execute(stmt)
+        clusters = result.scalars().all()
+        headers = {}
+        if len(clusters) == limit:
+            last = clusters[-1]
+            headers["X-Next-Cursor"] = encode_cursor("total_score", last.total_score, last.id)
+        return CachedResponse(ClusterList.dump_json(ClusterList.validate_python(clusters, from_attributes=True)), headers)
+
+    params = {"platform": platform, "min_members": min_members, "limit": limit, "cursor": cursor}
+    return await conditional_response(request, "clusters", params, await table_stamp(db), build)
+
+@app.get("/clusters/{id}", response_model=ClusterDetail)
+async def get_cluster(request: Request, id: int, db: AsyncSession = Depends(get_read_db)):
+    async def build():
+        cluster = await db.get(CanonicalWorkflow, id)
+        if not cluster:
+            raise HTTPException(status_code=404, detail="Cluster not found")
+        result = await db.execute(
+            select(Workflow).where(Workflow.canonical_id == id).order_by(desc(Workflow.score), desc(Workflow.id))
+        )
+        detail = ClusterDetail.model_validate({
+            **ClusterRead.model_validate(cluster).model_dump(),
+            "members": [WorkflowRead.model_validate(m) for m in result.scalars()],
+        })
+        return CachedResponse(detail.model_dump_json().encode(), {})
+
+    return await conditional_response(request, "cluster", {"id": id}, await table_stamp(db), build)
+
+LeaderboardList = TypeAdapter(List[LeaderboardEntry])
+
+@app.get("/leaderboards", response_model=List[LeaderboardEntry])
+async def get_leaderboard(
+    request: Request,
+    platform: Optional[str] = None,
+    country: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=LEADERBOARD_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Top workflows by score from the precomputed workflow_leaderboards view,
+    # refreshed after every ingest run. Omitted filters mean all platforms/countries.
+    stmt = (
+        select(leaderboards)
+        .where(
+            leaderboards.c.scope_platform == (platform or ALL),
+            leaderboards.c.scope_country == (country or ALL),
+        )
+        .order_by(leaderboards.c.rank)
+        .limit(limit)
+    )
+
+    async def build():
+        result = await db.execute(stmt)
+        entries = LeaderboardList.validate_python(result.mappings().all())
+        return CachedResponse(LeaderboardList.dump_json(entries), {})
+
+    params = {"platform": platform, "country": country, "limit": limit}
+    return await conditional_response(request, "leaderboards", params, await leaderboards_stamp(db), build)
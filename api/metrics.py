@@ -0,0 +1,21 @@
+import time
+from fastapi import Request
+from ingest.metrics import HTTP_REQUEST_SECONDS
+
+def route_template(request: Request) -> str:
+    # The matched path template, so /workflows/1 and /workflows/2 share a series
+    route = request.scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+async def observe_request(request: Request, call_next):
+    """HTTP middleware recording request latency per route template."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method, route=route_template(request), status=str(status)
+        ).observe(time.perf_counter() - start)
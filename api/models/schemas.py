@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, Dict, List, Any
 from datetime import datetime
 
@@ -17,6 +17,7 @@ class WorkflowCreate(WorkflowBase):
 
 class WorkflowRead(WorkflowBase):
     id: int
+    canonical_id: Optional[int] = None
     score: Optional[float]
     first_seen: Optional[datetime]
     last_seen: Optional[datetime]
@@ -26,3 +27,97 @@ class WorkflowRead(WorkflowBase):
     class Config:
         orm_mode = True # Pydantic v1
         from_attributes = True # Pydantic v2 support
+
+class WorkflowSearchResult(WorkflowRead):
+    rank: float
+
+class WorkflowTrending(WorkflowRead):
+    views_per_hour: float
+    likes_per_hour: float
+    comments_per_hour: float
+    trending_score: float
+
+class WorkflowRef(BaseModel):
+    """A workflow by ``id``, or by ``platform`` and ``source_id``."""
+    id: Optional[int] = None
+    platform: Optional[str] = None
+    source_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _one_key(self):
+        by_source = self.platform is not None or self.source_id is not None
+        if (self.id is None) == (not by_source):
+            raise ValueError("give either id, or platform and source_id")
+        if by_source and (self.platform is None or self.source_id is None):
+            raise ValueError("platform and source_id go together")
+        return self
+
+class WorkflowBatchGet(BaseModel):
+    refs: List[WorkflowRef] = Field(..., min_length=1)
+
+class WorkflowBatchItem(BaseModel):
+    ref: WorkflowRef
+    found: bool
+    workflow: Optional[WorkflowRead] = None
+
+class MetricSnapshotRead(BaseModel):
+    collected_at: datetime
+    metrics: Dict[str, Any]
+
+    class Config:
+        from_attributes = True
+
+class ClusterRead(BaseModel):
+    id: int
+    title: str
+    member_count: int
+    platforms: Optional[List[str]] = None
+    total_views: int
+    total_likes: int
+    total_comments: int
+    total_score: float
+    max_score: float
+
+    class Config:
+        from_attributes = True
+
+class ClusterDetail(ClusterRead):
+    members: List[WorkflowRead]
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    workflow_id: int
+    platform: str
+    country: Optional[str] = None
+    workflow: str
+    source_url: Optional[str] = None
+    canonical_id: Optional[int] = None
+    score: float
+    last_seen: datetime
+
+    class Config:
+        from_attributes = True
+
+class StatsAggregate(BaseModel):
+    count: int
+    total_views: int
+    total_likes: int
+    avg_like_to_view_ratio: Optional[float] = None
+
+class PlatformStats(StatsAggregate):
+    platform: str
+
+class CountryStats(StatsAggregate):
+    country: Optional[str] = None
+
+class StatsGroup(StatsAggregate):
+    platform: str
+    country: Optional[str] = None
+    bucket: datetime
+
+class WorkflowStats(BaseModel):
+    bucket: str
+    totals: StatsAggregate
+    platforms: List[PlatformStats]
+    countries: List[CountryStats]
+    groups: List[StatsGroup]
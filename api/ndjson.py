@@ -0,0 +1,17 @@
+from typing import AsyncIterable, AsyncIterator
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CONTENT_TYPES = {NDJSON_MEDIA_TYPE, "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without holding more than one line."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        if b"\n" not in chunk:
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
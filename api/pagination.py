@@ -0,0 +1,43 @@
+import os
+import json
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Tuple
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+
+class InvalidCursor(ValueError):
+    pass
+
+def _dump_value(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _load_value(sort: str, value: Any):
+    if sort == "last_seen":
+        return datetime.fromisoformat(value)
+    if sort in ("score", "total_score"):
+        return Decimal(value)
+    return float(value)
+
+def encode_cursor(sort: str, value: Any, id: int) -> str:
+    """Opaque keyset cursor pointing just past the row ``(value, id)``."""
+    payload = json.dumps([sort, _dump_value(value), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort:
+            raise InvalidCursor(f"Cursor was issued for sort={cursor_sort}")
+        return _load_value(sort, value), int(id)
+    except InvalidCursor:
+        raise
+    except (binascii.Error, ValueError, TypeError, InvalidOperation) as e:
+        raise InvalidCursor("Malformed cursor") from e
@@ -0,0 +1,70 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+import orjson
+
+from api.db.models import Workflow
+from api.models.schemas import WorkflowRead
+
+# Columns behind each WorkflowRead field. collected_at is an input-only field
+# with no column, it is always null on reads.
+LIST_COLUMNS = {
+    "id": Workflow.id,
+    "platform": Workflow.platform,
+    "source_id": Workflow.source_id,
+    "source_url": Workflow.source_url,
+    "workflow": Workflow.workflow,
+    "normalized_title": Workflow.normalized_title,
+    "country": Workflow.country,
+    "popularity_metrics": Workflow.popularity_metrics,
+    "canonical_id": Workflow.canonical_id,
+    "score": Workflow.score,
+    "first_seen": Workflow.first_seen,
+    "last_seen": Workflow.last_seen,
+    "inserted_at": Workflow.inserted_at,
+    "updated_at": Workflow.updated_at,
+}
+
+# Extra columns of /workflows/trending rows
+VELOCITY_COLUMNS = {
+    "views_per_hour": Workflow.views_per_hour,
+    "likes_per_hour": Workflow.likes_per_hour,
+    "comments_per_hour": Workflow.comments_per_hour,
+    "trending_score": Workflow.trending_score,
+}
+
+# Key order of a full WorkflowRead body
+LIST_FIELDS = list(WorkflowRead.model_fields)
+
+class InvalidFields(ValueError):
+    pass
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Requested sparse fieldset in WorkflowRead order, all fields by default."""
+    if not fields:
+        return LIST_FIELDS
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    # Any WorkflowRead field is accepted, collected_at included (always null)
+    unknown = requested - set(LIST_FIELDS)
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [f for f in LIST_FIELDS if f in requested]
+
+def list_columns(fields: Sequence[str], required: Sequence[str] = ()):
+    """Columns to select for ``fields`` plus any ``required`` for pagination."""
+    names = list(dict.fromkeys([*fields, *required]))
+    return [LIST_COLUMNS[name].label(name) for name in names if name in LIST_COLUMNS]
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+def dump_rows(rows: Sequence[Any], fields: Sequence[str]) -> bytes:
+    """Serialize result rows straight to JSON, without ORM or Pydantic objects."""
+    items: List[Dict[str, Any]] = []
+    for row in rows:
+        mapping = row._mapping
+        items.append({field: mapping.get(field) for field in fields})
+    # OPT_UTC_Z matches Pydantic's rendering of UTC datetimes
+    return orjson.dumps(items, default=_default, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import BigInteger, cast, func, literal_column, select, tuple_
+
+from api.db.models import Workflow, metric_value
+
+# date_trunc units accepted for the last_seen buckets
+STATS_BUCKETS = ("hour", "day", "week", "month")
+
+VIEWS = metric_value(Workflow.latest_metrics, "views")
+LIKES = metric_value(Workflow.latest_metrics, "likes")
+LIKE_RATIO = metric_value(Workflow.latest_metrics, "like_to_view_ratio")
+
+# grouping(platform, country, bucket): one bit per column rolled up
+GROUP_FULL = 0b000
+GROUP_PLATFORM = 0b011
+GROUP_COUNTRY = 0b101
+GROUP_TOTAL = 0b111
+
+AGGREGATE_FIELDS = ("count", "total_views", "total_likes", "avg_like_to_view_ratio")
+
+def bucket_expr(bucket: str):
+    if bucket not in STATS_BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'")
+    # The unit is inlined so the SELECT and GROUP BY expressions are identical
+    return func.date_trunc(literal_column(f"'{bucket}'"), Workflow.last_seen)
+
+def stats_stmt(
+    bucket: str,
+    platform: Optional[str] = None,
+    country: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_views: Optional[float] = None,
+):
+    """Every facet in one statement: (platform, country, bucket) groups, the
+    per-platform and per-country rollups and the grand total, via GROUPING SETS."""
+    period = bucket_expr(bucket)
+    stmt = select(
+        func.grouping(Workflow.platform, Workflow.country, period).label("grouping_id"),
+        Workflow.platform,
+        Workflow.country,
+        period.label("bucket"),
+        func.count().label("count"),
+        cast(func.coalesce(func.sum(VIEWS), 0), BigInteger).label("total_views"),
+        cast(func.coalesce(func.sum(LIKES), 0), BigInteger).label("total_likes"),
+        func.avg(LIKE_RATIO).label("avg_like_to_view_ratio"),
+    )
+    if platform:
+        stmt = stmt.where(Workflow.platform == platform)
+    if country:
+        stmt = stmt.where(Workflow.country == country)
+    if since:
+        stmt = stmt.where(Workflow.last_seen >= since)
+    if until:
+        stmt = stmt.where(Workflow.last_seen < until)
+    if min_views is not None:
+        stmt = stmt.where(VIEWS >= min_views)
+
+    return stmt.group_by(func.grouping_sets(
+        tuple_(Workflow.platform, Workflow.country, period),
+        tuple_(Workflow.platform),
+        tuple_(Workflow.country),
+        tuple_(),
+    ))
+
+def _aggregates(row) -> Dict[str, Any]:
+    return {field: getattr(row, field) for field in AGGREGATE_FIELDS}
+
+def build_stats(rows: Sequence[Any], bucket: str) -> Dict[str, Any]:
+    """Split the GROUPING SETS rows into totals, facets and time series groups."""
+    totals = {"count": 0, "total_views": 0, "total_likes": 0, "avg_like_to_view_ratio": None}
+    platforms: List[Dict[str, Any]] = []
+    countries: List[Dict[str, Any]] = []
+    groups: List[Dict[str, Any]] = []
+    for row in rows:
+        if row.grouping_id == GROUP_TOTAL:
+            totals = _aggregates(row)
+        elif row.grouping_id == GROUP_PLATFORM:
+            platforms.append({"platform": row.platform, **_aggregates(row)})
+        elif row.grouping_id == GROUP_COUNTRY:
+            countries.append({"country": row.country, **_aggregates(row)})
+        elif row.grouping_id == GROUP_FULL:
+            groups.append({"platform": row.platform, "country": row.country, "bucket": row.bucket, **_aggregates(row)})
+
+    # Largest facets first, groups as a time series
+    platforms.sort(key=lambda f: (-f["count"], f["platform"]))
+    countries.sort(key=lambda f: (-f["count"], f["country"] or ""))
+    groups.sort(key=lambda g: (g["bucket"], g["platform"], g["country"] or ""))
+    return {"bucket": bucket, "totals": totals, "platforms": platforms, "countries": countries, "groups": groups}
@@ -0,0 +1,5 @@
+"""Local performance harness: data generator, load driver, micro-benchmarks.
+
+Every entry point writes a JSON report (see benchmarks.report) so results
+can be diffed between releases. See the README for how to run them.
+"""
@@ -0,0 +1,98 @@
+"""Synthetic workflow rows in the shape of WorkflowCreate.
+
+    python -m benchmarks.datagen --rows 1000000 --out data/workflows.ndjson
+    python -m benchmarks.datagen --rows 1000000 --load   # upsert into DATABASE_URL
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+from ingest.normalize import compute_ratios, normalize_title
+
+PLATFORMS = ("YouTube", "Discourse", "GoogleTrends")
+# Roughly the real mix: mostly videos, a good share of forum topics, few trend keywords
+PLATFORM_WEIGHTS = (0.7, 0.28, 0.02)
+COUNTRIES = ("US", "GB", "IN", "DE", "BR", "FR", "CA", "AU", "Global")
+
+ACTIONS = ("sync", "automate", "send", "monitor", "backup", "enrich", "route", "summarize", "scrape", "notify")
+SUBJECTS = ("emails", "leads", "invoices", "tickets", "orders", "slack messages", "github issues", "rss feeds", "contacts", "files")
+TOOLS = ("google sheets", "notion", "airtable", "hubspot", "slack", "openai", "postgres", "stripe", "telegram", "discord")
+
+def random_title(rng: random.Random) -> str:
+    return f"{rng.choice(ACTIONS).title()} {rng.choice(SUBJECTS)} to {rng.choice(TOOLS)} with n8n"
+
+def _metrics(rng: random.Random, platform: str) -> Dict[str, Any]:
+    # Long tailed popularity, like the real data
+    views = int(rng.paretovariate(1.2) * 100)
+    if platform == "GoogleTrends":
+        score = round(rng.uniform(0, 100), 2)
+        return {"views": int(score * 100), "likes": 0, "comments": 0, "trend_score": score}
+    return compute_ratios(views, int(views * rng.uniform(0, 0.08)), int(views * rng.uniform(0, 0.01)))
+
+def generate_items(rows: int, seed: int = 42, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """Deterministic rows; ``start`` offsets source ids so runs can be appended."""
+    rng = random.Random(seed + start)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(start, start + rows):
+        platform = rng.choices(PLATFORMS, PLATFORM_WEIGHTS)[0]
+        title = random_title(rng)
+        yield {
+            "platform": platform,
+            "source_id": f"bench-{i}",
+            "source_url": f"https://example.com/{platform.lower()}/{i}",
+            "workflow": title,
+            "normalized_title": normalize_title(title),
+            "country": rng.choice(COUNTRIES),
+            "popularity_metrics": _metrics(rng, platform),
+            "collected_at": (base + timedelta(minutes=i)).isoformat(),
+        }
+
+def batches(items: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_ndjson(path: str, rows: int, seed: int):
+    out = sys.stdout if path == "-" else open(path, "w")
+    try:
+        for item in generate_items(rows, seed):
+            out.write(json.dumps(item, separators=(",", ":")) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+async def load_database(rows: int, seed: int, batch_size: int):
+    from ingest.tasks import upsert_workflows
+
+    start = time.perf_counter()
+    done = 0
+    for batch in batches(generate_items(rows, seed), batch_size):
+        done += await upsert_workflows(batch)
+        print(f"{done} rows, {done / (time.perf_counter() - start):.0f} rows/s", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="-", help="NDJSON output path, - for stdout")
+    parser.add_argument("--load", action="store_true", help="upsert into the database instead of writing NDJSON")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    if args.load:
+        from ingest.runtime import run_async
+        run_async(load_database(args.rows, args.seed, args.batch_size))
+    else:
+        write_ndjson(args.out, args.rows, args.seed)
+
+if __name__ == "__main__":
+    main()
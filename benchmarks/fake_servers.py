@@ -0,0 +1,126 @@
+"""Fake YouTube Data API and Discourse servers for offline fetcher benchmarks.
+
+Responses are generated deterministically from the request, with an optional
+per-request ``latency`` to mimic a remote API. Serve them with
+``serve_in_thread`` or mount them in-process with ``httpx.ASGITransport``.
+"""
+import asyncio
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.datagen import random_title
+
+def _stable(value: str) -> random.Random:
+    return random.Random(zlib.crc32(value.encode()))
+
+def youtube_app(total_videos: int = 500, latency: float = 0.0) -> Starlette:
+    """``/search`` pages through ``total_videos`` ids, ``/videos`` returns their details."""
+
+    async def search(request: Request):
+        await asyncio.sleep(latency)
+        region = request.query_params.get("regionCode", "US")
+        page_size = int(request.query_params.get("maxResults", 50))
+        offset = int(request.query_params.get("pageToken") or 0)
+        end = min(offset + page_size, total_videos)
+        body = {
+            "items": [{"id": {"kind": "youtube#video", "videoId": f"{region}-{i}"}} for i in range(offset, end)],
+        }
+        if end < total_videos:
+            body["nextPageToken"] = str(end)
+        return JSONResponse(body)
+
+    async def videos(request: Request):
+        await asyncio.sleep(latency)
+        ids = [i for i in request.query_params.get("id", "").split(",") if i]
+        items = []
+        for video_id in ids:
+            rng = _stable(video_id)
+            views = int(rng.paretovariate(1.2) * 100)
+            items.append({
+                "id": video_id,
+                "snippet": {
+                    "title": random_title(rng),
+                    "publishedAt": (datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=rng.randint(0, 8760))).isoformat(),
+                },
+                "statistics": {
+                    "viewCount": str(views),
+                    "likeCount": str(int(views * rng.uniform(0, 0.08))),
+                    "commentCount": str(int(views * rng.uniform(0, 0.01))),
+                },
+            })
+        return JSONResponse({"items": items})
+
+    return Starlette(routes=[Route("/search", search), Route("/videos", videos)])
+
+def discourse_app(pages: int = 10, per_page: int = 30, latency: float = 0.0) -> Starlette:
+    """``/latest.json`` with ``pages`` pages of topics, newest first; later pages 404."""
+    now = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+    async def latest(request: Request):
+        await asyncio.sleep(latency)
+        page = int(request.query_params.get("page", 0))
+        if page >= pages:
+            return JSONResponse({"errors": ["not found"]}, status_code=404)
+        topics = []
+        for i in range(page * per_page, (page + 1) * per_page):
+            topic_id = pages * per_page - i
+            rng = _stable(f"topic-{topic_id}")
+            topics.append({
+                "id": topic_id,
+                "slug": f"topic-{topic_id}",
+                "title": random_title(rng),
+                "views": int(rng.paretovariate(1.2) * 50),
+                "like_count": rng.randint(0, 40),
+                "posts_count": rng.randint(1, 30),
+                "created_at": (now - timedelta(hours=i * 2)).isoformat(),
+                "bumped_at": (now - timedelta(hours=i)).isoformat(),
+            })
+        return JSONResponse({"topic_list": {"topics": topics}})
+
+    return Starlette(routes=[Route("/latest.json", latest)])
+
+class ServerThread:
+    """A uvicorn server for ``app`` on a background thread."""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, timeout: float = 10.0) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("Fake server did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+    def __enter__(self):
+        return self if self.thread.is_alive() else self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def serve_in_thread(app, port: int = 0) -> ServerThread:
+    """Start ``app`` on ``port`` (0 picks a free one); read the address from ``.url``."""
+    return ServerThread(app, port=port).start()
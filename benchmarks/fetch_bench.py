@@ -0,0 +1,61 @@
+"""Fetcher throughput against the fake YouTube and Discourse servers.
+
+    python -m benchmarks.fetch_bench --latency 0.05 --videos 500 --pages 10
+
+Measures the async fetch paths end to end (HTTP, parsing, normalization)
+without touching the real APIs or their quotas.
+"""
+import sys
+import time
+import asyncio
+import argparse
+from typing import Any, Dict
+
+from benchmarks.fake_servers import discourse_app, serve_in_thread, youtube_app
+from benchmarks.report import build_report, write_report
+from ingest.fetchers.discourse import DiscourseFetcher
+from ingest.fetchers.youtube import YouTubeFetcher
+from ingest.http import AsyncHttp, HostRateLimiter
+
+async def _timed(coro) -> Dict[str, Any]:
+    began = time.perf_counter()
+    items = await coro
+    elapsed = time.perf_counter() - began
+    return {"items": len(items), "elapsed_s": round(elapsed, 3), "items_per_s": round(len(items) / elapsed, 1) if elapsed else 0.0}
+
+async def bench_youtube(base_url: str, http: AsyncHttp, videos: int) -> Dict[str, Any]:
+    # The quota budget is real-API bookkeeping, lift it for the fake server
+    fetcher = YouTubeFetcher(api_key="bench", http=http, quota_budget=10**9, base_url=base_url)
+    result = await _timed(fetcher.asearch_videos(region="US", max_results=videos))
+    result["quota_units"] = fetcher.quota_used
+    return result
+
+async def bench_discourse(base_url: str, http: AsyncHttp, pages: int) -> Dict[str, Any]:
+    return await _timed(DiscourseFetcher(base_url=base_url, http=http).afetch_latest_topics(pages=pages))
+
+async def run_bench(youtube_url: str, discourse_url: str, videos: int, pages: int, concurrency: int) -> Dict[str, Any]:
+    # No per-host rate limit, the point is what the client side can sustain
+    async with AsyncHttp(concurrency=concurrency, rate_limiter=HostRateLimiter({}, default=0)) as http:
+        return {
+            "youtube": await bench_youtube(youtube_url, http, videos),
+            "discourse": await bench_discourse(discourse_url, http, pages),
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the fake servers wait per request")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--out", default="-", help="JSON report path, - for stdout")
+    args = parser.parse_args(argv)
+
+    with serve_in_thread(youtube_app(args.videos, args.latency)) as youtube, \
+            serve_in_thread(discourse_app(args.pages, latency=args.latency)) as discourse:
+        results = asyncio.run(run_bench(youtube.url, discourse.url, args.videos, args.pages, args.concurrency))
+
+    params = {k: v for k, v in vars(args).items() if k != "out"}
+    write_report(build_report("fetch", params, results), args.out)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Closed-loop HTTP load driver for the API.
+
+    python -m benchmarks.load --base-url http://localhost:8000 --duration 30 \\
+        --concurrency 32 --mix list=6,detail=3,import=1 --out results/load.json
+
+Each of ``--concurrency`` workers sends a request, waits for the response and
+sends the next one, picking the scenario by the ``--mix`` weights. Latency
+percentiles and throughput are reported per scenario and overall.
+"""
+import sys
+import time
+import json
+import random
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.datagen import COUNTRIES, PLATFORMS, generate_items
+from benchmarks.report import build_report, summarize, write_report
+
+SCENARIOS = ("list", "detail", "import")
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+class LoadDriver:
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], import_batch: int = 100,
+                 seed: int = 42, ids: Optional[List[int]] = None, import_offset: int = 10_000_000):
+        self.client = client
+        self.mix = mix
+        self.import_batch = import_batch
+        self.rng = random.Random(seed)
+        self.ids = ids or []
+        self.latencies: Dict[str, List[float]] = {name: [] for name in mix}
+        self.errors: Dict[str, int] = {name: 0 for name in mix}
+        # Imported rows get fresh source ids so every import inserts; drivers
+        # sharing a database must not hand out the same range twice
+        self.import_offset = import_offset
+
+    async def sample_ids(self, pages: int = 5, limit: int = 200):
+        """Collect workflow ids to request from /workflows/{id}."""
+        cursor = None
+        for _ in range(pages):
+            params = {"limit": limit, "fields": "id"}
+            if cursor:
+                params["cursor"] = cursor
+            resp = await self.client.get("/workflows", params=params)
+            resp.raise_for_status()
+            self.ids.extend(row["id"] for row in resp.json())
+            cursor = resp.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+    def _list(self):
+        params = {"limit": 50}
+        if self.rng.random() < 0.5:
+            params["platform"] = self.rng.choice(PLATFORMS)
+        if self.rng.random() < 0.5:
+            params["country"] = self.rng.choice(COUNTRIES)
+        if self.rng.random() < 0.3:
+            params["sort"] = "last_seen"
+        return self.client.get("/workflows", params=params)
+
+    def _detail(self):
+        return self.client.get(f"/workflows/{self.rng.choice(self.ids)}")
+
+    def _import(self):
+        items = generate_items(self.import_batch, seed=self.rng.randrange(1 << 30), start=self.import_offset)
+        self.import_offset += self.import_batch
+        body = "".join(json.dumps(item) + "\n" for item in items)
+        return self.client.post("/workflows/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    def _pick(self) -> str:
+        names = list(self.mix)
+        if "detail" in names and not self.ids:
+            names.remove("detail")
+        return self.rng.choices(names, [self.mix[n] for n in names])[0]
+
+    async def _worker(self, deadline: float):
+        requests = {"list": self._list, "detail": self._detail, "import": self._import}
+        while time.perf_counter() < deadline:
+            name = self._pick()
+            start = time.perf_counter()
+            try:
+                resp = await requests[name]()
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                self.latencies[name].append(time.perf_counter() - start)
+            else:
+                self.errors[name] += 1
+
+    async def run(self, duration: float, concurrency: int) -> Dict[str, Dict]:
+        start = time.perf_counter()
+        await asyncio.gather(*(self._worker(start + duration) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        results = {name: summarize(self.latencies[name], elapsed, self.errors[name]) for name in self.mix}
+        results["all"] = summarize(
+            [lat for lats in self.latencies.values() for lat in lats], elapsed, sum(self.errors.values()),
+        )
+        return results
+
+async def run_load(base_url: str, duration: float, concurrency: int, mix: Dict[str, float],
+                   import_batch: int, seed: int, warmup: float) -> Dict[str, Dict]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        driver = LoadDriver(client, mix, import_batch=import_batch, seed=seed)
+        if "detail" in mix:
+            await driver.sample_ids()
+        if warmup > 0:
+            # Fill pools and caches, then measure with a fresh driver that
+            # continues after the source ids the warmup imported
+            warm = LoadDriver(client, mix, import_batch, seed, ids=driver.ids, import_offset=driver.import_offset)
+            await warm.run(warmup, concurrency)
+            driver.import_offset = warm.import_offset
+        return await driver.run(duration, concurrency)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default="list=6,detail=3,import=1", help="scenario weights")
+    parser.add_argument("--import-batch", type=int, default=100, help="rows per import request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="-", help="JSON report path, - for stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = asyncio.run(run_load(
+        args.base_url, args.duration, args.concurrency, mix, args.import_batch, args.seed, args.warmup,
+    ))
+    params = {k: v for k, v in vars(args).items() if k != "out"}
+    write_report(build_report("load", params, results), args.out)
+
+if __name__ == "__main__":
+    sys.exit(main())
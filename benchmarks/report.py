@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+
+def percentile(sorted_samples: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples, ``q`` in [0, 100]."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+def summarize(latencies: Sequence[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Latency percentiles in milliseconds plus throughput over ``elapsed`` seconds."""
+    samples = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": ms(percentile(samples, 50)),
+        "p95_ms": ms(percentile(samples, 95)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "mean_ms": ms(sum(samples) / len(samples)) if samples else 0.0,
+        "max_ms": ms(samples[-1]) if samples else 0.0,
+    }
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_report(name: str, params: Dict[str, Any], results: Any) -> Dict[str, Any]:
+    return {
+        "benchmark": name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+
+def write_report(report: Dict[str, Any], path: Optional[str] = None):
+    """Write ``report`` as JSON to ``path``, or print it when no path is given."""
+    payload = json.dumps(report, indent=2, default=str)
+    if not path or path == "-":
+        print(payload)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(payload + "\n")
+    print(f"Wrote {path}")
@@ -0,0 +1,60 @@
+"""upsert_workflows throughput by chunk size, against DATABASE_URL.
+
+    python -m benchmarks.upsert_bench --rows 20000 --chunk-sizes 100,250,500,1000,2000
+
+Each chunk size first inserts ``--rows`` fresh rows, then upserts the same
+rows again so the ON CONFLICT update path is measured too. Use a scratch
+database: the rows are left in place.
+"""
+import sys
+import time
+import argparse
+from typing import Dict, List
+
+from benchmarks.datagen import generate_items
+from benchmarks.report import build_report, write_report
+
+DEFAULT_CHUNK_SIZES = "100,250,500,1000,2000"
+
+async def bench_chunk_size(chunk_size: int, rows: int, seed: int, start: int) -> Dict[str, float]:
+    from ingest.tasks import upsert_workflows
+
+    items = list(generate_items(rows, seed=seed, start=start))
+    result = {"chunk_size": chunk_size, "rows": rows}
+    for phase in ("insert", "update"):
+        began = time.perf_counter()
+        await upsert_workflows(items, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - began
+        result[f"{phase}_s"] = round(elapsed, 3)
+        result[f"{phase}_rows_per_s"] = round(rows / elapsed, 1)
+    return result
+
+async def run_bench(chunk_sizes: List[int], rows: int, seed: int) -> List[Dict[str, float]]:
+    results = []
+    for i, chunk_size in enumerate(chunk_sizes):
+        # Disjoint source ids per chunk size, each one starts from empty rows
+        result = await bench_chunk_size(chunk_size, rows, seed, start=20_000_000 + i * rows)
+        print(f"chunk_size={chunk_size}: {result['insert_rows_per_s']} inserts/s, "
+              f"{result['update_rows_per_s']} updates/s", file=sys.stderr)
+        results.append(result)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--chunk-sizes", default=DEFAULT_CHUNK_SIZES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="-", help="JSON report path, - for stdout")
+    args = parser.parse_args(argv)
+
+    from ingest.runtime import run_async, shutdown_loop
+
+    chunk_sizes = [int(size) for size in args.chunk_sizes.split(",") if size.strip()]
+    try:
+        results = run_async(run_bench(chunk_sizes, args.rows, args.seed))
+    finally:
+        shutdown_loop()
+    write_report(build_report("upsert", {"rows": args.rows, "chunk_sizes": chunk_sizes, "seed": args.seed}, results), args.out)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,26 +16,34 @@ app.conf.update(
 # Auto-discover tasks in the ingest.tasks module
 app.autodiscover_tasks(["ingest.tasks"])
 
-from celery.signals import worker_ready
+from celery.signals import worker_ready, worker_process_shutdown
 from prometheus_client import start_http_server
+from ingest.metrics import metrics_registry, mark_process_dead
+# Per-process event loop and DB engine lifecycle hooks
+import ingest.runtime  # noqa: F401
 
 @worker_ready.connect
 def start_prometheus_server(sender, **kwargs):
-    # Start on port 9090 inside the worker container
+    # Start on port 9090 inside the worker container. Tasks run in forked
+    # children, with PROMETHEUS_MULTIPROC_DIR set their samples are served too.
     try:
-        start_http_server(9090)
+        start_http_server(9090, registry=metrics_registry())
         print("Prometheus metrics server started on port 9090")
     except Exception as e:
         print(f"Failed to start Prometheus server: {e}")
 
+@worker_process_shutdown.connect
+def cleanup_prometheus_process(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
+
 # Celery Beat Schedule
 from celery.schedules import crontab
 
 app.conf.beat_schedule = {
     'fetch-youtube-daily': {
-        'task': 'ingest.fetch_youtube',
+        # Fans out to one fetch task per YOUTUBE_REGIONS entry
+        'task': 'ingest.schedule_youtube',
         'schedule': crontab(hour=0, minute=0), # Daily at midnight
-        'args': ('US',),
     },
     'fetch-forum-daily': {
         'task': 'ingest.fetch_forum',
@@ -46,4 +54,8 @@ app.conf.beat_schedule = {
         'task': 'ingest.fetch_trends',
         'schedule': crontab(day_of_week='mon', hour=1, minute=0), # Mondays
     },
+    'compact-snapshots-daily': {
+        'task': 'ingest.compact_snapshots',
+        'schedule': crontab(hour=3, minute=0), # Daily at 03:00
+    },
 }
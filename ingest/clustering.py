@@ -0,0 +1,142 @@
+import os
+import re
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from api.db.base import AsyncSessionLocal
+from api.db.models import CanonicalWorkflow, Workflow
+
+# Minimum pg_trgm similarity between cluster keys to join an existing cluster
+CLUSTER_SIMILARITY = float(os.getenv("CLUSTER_SIMILARITY", 0.6))
+
+# Words that say nothing about which automation a title is about
+STOPWORDS = {
+    "a", "an", "and", "the", "to", "of", "in", "on", "for", "with", "how", "your",
+    "you", "my", "using", "via", "from", "is", "n8n", "io",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+logger = logging.getLogger(__name__)
+
+def cluster_key(title: Optional[str]) -> str:
+    """Order-insensitive token key of a normalized title.
+
+    Titles that only differ in word order, punctuation or filler words share
+    a key; near-identical keys are then merged by trigram similarity.
+    """
+    if not title:
+        return ""
+    tokens = {t for t in _TOKEN_RE.findall(title.lower()) if t not in STOPWORDS}
+    return " ".join(sorted(tokens))
+
+async def _match_existing(session, keys: Sequence[str]) -> Dict[str, int]:
+    # One index-assisted query for the whole batch instead of one per title
+    await session.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+        {"threshold": str(CLUSTER_SIMILARITY)},
+    )
+    result = await session.execute(text("""
+        SELECT DISTINCT ON (t.key) t.key, c.id
+        FROM unnest(CAST(:keys AS text[])) AS t(key)
+        JOIN canonical_workflows c ON c.title % t.key
+        ORDER BY t.key, similarity(c.title, t.key) DESC, c.id
+    """), {"keys": list(keys)})
+    return {key: canonical_id for key, canonical_id in result}
+
+async def _create_clusters(session, keys: Sequence[str]) -> Dict[str, int]:
+    if not keys:
+        return {}
+    stmt = insert(CanonicalWorkflow).values([{"title": key} for key in keys])
+    # A concurrent batch may have created the same key, reuse its row
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_canonical_title", set_={"title": stmt.excluded.title}
+    ).returning(CanonicalWorkflow.id, CanonicalWorkflow.title)
+    result = await session.execute(stmt)
+    return {title: canonical_id for canonical_id, title in result}
+
+async def refresh_cluster_stats(session, canonical_ids: Iterable[int]):
+    """Recompute the aggregates of the given clusters from their members."""
+    ids = sorted(set(i for i in canonical_ids if i is not None))
+    if not ids:
+        return
+    await session.execute(text("""
+        UPDATE canonical_workflows c SET
+            member_count = a.member_count,
+            platforms = a.platforms,
+            total_views = a.total_views,
+            total_likes = a.total_likes,
+            total_comments = a.total_comments,
+            total_score = a.total_score,
+            max_score = a.max_score,
+            updated_at = now()
+        FROM (
+            SELECT canonical_id,
+                   count(*) AS member_count,
+                   array_agg(DISTINCT platform) AS platforms,
+                   coalesce(sum((latest_metrics->>'views')::numeric), 0)::bigint AS total_views,
+                   coalesce(sum((latest_metrics->>'likes')::numeric), 0)::bigint AS total_likes,
+                   coalesce(sum((latest_metrics->>'comments')::numeric), 0)::bigint AS total_comments,
+                   coalesce(sum(score), 0) AS total_score,
+                   coalesce(max(score), 0) AS max_score
+            FROM workflows
+            WHERE canonical_id = ANY(:ids)
+            GROUP BY canonical_id
+        ) a
+        WHERE c.id = a.canonical_id
+    """), {"ids": ids})
+
+async def assign_clusters(session, rows: Sequence) -> List[int]:
+    """Cluster freshly upserted rows and refresh the clusters they touch.
+
+    ``rows`` need ``id``, ``normalized_title`` and ``canonical_id`` (the
+    RETURNING rows of the upsert). Rows already in a cluster keep it.
+    Returns the ids of the touched clusters.
+    """
+    touched = [row.canonical_id for row in rows if row.canonical_id is not None]
+
+    by_key = defaultdict(list)
+    for row in rows:
+        if row.canonical_id is None:
+            key = cluster_key(row.normalized_title)
+            if key:
+                by_key[key].append(row.id)
+
+    if by_key:
+        assigned = await _match_existing(session, list(by_key))
+        assigned.update(await _create_clusters(session, [k for k in by_key if k not in assigned]))
+
+        params = [
+            {"id": workflow_id, "canonical_id": assigned[key]}
+            for key, workflow_ids in by_key.items()
+            for workflow_id in workflow_ids
+        ]
+        await session.execute(update(Workflow), params)
+        touched.extend(assigned.values())
+
+    await refresh_cluster_stats(session, touched)
+    return sorted(set(touched))
+
+async def backfill_clusters(batch_size: int = 2000) -> int:
+    """Cluster every row that has no canonical_id yet, e.g. after deploying."""
+    total = 0
+    last_id = 0
+    async with AsyncSessionLocal() as session:
+        while True:
+            result = await session.execute(
+                select(Workflow.id, Workflow.normalized_title, Workflow.canonical_id)
+                .where(Workflow.id > last_id, Workflow.canonical_id.is_(None))
+                .order_by(Workflow.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            await assign_clusters(session, rows)
+            await session.commit()
+            total += len(rows)
+            last_id = rows[-1].id
+            logger.info(f"Clustered {total} workflows")
+    return total
@@ -1,15 +1,26 @@
 import os
+import asyncio
+import logging
 import requests
+import httpx
 import backoff
-from typing import List, Dict, Any
+from dataclasses import replace
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from ingest.normalize import normalize_title, compute_ratios
+from ingest.normalize import compute_ratios_batch, normalize_titles, ratios_to_dict
+from ingest.http import AsyncHttp, get_http
+from ingest.incremental import Watermark, parse_timestamp
+from ingest.metrics import FETCH_LATENCY_SECONDS
+
+logger = logging.getLogger(__name__)
 
 class DiscourseFetcher:
-    def __init__(self, base_url: str = None, api_key: str = None, api_user: str = None):
+    def __init__(self, base_url: str = None, api_key: str = None, api_user: str = None, http: AsyncHttp = None):
         self.base_url = base_url or os.getenv("DISCOURSE_BASE_URL", "https://forum.n8n.io")
         self.api_key = api_key or os.getenv("DISCOURSE_API_KEY")
         self.api_user = api_user or os.getenv("DISCOURSE_API_USER")
+        self.session = requests.Session()
+        self.http = http
 
     def _headers(self):
         h = {"Content-Type": "application/json"}
@@ -18,49 +29,167 @@ class DiscourseFetcher:
             h["Api-Username"] = self.api_user
         return h
 
+    def _topics_to_items(self, topics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Filter for logic/workflow related? Or just everything?
+        # The user want "workflow signals". We assume all topics might be relevant or
+        # maybe filter by category if known (e.g. 'Questions', 'Made with n8n').
+        # For MVP fetch all latest.
+
+        titles = normalize_titles(t["title"] for t in topics)
+        ratios = compute_ratios_batch(
+            (
+                t.get("views", 0),
+                t.get("like_count", 0), # Discourse often uses 'like_count' or 'actions_summary'
+                t.get("posts_count", 0) - 1, # posts includes OP?
+            )
+            for t in topics
+        )
+
+        return [
+            {
+                "platform": "Discourse",
+                "source_id": str(t["id"]),
+                "source_url": f"{self.base_url}/t/{t['slug']}/{t['id']}",
+                "workflow": t["title"],
+                "normalized_title": normalized_title,
+                "country": "Global", # Discourse is global
+                "popularity_metrics": ratios_to_dict(metrics),
+                "collected_at": t.get("created_at")
+            }
+            for t, normalized_title, metrics in zip(topics, titles, ratios)
+        ]
+
+    @staticmethod
+    def _topics(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return data.get("topic_list", {}).get("topics", [])
+
     @backoff.on_exception(backoff.expo, requests.exceptions.RequestException, max_tries=3)
     def fetch_latest_topics(self, pages: int = 3) -> List[Dict[str, Any]]:
         results = []
-        # Discourse pagination usually by page query param? Or 'more_topics_url'. 
+        # Discourse pagination usually by page query param? Or 'more_topics_url'.
         # Standard endpoint: /latest.json?page=X
-        
+
         for page in range(pages):
             url = f"{self.base_url}/latest.json"
             params = {"page": page} # verifying if 'page' works for n8n forum or if it uses 'no_definitions'
-            
-            resp = requests.get(url, headers=self._headers(), params=params)
-            if resp.status_code == 404: 
+
+            with FETCH_LATENCY_SECONDS.labels(platform="Discourse", endpoint="latest").time():
+                resp = self.session.get(url, headers=self._headers(), params=params)
+            if resp.status_code == 404:
                 break
             resp.raise_for_status()
-            
-            data = resp.json()
-            topic_list = data.get("topic_list", {})
-            topics = topic_list.get("topics", [])
-            
+
+            topics = self._topics(resp.json())
             if not topics:
                 break
-                
-            for t in topics:
-                # Filter for logic/workflow related? Or just everything?
-                # The user want "workflow signals". We assume all topics might be relevant or 
-                # maybe filter by category if known (e.g. 'Questions', 'Made with n8n').
-                # For MVP fetch all latest.
-                
-                metrics = compute_ratios(
-                    views=t.get("views", 0),
-                    likes=t.get("like_count", 0), # Discourse often uses 'like_count' or 'actions_summary'
-                    comments=t.get("posts_count", 0) - 1 # posts includes OP?
-                )
-                
-                results.append({
-                    "platform": "Discourse",
-                    "source_id": str(t["id"]),
-                    "source_url": f"{self.base_url}/t/{t['slug']}/{t['id']}",
-                    "workflow": t["title"],
-                    "normalized_title": normalize_title(t["title"]),
-                    "country": "Global", # Discourse is global
-                    "popularity_metrics": metrics,
-                    "collected_at": t.get("created_at")
-                })
-        
+
+            results.extend(self._topics_to_items(topics))
+
         return results
+
+    @backoff.on_exception(backoff.expo, httpx.HTTPError, max_tries=3)
+    async def _aget_latest(self, page: int, headers: Dict[str, str] = None) -> httpx.Response:
+        http = self.http or get_http()
+        with FETCH_LATENCY_SECONDS.labels(platform="Discourse", endpoint="latest").time():
+            resp = await http.get(
+                f"{self.base_url}/latest.json",
+                headers={**self._headers(), **(headers or {})},
+                params={"page": page},
+            )
+        # 304 (conditional request) and 404 (past the last page) are answers
+        # for the caller; anything else failing is raised here so it is retried
+        if resp.status_code not in (304, 404):
+            resp.raise_for_status()
+        return resp
+
+    async def _afetch_page(self, page: int) -> Optional[List[Dict[str, Any]]]:
+        resp = await self._aget_latest(page)
+        if resp.status_code == 404:
+            return None
+        return self._topics(resp.json())
+
+    async def afetch_latest_topics(self, pages: int = 3) -> List[Dict[str, Any]]:
+        """Async variant of fetch_latest_topics, requesting all pages concurrently."""
+        page_topics = await asyncio.gather(*(self._afetch_page(page) for page in range(pages)))
+
+        results = []
+        for topics in page_topics:
+            # Same stopping rule as the sequential version: the first missing
+            # or empty page ends the listing
+            if not topics:
+                break
+            results.extend(self._topics_to_items(topics))
+        return results
+
+    async def afetch_updated_topics(self, mark: Watermark, max_pages: int = 3, window: int = 2) -> Tuple[List[Dict[str, Any]], Watermark]:
+        """Fetch only what changed since ``mark``.
+
+        /latest.json is ordered by bumped_at, so pagination stops at the first
+        page reaching topics bumped at or before the stored high-water mark.
+        The first page is requested conditionally; a 304 means nothing changed.
+        Later pages are requested ``window`` at a time. Returns the items and
+        the watermark to persist once they have been stored.
+
+        The watermark only advances when the walk reached ``mark`` or the end
+        of the listing. If ``max_pages`` ran out first, topics between the last
+        page read and ``mark`` are still unseen, so ``mark`` is returned
+        unchanged and the next run starts again from the top. A first run
+        (no high-water mark yet) always starts the watermark.
+        """
+        conditional = {}
+        if mark.etag:
+            conditional["If-None-Match"] = mark.etag
+        if mark.last_modified:
+            conditional["If-Modified-Since"] = mark.last_modified
+
+        resp = await self._aget_latest(0, conditional)
+        if resp.status_code in (304, 404):
+            return [], mark
+
+        topics = self._topics(resp.json())
+        new_mark = replace(
+            mark,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+        )
+
+        def reached_mark(page_topics):
+            # Pinned topics sit on top of the list regardless of activity
+            return mark.high_water is not None and any(
+                not t.get("pinned") and (parse_timestamp(t.get("bumped_at")) or mark.high_water) <= mark.high_water
+                for t in page_topics
+            )
+
+        # complete: nothing bumped after the old mark can be past the pages read
+        complete = not topics or reached_mark(topics)
+        page = 1
+        while not complete and page < max_pages:
+            pages = range(page, min(page + window, max_pages))
+            for page_topics in await asyncio.gather(*(self._afetch_page(p) for p in pages)):
+                if not page_topics or reached_mark(page_topics):
+                    topics.extend(page_topics or [])
+                    complete = True
+                    break
+                topics.extend(page_topics)
+            page += len(pages)
+
+        unique = {t["id"]: t for t in topics}
+        items = self._topics_to_items(list(unique.values()))
+        if not complete and mark.high_water is not None:
+            # Keep the old validators too, a 304 must not hide the unread gap
+            logger.warning(
+                f"Discourse: {max_pages} pages did not reach the watermark {mark.high_water.isoformat()}, "
+                "keeping it; raise the page budget if this repeats"
+            )
+            return items, mark
+
+        for t in topics:
+            if t.get("pinned"):
+                continue
+            bumped_at = parse_timestamp(t.get("bumped_at"))
+            if bumped_at and (new_mark.high_water is None or bumped_at > new_mark.high_water):
+                new_mark.high_water = bumped_at
+            if new_mark.last_id is None or t["id"] > new_mark.last_id:
+                new_mark.last_id = t["id"]
+
+        return items, new_mark
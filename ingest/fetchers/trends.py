@@ -1,59 +1,233 @@
 import os
-from typing import List, Dict, Any
-from pytrends.request import TrendReq
+import json
+import time
+import hashlib
+import logging
+import zlib
+from typing import List, Dict, Any, Optional, Sequence
 from ingest.normalize import normalize_title
+from ingest.metrics import FETCH_LATENCY_SECONDS
 
-class TrendsFetcher:
-    def __init__(self, hl='en-US', tz=360):
-        self.pytrends = TrendReq(hl=hl, tz=tz)
-
-    def fetch_trends(self, keywords: List[str] = None) -> List[Dict[str, Any]]:
-        if not keywords:
-            keywords = ["n8n workflow", "n8n automation", "n8n tutorial"]
-            
-        # Pytrends can be flaky due to Google internal API changes/rate limits.
-        # We wrap in try/except or just allow failure.
-        results = []
-        
+# pytrends accepts at most 5 keywords per payload; one slot is the anchor
+PAYLOAD_SIZE = 5
+
+DEFAULT_KEYWORDS = ["n8n workflow", "n8n automation", "n8n tutorial"]
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [v.strip() for v in os.getenv(name, default).split(",") if v.strip()]
+
+TRENDS_KEYWORDS = _env_list("TRENDS_KEYWORDS", ",".join(DEFAULT_KEYWORDS))
+# Shared by every payload so scores from different payloads can be compared
+TRENDS_ANCHOR = os.getenv("TRENDS_ANCHOR", "n8n")
+# "" is worldwide; other values are ISO country codes stored in the country column
+TRENDS_GEOS = [g.strip() for g in os.getenv("TRENDS_GEOS", "").split(",")]
+TRENDS_TIMEFRAME = os.getenv("TRENDS_TIMEFRAME", "now 7-d")
+
+# Google throttles hard: space requests out and cap them per run
+TRENDS_MIN_INTERVAL = float(os.getenv("TRENDS_MIN_INTERVAL", 5))
+TRENDS_MAX_REQUESTS = int(os.getenv("TRENDS_MAX_REQUESTS", 30))
+
+TRENDS_CACHE_DIR = os.getenv("TRENDS_CACHE_DIR", "/tmp/trends_cache")
+TRENDS_CACHE_TTL = float(os.getenv("TRENDS_CACHE_TTL", 6 * 3600))
+
+# Offline runs and tests: use StubTrendReq instead of calling Google
+TRENDS_STUB = os.getenv("TRENDS_STUB", "false").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+class TrendsBudgetExceeded(Exception):
+    pass
+
+class Throttle:
+    """At most ``budget`` calls, at least ``min_interval`` seconds apart."""
+
+    def __init__(self, min_interval: float = TRENDS_MIN_INTERVAL, budget: int = TRENDS_MAX_REQUESTS,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = min_interval
+        self.budget = budget
+        self.used = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._last = None
+
+    def wait(self):
+        if self.used >= self.budget:
+            raise TrendsBudgetExceeded(f"Trends request budget of {self.budget} used up")
+        if self._last is not None:
+            remaining = self.min_interval - (self._clock() - self._last)
+            if remaining > 0:
+                self._sleep(remaining)
+        self._last = self._clock()
+        self.used += 1
+
+class SeriesCache:
+    """Interest series on disk, one JSON file per (keywords, geo, timeframe)."""
+
+    def __init__(self, directory: str = TRENDS_CACHE_DIR, ttl: float = TRENDS_CACHE_TTL, clock=time.time):
+        self.directory = directory
+        self.ttl = ttl
+        self._clock = clock
+
+    def _path(self, keywords: Sequence[str], geo: str, timeframe: str) -> str:
+        key = json.dumps([list(keywords), geo, timeframe])
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def get(self, keywords: Sequence[str], geo: str, timeframe: str) -> Optional[Dict[str, List[float]]]:
         try:
-            self.pytrends.build_payload(keywords, cat=0, timeframe='now 7-d', geo='', gprop='')
+            with open(self._path(keywords, geo, timeframe)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._clock() - entry["fetched_at"] > self.ttl:
+            return None
+        return entry["series"]
+
+    def set(self, keywords: Sequence[str], geo: str, timeframe: str, series: Dict[str, List[float]]):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(keywords, geo, timeframe)
+            # Write then rename, concurrent workers never read half a file
+            with open(path + ".tmp", "w") as f:
+                json.dump({"fetched_at": self._clock(), "series": series}, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.warning(f"Could not cache trends series: {e}")
+
+class StubTrendReq:
+    """Offline stand-in for pytrends' TrendReq.
+
+    Like Google, each payload is scaled so its most popular keyword peaks at
+    100. ``popularity`` sets a keyword's true level, others get a stable
+    pseudo-random one.
+    """
+
+    def __init__(self, popularity: Dict[str, float] = None, points: int = 7, **kwargs):
+        self.popularity = popularity or {}
+        self.points = points
+        self.payloads = []
+
+    def _level(self, kw: str, geo: str) -> float:
+        if kw in self.popularity:
+            return float(self.popularity[kw])
+        return float(zlib.crc32(f"{kw}|{geo}".encode()) % 1000 + 1)
+
+    def build_payload(self, kw_list, cat=0, timeframe='today 5-y', geo='', gprop=''):
+        self.payloads.append({"kw_list": list(kw_list), "timeframe": timeframe, "geo": geo})
+
+    def interest_over_time(self):
+        import pandas as pd
+
+        payload = self.payloads[-1]
+        levels = {kw: self._level(kw, payload["geo"]) for kw in payload["kw_list"]}
+        peak = max(levels.values())
+        data = {kw: [round(level / peak * 100) for _ in range(self.points)] for kw, level in levels.items()}
+        data["isPartial"] = [False] * self.points
+        return pd.DataFrame(data, index=pd.date_range("2024-01-01", periods=self.points, freq="D"))
+
+def keyword_groups(keywords: Sequence[str], anchor: str) -> List[List[str]]:
+    """Payloads of the anchor plus up to four other keywords each."""
+    others = [kw for kw in dict.fromkeys(keywords) if kw != anchor]
+    size = PAYLOAD_SIZE - 1
+    return [[anchor, *others[i:i + size]] for i in range(0, len(others), size)] or [[anchor]]
+
+def _mean(values: Sequence[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+class TrendsFetcher:
+    def __init__(self, hl='en-US', tz=360, pytrends=None, anchor: str = TRENDS_ANCHOR,
+                 geos: Sequence[str] = None, timeframe: str = TRENDS_TIMEFRAME,
+                 throttle: Throttle = None, cache: SeriesCache = None):
+        if pytrends is None:
+            if TRENDS_STUB:
+                pytrends = StubTrendReq()
+            else:
+                from pytrends.request import TrendReq
+                pytrends = TrendReq(hl=hl, tz=tz)
+        self.pytrends = pytrends
+        self.anchor = anchor
+        self.geos = list(geos) if geos is not None else TRENDS_GEOS
+        self.timeframe = timeframe
+        self.throttle = throttle or Throttle()
+        self.cache = cache or SeriesCache()
+        self.budget_exhausted = False
+
+    def _series(self, keywords: List[str], geo: str) -> Dict[str, List[float]]:
+        cached = self.cache.get(keywords, geo, self.timeframe)
+        if cached is not None:
+            return cached
+
+        self.throttle.wait()
+        with FETCH_LATENCY_SECONDS.labels(platform="GoogleTrends", endpoint="interest_over_time").time():
+            self.pytrends.build_payload(keywords, cat=0, timeframe=self.timeframe, geo=geo, gprop='')
             data = self.pytrends.interest_over_time()
-            
-            if data.empty:
-                return []
-                
-            # Convert trend data to "workflow" signals? 
-            # The prompt asks for "signals... upserts canonical workflow records".
-            # Keyword trends don't map 1:1 to a specific "workflow" entity like a video or forum topic.
-            # They map to the keyword itself.
-            # We will treat the KEYWORD as the "workflow" name/title.
-            
-            # Average interest over the period
-            means = data.mean()
-            
-            for kw in keywords:
-                if kw in means:
-                    score = float(means[kw])
-                    # Synthetic metrics for trends
-                    metrics = {
-                        "views": int(score * 100), # arbitrary scaling
-                        "likes": 0,
-                        "comments": 0,
-                        "trend_score": score
-                    }
-                    
-                    results.append({
-                        "platform": "GoogleTrends",
-                        "source_id": f"kw-{kw}",
-                        "source_url": f"https://trends.google.com/trends/explore?q={kw}",
-                        "workflow": kw, # The keyword is the entity
-                        "normalized_title": normalize_title(kw),
-                        "country": "Global",
-                        "popularity_metrics": metrics,
-                        "collected_at": None # now
-                    })
-                    
-        except Exception as e:
-            print(f"Error fetching trends: {e}")
-            
+
+        series = {} if data.empty else {kw: [float(v) for v in data[kw]] for kw in keywords if kw in data}
+        self.cache.set(keywords, geo, self.timeframe, series)
+        return series
+
+    def fetch_scores(self, keywords: Sequence[str], geo: str = '') -> Dict[str, float]:
+        """Mean interest per keyword, on the scale of the anchor's first payload.
+
+        Each payload is scaled by Google to its own maximum. Dividing by the
+        anchor's mean in the same payload and multiplying by the anchor's
+        reference level puts every group on one comparable scale.
+        """
+        scores: Dict[str, float] = {}
+        reference = None
+        for group in keyword_groups(keywords, self.anchor):
+            try:
+                series = self._series(group, geo)
+            except TrendsBudgetExceeded as e:
+                logger.warning(f"{e}, returning partial results")
+                self.budget_exhausted = True
+                break
+            except Exception as e:
+                logger.error(f"Error fetching trends for {group} in '{geo}': {e}")
+                continue
+
+            anchor_mean = _mean(series.get(self.anchor, []))
+            if anchor_mean <= 0:
+                logger.warning(f"Anchor '{self.anchor}' has no interest in '{geo}', skipping {group}")
+                continue
+            if reference is None:
+                reference = anchor_mean
+                scores[self.anchor] = round(anchor_mean, 4)
+
+            for kw in group[1:]:
+                if kw in series:
+                    scores[kw] = round(_mean(series[kw]) / anchor_mean * reference, 4)
+        return scores
+
+    def _to_item(self, kw: str, geo: str, score: float) -> Dict[str, Any]:
+        # Worldwide rows keep their original source_id
+        source_id = f"kw-{kw}-{geo}" if geo else f"kw-{kw}"
+        url = f"https://trends.google.com/trends/explore?q={kw}" + (f"&geo={geo}" if geo else "")
+        return {
+            "platform": "GoogleTrends",
+            "source_id": source_id,
+            "source_url": url,
+            "workflow": kw, # The keyword is the entity
+            "normalized_title": normalize_title(kw),
+            "country": geo or "Global",
+            # Synthetic metrics for trends
+            "popularity_metrics": {
+                "views": int(score * 100), # arbitrary scaling
+                "likes": 0,
+                "comments": 0,
+                "trend_score": score,
+            },
+            "collected_at": None # now
+        }
+
+    def fetch_trends(self, keywords: List[str] = None, geos: Sequence[str] = None) -> List[Dict[str, Any]]:
+        # Keyword trends don't map 1:1 to a specific "workflow" entity like a
+        # video or forum topic. We treat the KEYWORD as the "workflow" name/title.
+        keywords = keywords or TRENDS_KEYWORDS
+        results = []
+        for geo in (geos if geos is not None else self.geos):
+            scores = self.fetch_scores(keywords, geo)
+            # The anchor is a calibration term, only report it when asked for
+            results.extend(self._to_item(kw, geo, score) for kw, score in scores.items() if kw in keywords)
+            if self.budget_exhausted:
+                break
         return results
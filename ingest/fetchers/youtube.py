@@ -1,112 +1,218 @@
 import os
+import asyncio
 import requests
+import httpx
 import backoff
 from typing import List, Dict, Any
-from ingest.normalize import compute_ratios, normalize_title
+from ingest.normalize import compute_ratios_batch, normalize_titles, ratios_to_dict
+from ingest.http import AsyncHttp, get_http
+from ingest.metrics import FETCH_LATENCY_SECONDS, YOUTUBE_QUOTA_UNITS_TOTAL
+
+# videos.list accepts at most 50 ids per call, search.list 50 results per page
+VIDEO_DETAILS_BATCH = 50
+SEARCH_PAGE_SIZE = 50
+
+# Data API quota cost per call, see https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {"search": 100, "videos": 1}
+
+# Per run caps, the default daily quota is 10,000 units per project
+YOUTUBE_MAX_RESULTS = int(os.getenv("YOUTUBE_MAX_RESULTS", 500))
+YOUTUBE_QUOTA_BUDGET = int(os.getenv("YOUTUBE_QUOTA_BUDGET", 2000))
+
+def _detail_calls(count: int) -> int:
+    return -(-count // VIDEO_DETAILS_BATCH)
 
 class YouTubeFetcher:
     BASE_URL = "https://www.googleapis.com/youtube/v3"
-    
-    def __init__(self, api_key: str = None):
+
+    def __init__(self, api_key: str = None, http: AsyncHttp = None, quota_budget: int = YOUTUBE_QUOTA_BUDGET, base_url: str = None):
         self.api_key = api_key or os.getenv("YOUTUBE_API_KEY")
+        self.session = requests.Session()
+        self.http = http
+        self.base_url = base_url or os.getenv("YOUTUBE_BASE_URL", self.BASE_URL)
+        self.quota_budget = quota_budget
+        self.quota_used = 0
 
-    @backoff.on_exception(backoff.expo, requests.exceptions.RequestException, max_tries=3)
-    def search_videos(self, query: str = "n8n automation", region: str = "US", max_results: int = 50) -> List[Dict[str, Any]]:
-        if not self.api_key or self.api_key == "YOUR_YT_KEY":
-            print("Warning: No valid YOUTUBE_API_KEY found. Returning MOCK data for verification.")
-            from datetime import datetime, timedelta
-            # Mock data for demonstration
-            return [
-                {
-                    "platform": "YouTube",
-                    "source_id": "mock_yt_1",
-                    "source_url": "https://www.youtube.com/watch?v=mock1",
-                    "workflow": "Automating Email with n8n (Mock)",
-                    "normalized_title": "automating email with n8n",
-                    "country": region,
-                    "popularity_metrics": {
-                        "views": 15000,
-                        "likes": 500,
-                        "comments": 50,
-                        "like_to_view_ratio": 0.033,
-                        "comment_to_view_ratio": 0.003
-                    },
-                    "collected_at": (datetime.now() - timedelta(days=2)).isoformat()
+    def _spend(self, endpoint: str):
+        units = QUOTA_COSTS[endpoint]
+        self.quota_used += units
+        YOUTUBE_QUOTA_UNITS_TOTAL.labels(endpoint=endpoint).inc(units)
+
+    def _can_search(self, ids_so_far: int) -> bool:
+        # Another search page must leave room for the detail calls of every id it may return
+        needed = QUOTA_COSTS["search"] + _detail_calls(ids_so_far + SEARCH_PAGE_SIZE) * QUOTA_COSTS["videos"]
+        return self.quota_used + needed <= self.quota_budget
+
+    def _has_key(self) -> bool:
+        return bool(self.api_key) and self.api_key != "YOUR_YT_KEY"
+
+    def _mock_items(self, region: str) -> List[Dict[str, Any]]:
+        print("Warning: No valid YOUTUBE_API_KEY found. Returning MOCK data for verification.")
+        from datetime import datetime, timedelta
+        # Mock data for demonstration
+        return [
+            {
+                "platform": "YouTube",
+                "source_id": "mock_yt_1",
+                "source_url": "https://www.youtube.com/watch?v=mock1",
+                "workflow": "Automating Email with n8n (Mock)",
+                "normalized_title": "automating email with n8n",
+                "country": region,
+                "popularity_metrics": {
+                    "views": 15000,
+                    "likes": 500,
+                    "comments": 50,
+                    "like_to_view_ratio": 0.033,
+                    "comment_to_view_ratio": 0.003
                 },
-                {
-                    "platform": "YouTube",
-                    "source_id": "mock_yt_2",
-                    "source_url": "https://www.youtube.com/watch?v=mock2",
-                    "workflow": "n8n Webhook Tutorial (Mock)",
-                    "normalized_title": "n8n webhook tutorial",
-                    "country": region,
-                    "popularity_metrics": {
-                        "views": 8200,
-                        "likes": 300,
-                        "comments": 20,
-                        "like_to_view_ratio": 0.036,
-                        "comment_to_view_ratio": 0.002
-                    },
-                    "collected_at": (datetime.now() - timedelta(days=5)).isoformat()
-                }
-            ]
-
-        url = f"{self.BASE_URL}/search"
+                "collected_at": (datetime.now() - timedelta(days=2)).isoformat()
+            },
+            {
+                "platform": "YouTube",
+                "source_id": "mock_yt_2",
+                "source_url": "https://www.youtube.com/watch?v=mock2",
+                "workflow": "n8n Webhook Tutorial (Mock)",
+                "normalized_title": "n8n webhook tutorial",
+                "country": region,
+                "popularity_metrics": {
+                    "views": 8200,
+                    "likes": 300,
+                    "comments": 20,
+                    "like_to_view_ratio": 0.036,
+                    "comment_to_view_ratio": 0.002
+                },
+                "collected_at": (datetime.now() - timedelta(days=5)).isoformat()
+            }
+        ]
+
+    def _search_params(self, query: str, region: str, max_results: int, page_token: str = None) -> Dict[str, Any]:
         params = {
             "part": "id,snippet",
             "q": query,
             "type": "video",
-            "maxResults": max_results,
+            "maxResults": min(max_results, SEARCH_PAGE_SIZE),
             "regionCode": region,
             "key": self.api_key
         }
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        
+        if page_token:
+            params["pageToken"] = page_token
+        return params
+
+    @staticmethod
+    def _video_ids(data: Dict[str, Any]) -> List[str]:
         items = data.get("items", [])
-        video_ids = [item["id"]["videoId"] for item in items if "videoId" in item.get("id", {})]
-        
-        return self.get_video_details(video_ids, region)
+        return [item["id"]["videoId"] for item in items if "videoId" in item.get("id", {})]
 
-    @backoff.on_exception(backoff.expo, requests.exceptions.RequestException, max_tries=3)
-    def get_video_details(self, video_ids: List[str], region: str) -> List[Dict[str, Any]]:
-        if not video_ids:
-            return []
-            
-        url = f"{self.BASE_URL}/videos"
-        # Batching logic should happen upstream if > 50, but here we assume batch fits
-        params = {
+    def _details_params(self, video_ids: List[str]) -> Dict[str, Any]:
+        return {
             "part": "statistics,snippet",
             "id": ",".join(video_ids),
             "key": self.api_key
         }
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        
+
+    def _to_items(self, data: Dict[str, Any], region: str) -> List[Dict[str, Any]]:
+        videos = data.get("items", [])
+        # Normalize the whole page at once
+        titles = normalize_titles(item["snippet"]["title"] for item in videos)
+        ratios = compute_ratios_batch(
+            (
+                item["statistics"].get("viewCount", 0),
+                item["statistics"].get("likeCount", 0),
+                item["statistics"].get("commentCount", 0),
+            )
+            for item in videos
+        )
+
         results = []
-        for item in data.get("items", []):
-            stats = item["statistics"]
+        for item, normalized_title, metrics in zip(videos, titles, ratios):
             snippet = item["snippet"]
-            
-            metrics = compute_ratios(
-                stats.get("viewCount", 0),
-                stats.get("likeCount", 0),
-                stats.get("commentCount", 0)
-            )
-            
+
             # Canonical format
             results.append({
                 "platform": "YouTube",
                 "source_id": item["id"],
                 "source_url": f"https://www.youtube.com/watch?v={item['id']}",
                 "workflow": snippet["title"],
-                "normalized_title": normalize_title(snippet["title"]),
+                "normalized_title": normalized_title,
                 "country": region,
-                "popularity_metrics": metrics,
+                "popularity_metrics": ratios_to_dict(metrics),
                 # "latest_metrics" will be same as popularity initially
                 "collected_at": snippet["publishedAt"] # Approximate 'first_seen' or just payload time
             })
-            
+
+        return results
+
+    @backoff.on_exception(backoff.expo, requests.exceptions.RequestException, max_tries=3)
+    def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        with FETCH_LATENCY_SECONDS.labels(platform="YouTube", endpoint=path).time():
+            resp = self.session.get(f"{self.base_url}/{path}", params=params)
+        # Rejected calls are billed too
+        self._spend(path)
+        resp.raise_for_status()
+        return resp.json()
+
+    def search_video_ids(self, query: str = "n8n automation", region: str = "US", max_results: int = 50) -> List[str]:
+        """Follow nextPageToken until max_results ids or the quota budget is reached."""
+        video_ids: List[str] = []
+        page_token = None
+        while len(video_ids) < max_results and self._can_search(len(video_ids)):
+            data = self._get("search", self._search_params(query, region, max_results - len(video_ids), page_token))
+            video_ids.extend(self._video_ids(data))
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+        return list(dict.fromkeys(video_ids))[:max_results]
+
+    def search_videos(self, query: str = "n8n automation", region: str = "US", max_results: int = 50) -> List[Dict[str, Any]]:
+        if not self._has_key():
+            return self._mock_items(region)
+
+        return self.get_video_details(self.search_video_ids(query, region, max_results), region)
+
+    def get_video_details(self, video_ids: List[str], region: str) -> List[Dict[str, Any]]:
+        results = []
+        for start in range(0, len(video_ids), VIDEO_DETAILS_BATCH):
+            batch = video_ids[start:start + VIDEO_DETAILS_BATCH]
+            results.extend(self._to_items(self._get("videos", self._details_params(batch)), region))
+        return results
+
+    @backoff.on_exception(backoff.expo, httpx.HTTPError, max_tries=3)
+    async def _aget(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        http = self.http or get_http()
+        with FETCH_LATENCY_SECONDS.labels(platform="YouTube", endpoint=path).time():
+            resp = await http.get(f"{self.base_url}/{path}", params=params)
+        # Rejected calls are billed too
+        self._spend(path)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def asearch_video_ids(self, query: str = "n8n automation", region: str = "US", max_results: int = 50) -> List[str]:
+        """Async variant of search_video_ids. Pages depend on the previous
+        page's token, so they are necessarily fetched one after another."""
+        video_ids: List[str] = []
+        page_token = None
+        while len(video_ids) < max_results and self._can_search(len(video_ids)):
+            data = await self._aget("search", self._search_params(query, region, max_results - len(video_ids), page_token))
+            video_ids.extend(self._video_ids(data))
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+        return list(dict.fromkeys(video_ids))[:max_results]
+
+    async def asearch_videos(self, query: str = "n8n automation", region: str = "US", max_results: int = 50) -> List[Dict[str, Any]]:
+        """Async variant of search_videos."""
+        if not self._has_key():
+            return self._mock_items(region)
+
+        video_ids = await self.asearch_video_ids(query, region, max_results)
+        return await self.aget_video_details(video_ids, region)
+
+    async def aget_video_details(self, video_ids: List[str], region: str) -> List[Dict[str, Any]]:
+        """Fetch details in 50-id batches, all batches in parallel."""
+        batches = [video_ids[i:i + VIDEO_DETAILS_BATCH] for i in range(0, len(video_ids), VIDEO_DETAILS_BATCH)]
+        pages = await asyncio.gather(*(self._aget("videos", self._details_params(b)) for b in batches))
+
+        results = []
+        for data in pages:
+            results.extend(self._to_items(data, region))
         return results
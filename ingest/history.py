@@ -0,0 +1,121 @@
+import os
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Sequence, Tuple
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from api.db.base import AsyncSessionLocal
+from api.db.models import IngestWatermark, WorkflowMetricSnapshot
+
+# Keep every observation this long, afterwards only the last one per day
+SNAPSHOT_RAW_DAYS = int(os.getenv("SNAPSHOT_RAW_DAYS", 30))
+# Monthly partitions older than this are dropped
+SNAPSHOT_RETENTION_MONTHS = int(os.getenv("SNAPSHOT_RETENTION_MONTHS", 24))
+# How far back each compaction run looks, should cover the gap between runs
+SNAPSHOT_COMPACT_WINDOW_DAYS = int(os.getenv("SNAPSHOT_COMPACT_WINDOW_DAYS", 7))
+
+TABLE_NAME = WorkflowMetricSnapshot.__tablename__
+# ingest_watermarks row stamped by every compaction, history ETags include it
+COMPACTION_STAMP_SOURCE = "snapshot_compaction"
+
+logger = logging.getLogger(__name__)
+
+# Months whose partition this process already created
+_ensured_months = set()
+
+def _month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+def _add_months(d: date, months: int) -> date:
+    month = d.month - 1 + months
+    return date(d.year + month // 12, month % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"{TABLE_NAME}_{month:%Y%m}"
+
+async def ensure_partitions(session, around: datetime = None, months_ahead: int = 1):
+    """Create the monthly partitions for ``around`` and the following months."""
+    start = _month_start((around or datetime.now(timezone.utc)).date())
+    for offset in range(months_ahead + 1):
+        month = _add_months(start, offset)
+        if month in _ensured_months:
+            continue
+        # IF NOT EXISTS is not safe against a concurrent CREATE (pg_type unique
+        # violation), serialize the DDL across processes until commit
+        await session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": partition_name(month)})
+        await session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE_NAME} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        ))
+        _ensured_months.add(month)
+
+async def record_snapshots(session, rows: Iterable[Tuple[int, dict]], collected_at: datetime):
+    """Append one snapshot per (workflow_id, metrics) row in a single statement."""
+    values = [
+        {"workflow_id": workflow_id, "collected_at": collected_at, "metrics": metrics}
+        for workflow_id, metrics in rows
+    ]
+    if not values:
+        return
+    # Re-delivered batches carry the same collected_at and are ignored
+    await session.execute(insert(WorkflowMetricSnapshot).values(values).on_conflict_do_nothing())
+
+async def _list_partitions(session) -> List[str]:
+    result = await session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent"
+    ), {"parent": TABLE_NAME})
+    return [row[0] for row in result]
+
+def _expired(names: Sequence[str], cutoff: date) -> List[str]:
+    expired = []
+    for name in names:
+        suffix = name[len(TABLE_NAME) + 1:]
+        try:
+            month = datetime.strptime(suffix, "%Y%m").date()
+        except ValueError:
+            continue
+        if _add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return expired
+
+async def compact_snapshots(now: datetime = None) -> dict:
+    """Downsample old snapshots to one per day and drop expired partitions."""
+    now = now or datetime.now(timezone.utc)
+    raw_cutoff = now - timedelta(days=SNAPSHOT_RAW_DAYS)
+    window_start = raw_cutoff - timedelta(days=SNAPSHOT_COMPACT_WINDOW_DAYS)
+    retention_cutoff = _add_months(_month_start(now.date()), -SNAPSHOT_RETENTION_MONTHS)
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(text(f"""
+            DELETE FROM {TABLE_NAME} s
+            USING (
+                SELECT workflow_id, collected_at,
+                       row_number() OVER (
+                           PARTITION BY workflow_id, date_trunc('day', collected_at)
+                           ORDER BY collected_at DESC
+                       ) AS rn
+                FROM {TABLE_NAME}
+                WHERE collected_at >= :window_start AND collected_at < :raw_cutoff
+            ) d
+            WHERE s.workflow_id = d.workflow_id
+              AND s.collected_at = d.collected_at
+              AND d.rn > 1
+        """), {"window_start": window_start, "raw_cutoff": raw_cutoff})
+        downsampled = result.rowcount
+
+        dropped = _expired(await _list_partitions(session), retention_cutoff)
+        for name in dropped:
+            await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+        await ensure_partitions(session, now)
+        stmt = insert(IngestWatermark).values(source=COMPACTION_STAMP_SOURCE, high_water=func.now())
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["source"], set_={"high_water": func.now(), "updated_at": func.now()},
+        ))
+        await session.commit()
+
+    logger.info(f"Downsampled {downsampled} snapshots, dropped partitions {dropped}")
+    return {"downsampled": downsampled, "dropped_partitions": dropped}
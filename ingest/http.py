@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+# Requests in flight at once across all hosts
+HTTP_CONCURRENCY = int(os.getenv("HTTP_CONCURRENCY", 8))
+# Requests per second per host, e.g. "forum.n8n.io=4,www.googleapis.com=20"
+HTTP_RATE_LIMITS = os.getenv("HTTP_RATE_LIMITS", "")
+HTTP_DEFAULT_RATE_LIMIT = float(os.getenv("HTTP_DEFAULT_RATE_LIMIT", 10))
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    limits = {}
+    for part in spec.split(","):
+        if "=" in part:
+            host, rate = part.split("=", 1)
+            limits[host.strip()] = float(rate)
+    return limits
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1/rate seconds apart."""
+
+    def __init__(self, limits: Dict[str, float] = None, default: float = HTTP_DEFAULT_RATE_LIMIT):
+        self.limits = limits if limits is not None else parse_rate_limits(HTTP_RATE_LIMITS)
+        self.default = default
+        self._next_slot: Dict[str, float] = {}
+
+    async def acquire(self, host: str):
+        rate = self.limits.get(host, self.default)
+        if rate <= 0:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + 1.0 / rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class AsyncHttp:
+    """Pooled async HTTP client with a global concurrency cap and per-host rate limits."""
+
+    def __init__(
+        self,
+        concurrency: int = HTTP_CONCURRENCY,
+        rate_limiter: HostRateLimiter = None,
+        transport: httpx.AsyncBaseTransport = None,
+        timeout: float = HTTP_TIMEOUT,
+    ):
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+            transport=transport,
+        )
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        async with self._semaphore:
+            await self.rate_limiter.acquire(urlsplit(url).netloc)
+            return await self.client.get(url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+# One shared client per event loop, httpx connections cannot cross loops
+_shared: Optional[AsyncHttp] = None
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_http() -> AsyncHttp:
+    global _shared, _shared_loop
+    loop = asyncio.get_running_loop()
+    if _shared is None or _shared_loop is not loop:
+        _shared = AsyncHttp()
+        _shared_loop = loop
+    return _shared
+
+async def close_http():
+    global _shared, _shared_loop
+    if _shared is not None and _shared_loop is asyncio.get_running_loop():
+        await _shared.aclose()
+    _shared = None
+    _shared_loop = None
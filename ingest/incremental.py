@@ -0,0 +1,74 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from api.db.base import AsyncSessionLocal
+from api.db.models import IngestWatermark, Workflow
+
+# Keeps the IN lists of filter_changed() to a sane size
+LOOKUP_CHUNK_SIZE = 1000
+
+@dataclass
+class Watermark:
+    source: str
+    high_water: Optional[datetime] = None
+    last_id: Optional[int] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    # fromisoformat() only understands a trailing "Z" from Python 3.11 on
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+async def load_watermark(source: str) -> Watermark:
+    async with AsyncSessionLocal() as session:
+        row = await session.get(IngestWatermark, source)
+    if row is None:
+        return Watermark(source)
+    return Watermark(source, row.high_water, row.last_id, row.etag, row.last_modified)
+
+async def save_watermark(mark: Watermark):
+    values = {
+        "source": mark.source,
+        "high_water": mark.high_water,
+        "last_id": mark.last_id,
+        "etag": mark.etag,
+        "last_modified": mark.last_modified,
+    }
+    stmt = insert(IngestWatermark).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["source"],
+        set_={k: stmt.excluded[k] for k in values if k != "source"},
+    )
+    async with AsyncSessionLocal() as session:
+        await session.execute(stmt)
+        await session.commit()
+
+async def filter_changed(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop items whose metrics equal what is already stored for that row."""
+    by_platform = defaultdict(list)
+    for item in items:
+        by_platform[item["platform"]].append(item)
+
+    stored: Dict[tuple, Any] = {}
+    async with AsyncSessionLocal() as session:
+        for platform, platform_items in by_platform.items():
+            source_ids = [i["source_id"] for i in platform_items if i.get("source_id") is not None]
+            for start in range(0, len(source_ids), LOOKUP_CHUNK_SIZE):
+                result = await session.execute(
+                    select(Workflow.source_id, Workflow.latest_metrics).where(
+                        Workflow.platform == platform,
+                        Workflow.source_id.in_(source_ids[start:start + LOOKUP_CHUNK_SIZE]),
+                    )
+                )
+                for source_id, metrics in result:
+                    stored[(platform, source_id)] = metrics
+
+    return [
+        item for item in items
+        if stored.get((item["platform"], item.get("source_id"))) != item["popularity_metrics"]
+    ]
@@ -0,0 +1,113 @@
+import os
+import logging
+from sqlalchemy import column, func, table, text
+from sqlalchemy.dialects.postgresql import insert
+from api.db.base import AsyncSessionLocal
+from api.db.models import IngestWatermark
+from api.cache import bump_data_version
+
+# Entries kept per leaderboard, baked into the view when it is created and
+# recorded in its comment so a changed size rebuilds it
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", 100))
+
+VIEW_NAME = "workflow_leaderboards"
+
+# ingest_watermarks row recording the last refresh, the API derives ETags from it
+STAMP_SOURCE = "leaderboards"
+
+# Scope value standing for "any platform" / "any country"
+ALL = "*"
+
+logger = logging.getLogger(__name__)
+
+# Size this process already checked the view against
+_ensured_size = None
+
+# Query construct for reads; the view is not part of Base.metadata
+leaderboards = table(
+    VIEW_NAME,
+    column("scope_platform"),
+    column("scope_country"),
+    column("rank"),
+    column("workflow_id"),
+    column("platform"),
+    column("country"),
+    column("workflow"),
+    column("source_url"),
+    column("canonical_id"),
+    column("score"),
+    column("last_seen"),
+)
+
+def view_sql(size: int = LEADERBOARD_SIZE) -> str:
+    # Every row is ranked in four scopes: its (platform, country), its platform,
+    # its country and globally. Rows without a country only rank in the wider scopes.
+    return f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {VIEW_NAME} AS
+        WITH base AS (
+            SELECT id, platform, country, workflow, source_url, canonical_id, score, last_seen FROM workflows
+        ), scoped AS (
+            SELECT platform AS scope_platform, country AS scope_country, * FROM base WHERE country IS NOT NULL
+            UNION ALL
+            SELECT platform, '{ALL}', * FROM base
+            UNION ALL
+            SELECT '{ALL}', country, * FROM base WHERE country IS NOT NULL
+            UNION ALL
+            SELECT '{ALL}', '{ALL}', * FROM base
+        ), ranked AS (
+            SELECT scoped.*,
+                   row_number() OVER (
+                       PARTITION BY scope_platform, scope_country
+                       ORDER BY score DESC, id DESC
+                   ) AS rank
+            FROM scoped
+        )
+        SELECT scope_platform, scope_country, rank::int AS rank,
+               id AS workflow_id, platform, country, workflow, source_url, canonical_id, score, last_seen
+        FROM ranked
+        WHERE rank <= {int(size)}
+    """
+
+def size_comment(size: int) -> str:
+    return f"size={int(size)}"
+
+async def ensure_leaderboards(conn, size: int = LEADERBOARD_SIZE):
+    """Create the leaderboard view and the unique index REFRESH ... CONCURRENTLY needs.
+
+    A view built for another size (or by an older schema.sql, without a
+    comment) is dropped and recreated with ``size`` rows per scope.
+    """
+    global _ensured_size
+    # The API and the workers may both get here on a fresh database
+    await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": VIEW_NAME})
+    result = await conn.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL AS present, obj_description(to_regclass(:name), 'pg_class') AS comment"),
+        {"name": VIEW_NAME},
+    )
+    present, comment = result.one()
+    if present and comment != size_comment(size):
+        logger.info(f"Rebuilding {VIEW_NAME} for LEADERBOARD_SIZE={size} (was {comment or 'unknown'})")
+        await conn.execute(text(f"DROP MATERIALIZED VIEW {VIEW_NAME}"))
+    await conn.execute(text(view_sql(size)))
+    await conn.execute(text(f"COMMENT ON MATERIALIZED VIEW {VIEW_NAME} IS '{size_comment(size)}'"))
+    await conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{VIEW_NAME}_scope_rank "
+        f"ON {VIEW_NAME} (scope_platform, scope_country, rank)"
+    ))
+    _ensured_size = size
+
+async def refresh_leaderboards():
+    """Recompute the leaderboards without blocking readers of the view."""
+    async with AsyncSessionLocal() as session:
+        # A worker can get here before the API ever started on this database
+        if _ensured_size != LEADERBOARD_SIZE:
+            await ensure_leaderboards(session)
+        await session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {VIEW_NAME}"))
+        stmt = insert(IngestWatermark).values(source=STAMP_SOURCE, high_water=func.now())
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["source"], set_={"high_water": func.now(), "updated_at": func.now()},
+        ))
+        await session.commit()
+    # Cached /leaderboards responses predate the refresh
+    await bump_data_version()
+    logger.info("Refreshed leaderboards")
@@ -1,7 +1,76 @@
-from prometheus_client import start_http_server, Counter, Summary
+import os
+from sqlalchemy import event
+from prometheus_client import start_http_server, Counter, Histogram, CollectorRegistry, REGISTRY, multiprocess
 import time
 
+# Set by the process manager for prefork Celery / multi-worker uvicorn. Every
+# process then writes its samples to files in this directory, and whoever
+# serves /metrics aggregates them. The directory must be emptied on deploy.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Long running tasks: seconds to half an hour
+TASK_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+# Single statements and HTTP round trips
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
 # Define metrics
 FETCH_COUNT_TOTAL = Counter('ingest_fetch_count_total', 'Total number of items fetched', ['platform'])
 FETCH_FAILURES_TOTAL = Counter('ingest_fetch_failures_total', 'Total number of fetch failures', ['platform'])
-TASK_DURATION_SECONDS = Summary('celery_task_duration_seconds', 'Time spent processing celery tasks', ['task_name'])
+TASK_DURATION_SECONDS = Histogram('celery_task_duration_seconds', 'Time spent processing celery tasks', ['task_name'], buckets=TASK_BUCKETS)
+YOUTUBE_QUOTA_UNITS_TOTAL = Counter('ingest_youtube_quota_units_total', 'YouTube Data API quota units spent', ['endpoint'])
+
+FETCH_LATENCY_SECONDS = Histogram(
+    'ingest_fetch_latency_seconds', 'Latency of one upstream page/batch request', ['platform', 'endpoint'],
+    buckets=LATENCY_BUCKETS,
+)
+UPSERT_BATCH_SIZE = Histogram('ingest_upsert_batch_size', 'Rows per upsert statement', buckets=BATCH_SIZE_BUCKETS)
+UPSERT_DURATION_SECONDS = Histogram(
+    'ingest_upsert_duration_seconds', 'Time to upsert, snapshot, cluster and commit one chunk',
+    buckets=LATENCY_BUCKETS,
+)
+SEARCH_LATENCY_SECONDS = Histogram(
+    'opensearch_request_latency_seconds', 'Latency of OpenSearch requests', ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_STATEMENT_SECONDS = Histogram(
+    'db_statement_duration_seconds', 'Latency of SQL statements by verb', ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'API request latency by route template', ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+
+def metrics_registry():
+    """Registry to expose: the per-process default one, or an aggregate of
+    every process's samples in multiprocess mode."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def mark_process_dead(pid: int):
+    # Drops the exited process's live-only samples (gauges), histograms stay
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+def _operation(statement: str) -> str:
+    verb = statement.split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+def instrument_engine(engine):
+    """Record the latency of every statement run through ``engine``."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._statement_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_statement_start", None)
+        if start is not None:
+            DB_STATEMENT_SECONDS.labels(operation=_operation(statement)).observe(time.perf_counter() - start)
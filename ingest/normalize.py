@@ -1,23 +1,55 @@
+import os
 import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+_WHITESPACE_RE = re.compile(r'\s+')
+# Durations like 12:34
+_DURATION_RE = re.compile(r'\d{1,2}:\d{2}')
+
+# Titles repeat across regions and runs, cache their normalized form
+NORMALIZE_CACHE_SIZE = int(os.getenv("NORMALIZE_CACHE_SIZE", 65536))
+
+# Field order of the tuples returned by compute_ratios_batch
+RATIO_FIELDS = ("views", "likes", "comments", "like_to_view_ratio", "comment_to_view_ratio")
+
+Ratios = Tuple[int, int, int, float, float]
 
 def normalize_title(title: str) -> str:
     if not title:
         return ""
     t = title.strip().lower()
-    t = re.sub(r'\s+', ' ', t)
+    t = _WHITESPACE_RE.sub(' ', t)
     # Remove durations like 12:34
-    t = re.sub(r'\d{1,2}:\d{2}', '', t)
+    t = _DURATION_RE.sub('', t)
     return t.strip()
 
-def compute_ratios(views, likes, comments):
+_normalize_cached = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(normalize_title)
+
+def normalize_titles(titles: Iterable[str], cache: bool = True) -> List[str]:
+    """normalize_title over many titles, memoized in a shared LRU by default."""
+    normalize = _normalize_cached if cache else normalize_title
+    return [normalize(t) for t in titles]
+
+def _ratios(views, likes, comments) -> Ratios:
     views = int(views) if views else 0
     likes = int(likes) if likes else 0
     comments = int(comments) if comments else 0
-    
-    return {
-       "views": views,
-       "likes": likes,
-       "comments": comments,
-       "like_to_view_ratio": round(likes / views, 6) if views else 0,
-       "comment_to_view_ratio": round(comments / views, 6) if views else 0
-    }
+
+    return (
+        views,
+        likes,
+        comments,
+        round(likes / views, 6) if views else 0,
+        round(comments / views, 6) if views else 0,
+    )
+
+def compute_ratios(views, likes, comments):
+    return dict(zip(RATIO_FIELDS, _ratios(views, likes, comments)))
+
+def compute_ratios_batch(rows: Iterable[Sequence[Any]]) -> List[Ratios]:
+    """compute_ratios over (views, likes, comments) rows, as RATIO_FIELDS tuples."""
+    return [_ratios(views, likes, comments) for views, likes, comments in rows]
+
+def ratios_to_dict(ratios: Ratios) -> Dict[str, Any]:
+    return dict(zip(RATIO_FIELDS, ratios))
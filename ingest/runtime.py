@@ -0,0 +1,52 @@
+import os
+import asyncio
+import logging
+from celery.signals import worker_process_init, worker_process_shutdown
+from api.db.base import reset_engines, dispose_engines
+from ingest.http import close_http
+
+logger = logging.getLogger(__name__)
+
+# One event loop per worker process. Pooled DB connections and the shared
+# HTTP client are bound to the loop that opened them, so reusing the loop
+# across tasks lets them be reused too instead of reconnecting every run.
+_loop = None
+_loop_pid = None
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        _loop = asyncio.new_event_loop()
+        _loop_pid = os.getpid()
+    return _loop
+
+def run_async(coro):
+    """Run ``coro`` to completion on this process's persistent loop."""
+    return get_loop().run_until_complete(coro)
+
+async def _shutdown():
+    await close_http()
+    await dispose_engines()
+
+def shutdown_loop():
+    global _loop
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        return
+    try:
+        _loop.run_until_complete(_shutdown())
+    finally:
+        _loop.close()
+        _loop = None
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    # Connections in the pool were opened by the parent, never share them
+    reset_engines()
+    get_loop()
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    try:
+        shutdown_loop()
+    except Exception as e:
+        logger.error(f"Failed to shut down worker event loop: {e}")
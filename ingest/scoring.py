@@ -0,0 +1,90 @@
+import logging
+import numpy as np
+from typing import Any, Dict, Iterable, List
+from sqlalchemy import select, update
+from api.db.base import AsyncSessionLocal
+from api.db.models import Workflow
+from ingest.clustering import refresh_cluster_stats
+
+logger = logging.getLogger(__name__)
+
+# Score = (Views * 0.1) + (Likes * 2) + (Replies * 5) + (TrendScore * 10)
+SIGNALS = ("views", "likes", "comments", "trend_score")
+
+DEFAULT_WEIGHTS = {"views": 0.1, "likes": 2.0, "comments": 5.0, "trend_score": 10.0}
+
+PLATFORM_WEIGHTS = {
+    # Trends "views" are synthetic (trend_score * 100), only count the trend score once
+    "GoogleTrends": {"views": 0.0, "likes": 0.0, "comments": 0.0, "trend_score": 10.0},
+}
+
+def platform_weights(platform: str) -> Dict[str, float]:
+    return PLATFORM_WEIGHTS.get(platform, DEFAULT_WEIGHTS)
+
+def _signal(metrics: Dict[str, Any], name: str) -> float:
+    value = metrics.get(name) if metrics else None
+    return float(value) if value else 0.0
+
+def score_metrics(platform: str, metrics: Dict[str, Any]) -> float:
+    """Score a single row from its compute_ratios() style metrics."""
+    weights = platform_weights(platform)
+    return round(sum(weights[name] * _signal(metrics, name) for name in SIGNALS), 4)
+
+def score_batch(platforms: Iterable[str], metrics: Iterable[Dict[str, Any]]) -> np.ndarray:
+    """Vectorized equivalent of score_metrics() over many rows."""
+    platforms = list(platforms)
+    metrics = list(metrics)
+    if not platforms:
+        return np.zeros(0)
+
+    signals = np.array([[_signal(m, name) for name in SIGNALS] for m in metrics], dtype=np.float64)
+
+    # Build the per-row weight matrix from one weight vector per distinct platform
+    names, inverse = np.unique(np.array(platforms, dtype=object), return_inverse=True)
+    table = np.array([[platform_weights(p)[name] for name in SIGNALS] for p in names], dtype=np.float64)
+
+    return np.round((signals * table[inverse]).sum(axis=1), 4)
+
+async def rebuild_scores(batch_size: int = 5000) -> int:
+    """Recompute the score of every row, e.g. after the formula changed.
+
+    Walks the table in primary key order, scoring each batch with NumPy and
+    writing it back with a single executemany UPDATE. The clusters of each
+    batch are refreshed with it, so their total_score/max_score follow.
+    """
+    total = 0
+    last_id = 0
+
+    async with AsyncSessionLocal() as session:
+        while True:
+            result = await session.execute(
+                select(
+                    Workflow.id, Workflow.platform, Workflow.latest_metrics, Workflow.popularity_metrics,
+                    Workflow.canonical_id,
+                )
+                .where(Workflow.id > last_id)
+                .order_by(Workflow.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+
+            scores = score_batch(
+                (row.platform for row in rows),
+                (row.latest_metrics or row.popularity_metrics for row in rows),
+            )
+            params: List[Dict[str, Any]] = [
+                {"id": row.id, "score": float(score)} for row, score in zip(rows, scores)
+            ]
+            await session.execute(update(Workflow), params)
+            # Clusters spanning several batches are refreshed again with each
+            # one, the last refresh sees every member rescored
+            await refresh_cluster_stats(session, (row.canonical_id for row in rows))
+            await session.commit()
+
+            total += len(rows)
+            last_id = rows[-1].id
+            logger.info(f"Rescored {total} workflows")
+
+    return total
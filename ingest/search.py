@@ -1,6 +1,11 @@
 import os
+import asyncio
+import logging
 import backoff
-from opensearchpy import OpenSearch, RequestsHttpConnection
+from typing import Any, Dict, List, Optional, Tuple
+from opensearchpy import AsyncOpenSearch, OpenSearch, RequestsHttpConnection
+from ingest.scoring import score_metrics
+from ingest.metrics import SEARCH_LATENCY_SECONDS
 
 host = os.getenv("OPENSEARCH_HOST", "localhost")
 port = int(os.getenv("OPENSEARCH_PORT", 9200))
@@ -17,43 +22,259 @@ client = OpenSearch(
 
 INDEX_NAME = "n8n_workflows"
 
+# Refreshes are left to the index instead of forcing one per request
+REFRESH_INTERVAL = os.getenv("OPENSEARCH_REFRESH_INTERVAL", "30s")
+BULK_MAX_DOCS = int(os.getenv("OPENSEARCH_BULK_MAX_DOCS", 500))
+BULK_FLUSH_INTERVAL = float(os.getenv("OPENSEARCH_BULK_FLUSH_INTERVAL", 5))
+BULK_MAX_RETRIES = int(os.getenv("OPENSEARCH_BULK_MAX_RETRIES", 3))
+
+logger = logging.getLogger(__name__)
+
+def get_async_client() -> AsyncOpenSearch:
+    return AsyncOpenSearch(
+        hosts=[{'host': host, 'port': port}],
+        http_auth=auth,
+        use_ssl=False,
+        verify_certs=False,
+    )
+
 def create_index():
-    if not client.indices.exists(index=INDEX_NAME):
+    if client.indices.exists(index=INDEX_NAME):
+        # Indices created before workflow_id existed would map it dynamically,
+        # add it explicitly (a no-op when already mapped)
+        client.indices.put_mapping(index=INDEX_NAME, body={"properties": {"workflow_id": {"type": "long"}}})
+    else:
         client.indices.create(index=INDEX_NAME, body={
             "settings": {
                 "index": {
                     "number_of_shards": 1,
-                    "number_of_replicas": 0
+                    "number_of_replicas": 0,
+                    "refresh_interval": REFRESH_INTERVAL
                 }
             },
             "mappings": {
                 "properties": {
+                    "workflow_id": {"type": "long"},
                     "workflow": {"type": "text"},
+                    "normalized_title": {"type": "text"},
                     "description": {"type": "text"},
                     "platform": {"type": "keyword"},
                     "score": {"type": "float"},
-                    "country": {"type": "keyword"}
+                    "country": {"type": "keyword"},
+                    "last_seen": {"type": "date"}
                 }
             }
         })
 
-@backoff.on_exception(backoff.expo, Exception, max_tries=3)
-def index_item(item: dict):
+def build_document(item: dict) -> Tuple[str, Dict[str, Any]]:
     # Doc ID is platform + source_id
     doc_id = f"{item['platform']}-{item['source_id']}"
-    
+
     doc = {
+        # Postgres primary key, lets search hits be resolved against the table
+        "workflow_id": item.get("id"),
         "workflow": item["workflow"],
         "normalized_title": item.get("normalized_title"),
         "platform": item["platform"],
         "country": item.get("country"),
-        "score": item.get("popularity_metrics", {}).get("views", 0), # Simplified score
+        "score": score_metrics(item["platform"], item.get("popularity_metrics", {})),
         "last_seen": item.get("collected_at")
     }
-    
+    return doc_id, doc
+
+@backoff.on_exception(backoff.expo, Exception, max_tries=3)
+def index_item(item: dict):
+    doc_id, doc = build_document(item)
+
     client.index(
         index=INDEX_NAME,
         body=doc,
-        id=doc_id,
-        refresh=True
+        id=doc_id
     )
+
+class BulkIndexer:
+    """Buffers documents and ships them through the ``_bulk`` API.
+
+    The buffer is flushed once it holds ``max_docs`` documents, every
+    ``flush_interval`` seconds while the indexer is open, and on close.
+    Documents rejected with a retryable status are retried up to
+    ``max_retries`` times; anything still failing ends up in ``dead_letters``.
+    """
+
+    RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenSearch] = None,
+        index: str = INDEX_NAME,
+        max_docs: int = BULK_MAX_DOCS,
+        flush_interval: float = BULK_FLUSH_INTERVAL,
+        max_retries: int = BULK_MAX_RETRIES,
+        retry_backoff: float = 0.5,
+    ):
+        self._owns_client = client is None
+        self.client = client or get_async_client()
+        self.index = index
+        self.max_docs = max_docs
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letters: List[Dict[str, Any]] = []
+        self.indexed = 0
+        self._buffer: List[Tuple[str, Dict[str, Any]]] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def start(self):
+        if self._timer is None and self.flush_interval > 0:
+            self._timer = asyncio.create_task(self._periodic_flush())
+
+    async def add(self, item: dict):
+        self._buffer.append(build_document(item))
+        if len(self._buffer) >= self.max_docs:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            docs, self._buffer = self._buffer, []
+            if docs:
+                await self._send(docs)
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+        await self.flush()
+        if self._owns_client:
+            await self.client.close()
+
+    async def _periodic_flush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Periodic bulk flush failed: {e}")
+
+    async def _send(self, docs: List[Tuple[str, Dict[str, Any]]]):
+        pending = docs
+        errors: Dict[str, Any] = {}
+
+        for attempt in range(self.max_retries + 1):
+            body = []
+            for doc_id, doc in pending:
+                body.append({"index": {"_index": self.index, "_id": doc_id}})
+                body.append(doc)
+
+            retry = []
+            try:
+                with SEARCH_LATENCY_SECONDS.labels(operation="bulk").time():
+                    resp = await self.client.bulk(body=body)
+            except Exception as e:
+                # Transport level failure: the whole request can be retried
+                retry = pending
+                errors = {doc_id: str(e) for doc_id, _ in pending}
+            else:
+                for (doc_id, doc), info in zip(pending, self._results(pending, resp)):
+                    if info is None:
+                        # No result for this document, it may or may not be indexed
+                        retry.append((doc_id, doc))
+                        errors[doc_id] = "missing from the bulk response"
+                        continue
+                    status = info.get("status", 200)
+                    if status < 300:
+                        self.indexed += 1
+                    elif status in self.RETRYABLE_STATUSES:
+                        retry.append((doc_id, doc))
+                        errors[doc_id] = info.get("error")
+                    else:
+                        self._dead_letter(doc_id, doc, info.get("error"))
+
+            if not retry:
+                return
+            pending = retry
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+        for doc_id, doc in pending:
+            self._dead_letter(doc_id, doc, errors.get(doc_id))
+
+    @staticmethod
+    def _results(pending: List[Tuple[str, Dict[str, Any]]], resp: Dict[str, Any]) -> List[Optional[Dict[str, Any]]]:
+        """Per-document results of a bulk response, in ``pending`` order.
+
+        Items normally line up with the request. When their count is off they
+        are matched by _id instead, documents without one get None.
+        """
+        infos = [item.get("index", {}) for item in resp.get("items") or []]
+        if len(infos) == len(pending):
+            return infos
+        by_id = {info.get("_id"): info for info in infos}
+        return [by_id.get(doc_id) for doc_id, _ in pending]
+
+    def _dead_letter(self, doc_id: str, doc: Dict[str, Any], error: Any):
+        logger.error(f"Giving up on indexing {doc_id}: {error}")
+        self.dead_letters.append({"id": doc_id, "document": doc, "error": error})
+
+async def search_workflows(
+    q: str,
+    platform: Optional[str] = None,
+    country: Optional[str] = None,
+    limit: int = 50,
+    search_after: Optional[List[Any]] = None,
+    client: Optional[AsyncOpenSearch] = None,
+) -> List[Tuple[int, float]]:
+    """Full-text search, returns (workflow_id, relevance) pairs best first.
+
+    Relevance is the text score multiplied by ln(2 + score). Results are
+    sorted by [relevance, workflow_id]; pass the last hit's
+    ``[relevance, workflow_id]`` as ``search_after`` to get the next page
+    (note the reverse of the returned pair's order).
+    """
+    filters = [{"exists": {"field": "workflow_id"}}]
+    if platform:
+        filters.append({"term": {"platform": platform}})
+    if country:
+        filters.append({"term": {"country": country}})
+
+    body = {
+        "size": limit,
+        "_source": ["workflow_id"],
+        "query": {
+            "function_score": {
+                "query": {
+                    "bool": {
+                        "must": {"multi_match": {"query": q, "fields": ["workflow", "normalized_title"]}},
+                        "filter": filters,
+                    }
+                },
+                "field_value_factor": {"field": "score", "modifier": "ln2p", "missing": 0},
+                "boost_mode": "multiply",
+            }
+        },
+        "sort": [{"_score": "desc"}, {"workflow_id": "desc"}],
+    }
+    if search_after:
+        body["search_after"] = search_after
+
+    owns_client = client is None
+    client = client or get_async_client()
+    try:
+        with SEARCH_LATENCY_SECONDS.labels(operation="search").time():
+            resp = await client.search(index=INDEX_NAME, body=body)
+    finally:
+        if owns_client:
+            await client.close()
+
+    return [(hit["_source"]["workflow_id"], hit["_score"]) for hit in resp["hits"]["hits"]]
@@ -1,7 +1,11 @@
 import asyncio
 import logging
-from ingest.celery_app import app
-from ingest.fetchers.youtube import YouTubeFetcher
+from datetime import datetime, timezone
+import uuid
+import redis
+from celery import chord, group
+from ingest.celery_app import app, REDIS_URL
+from ingest.fetchers.youtube import YouTubeFetcher, YOUTUBE_MAX_RESULTS, YOUTUBE_QUOTA_BUDGET
 from ingest.fetchers.discourse import DiscourseFetcher
 from ingest.fetchers.trends import TrendsFetcher
 from api.db.base import AsyncSessionLocal
@@ -9,70 +13,209 @@ from api.db.models import Workflow
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql import func
 from sqlalchemy import text
-from ingest.metrics import FETCH_COUNT_TOTAL, FETCH_FAILURES_TOTAL, TASK_DURATION_SECONDS
-from ingest.search import index_item
+from ingest.metrics import (
+    FETCH_COUNT_TOTAL, FETCH_FAILURES_TOTAL, TASK_DURATION_SECONDS, UPSERT_BATCH_SIZE, UPSERT_DURATION_SECONDS,
+)
+from ingest.search import BulkIndexer
+from ingest.scoring import score_metrics, rebuild_scores
+from ingest.history import ensure_partitions, record_snapshots, compact_snapshots
+from api.cache import bump_data_version
+from ingest.runtime import run_async
+from ingest.incremental import load_watermark, save_watermark, filter_changed
+from ingest.clustering import assign_clusters, backfill_clusters
+from ingest.leaderboards import refresh_leaderboards
+from ingest.velocity import metrics_set, velocity_set
 import os
 
 USE_OPENSEARCH = os.getenv("USE_OPENSEARCH", "false").lower() == "true"
 
 logger = logging.getLogger(__name__)
 
-async def upsert_workflows(items):
+UPSERT_CHUNK_SIZE = int(os.getenv("UPSERT_CHUNK_SIZE", 500))
+
+# Fan-out: regions per scheduled YouTube run and rows per process_pending task
+YOUTUBE_REGIONS = [r.strip() for r in os.getenv("YOUTUBE_REGIONS", "US").split(",") if r.strip()]
+PROCESS_CHUNK_SIZE = int(os.getenv("PROCESS_CHUNK_SIZE", 500))
+PROCESS_MAX_RETRIES = int(os.getenv("PROCESS_MAX_RETRIES", 3))
+# How long a processed chunk's idempotency key is kept
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 86400))
+
+_redis_client = None
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+def _chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _dedupe(items):
+    # A single INSERT ... ON CONFLICT cannot update the same row twice, so keep
+    # only the last occurrence of each (platform, source_id) in the batch.
+    # Rows without a source_id never conflict and are kept as-is.
+    latest = {}
+    for idx, item in enumerate(items):
+        key = (item["platform"], item["source_id"]) if item.get("source_id") is not None else idx
+        latest.pop(key, None)
+        latest[key] = item
+    return list(latest.values())
+
+def _lock_order(items):
+    # Concurrent chunks often share rows (a video trends in several regions).
+    # Multi-row ON CONFLICT locks rows in VALUES order, so a common order
+    # across statements avoids deadlocks between them.
+    return sorted(items, key=lambda item: (item["platform"], item.get("source_id") is None, item.get("source_id") or ""))
+
+def _workflow_row(item, observed_at: datetime = None):
+    return {
+        "platform": item["platform"],
+        "source_id": item["source_id"],
+        "source_url": item.get("source_url"),
+        "workflow": item["workflow"],
+        "normalized_title": item.get("normalized_title"),
+        "country": item.get("country"),
+        "popularity_metrics": item["popularity_metrics"],
+        "latest_metrics": item["popularity_metrics"],
+        # Only rows touched by this batch are rescored
+        "score": score_metrics(item["platform"], item["popularity_metrics"]),
+        "metrics_observed_at": observed_at or datetime.now(timezone.utc),
+    }
+
+def build_upsert_stmt(rows):
+    # One multi-row INSERT ... ON CONFLICT per chunk instead of one per row
+    stmt = insert(Workflow).values(rows)
+
+    # Upsert logic
+    update_dict = {
+        # Metrics and score only move forward in observation time
+        **metrics_set(stmt.excluded),
+        # Deltas against the row being replaced, computed in the same statement
+        **velocity_set(stmt.excluded),
+        "last_seen": func.now(),
+        "updated_at": func.now()
+    }
+
+    return stmt.on_conflict_do_update(
+        index_elements=['platform', 'source_id'],
+        set_=update_dict
+    ).returning(
+        Workflow.id, Workflow.platform, Workflow.source_id, Workflow.latest_metrics,
+        Workflow.normalized_title, Workflow.canonical_id,
+    )
+
+async def upsert_workflows(items, chunk_size: int = None, observed_at: datetime = None):
+    """Bulk upsert items, one statement and one transaction per chunk.
+
+    Round trips scale with ``len(items) / chunk_size`` rather than with the
+    number of rows. Keep ``chunk_size`` well under asyncpg's 32767 bind
+    parameter limit (roughly 9 parameters per row).
+
+    Each chunk also appends a metric snapshot per row, stamped with
+    ``observed_at`` (defaults to now).
+    """
     if not items:
-        return
-    
-    async with AsyncSessionLocal() as session:
-        for item in items:
-            # Side effect: Index to Search (synchronous call, preferably move to async task)
-            if USE_OPENSEARCH:
-                try:
-                    index_item(item)
-                except Exception as e:
-                    logger.error(f"Failed to index item: {e}")
-
-            stmt = insert(Workflow).values(
-                platform=item["platform"],
-                source_id=item["source_id"],
-                source_url=item["source_url"],
-                workflow=item["workflow"],
-                normalized_title=item["normalized_title"],
-                country=item["country"],
-                popularity_metrics=item["popularity_metrics"],
-                latest_metrics=item["popularity_metrics"], 
-                # raw_snapshots is distinct, initially we can just store the list of 1
-                raw_snapshots=[item["popularity_metrics"]] 
-            )
-            
-            # Upsert logic
-            update_dict = {
-                "latest_metrics": stmt.excluded.latest_metrics,
-                "popularity_metrics": stmt.excluded.popularity_metrics,
-                "last_seen": func.now(),
-                "updated_at": func.now()
-            }
-            
-            on_conflict_stmt = stmt.on_conflict_do_update(
-                index_elements=['platform', 'source_id'],
-                set_=update_dict
-            )
-            
-            await session.execute(on_conflict_stmt)
-            
-        await session.commit()
+        return 0
+
+    chunk_size = chunk_size or UPSERT_CHUNK_SIZE
+    observed_at = observed_at or datetime.now(timezone.utc)
+    items = _lock_order(_dedupe(items))
+
+    # Side effect: Index to Search. Documents are buffered and shipped via
+    # _bulk in the background instead of one blocking request per row.
+    indexer = BulkIndexer() if USE_OPENSEARCH else None
+    if indexer:
+        indexer.start()
+
+    committed = False
+    try:
+        async with AsyncSessionLocal() as session:
+            await ensure_partitions(session, observed_at)
+            await session.commit()
+
+            for chunk in _chunked(items, chunk_size):
+                UPSERT_BATCH_SIZE.observe(len(chunk))
+                with UPSERT_DURATION_SECONDS.time():
+                    result = await session.execute(build_upsert_stmt([_workflow_row(item, observed_at) for item in chunk]))
+                    written = result.all()
+                    # The observation itself, not the row: a late one keeps the newer stored metrics
+                    observed = {(item["platform"], item["source_id"]): item["popularity_metrics"] for item in chunk}
+                    await record_snapshots(
+                        session,
+                        ((row.id, observed.get((row.platform, row.source_id), row.latest_metrics)) for row in written),
+                        observed_at,
+                    )
+                    await assign_clusters(session, written)
+                    await session.commit()
+                committed = True
+
+                if indexer:
+                    ids = {(row.platform, row.source_id): row.id for row in written}
+                    for item in chunk:
+                        await indexer.add({**item, "id": ids.get((item["platform"], item["source_id"]))})
+    finally:
+        # Invalidate API response caches once data is visible to readers
+        if committed:
+            await bump_data_version()
+        if indexer:
+            try:
+                await indexer.close()
+            except Exception as e:
+                logger.error(f"Failed to flush search index: {e}")
+            if indexer.dead_letters:
+                logger.error(f"{len(indexer.dead_letters)} documents could not be indexed")
+
+    return len(items)
+
+# Fetch and upsert run in the same event loop, the worker process's persistent one
+
+async def fetch_youtube_items(region, quota_budget=None):
+    fetcher = YouTubeFetcher(quota_budget=quota_budget or YOUTUBE_QUOTA_BUDGET)
+    items = await fetcher.asearch_videos(region=region, max_results=YOUTUBE_MAX_RESULTS)
+    logger.info(f"Fetched {len(items)} items from YouTube ({region}) using {fetcher.quota_used} quota units")
+    return items
 
-def run_async(coro):
-    return asyncio.run(coro)
+async def fetch_and_upsert_youtube(region):
+    items = await fetch_youtube_items(region)
+    if await upsert_workflows(items):
+        await refresh_leaderboards()
+    return items
+
+async def fetch_and_upsert_forum(pages):
+    # Incremental: only topics bumped since the last run, and of those only
+    # the ones whose metrics actually changed
+    fetcher = DiscourseFetcher()
+    mark = await load_watermark(f"discourse:{fetcher.base_url}")
+    items, new_mark = await fetcher.afetch_updated_topics(mark, max_pages=pages)
+    changed = await filter_changed(items)
+    logger.info(f"Fetched {len(items)} items from Discourse, {len(changed)} changed")
+    if await upsert_workflows(changed):
+        await refresh_leaderboards()
+    # Only advance the watermark once the delta is stored
+    await save_watermark(new_mark)
+    return changed
+
+async def fetch_and_upsert_trends():
+    # pytrends is blocking, keep it off the event loop
+    items = await asyncio.to_thread(TrendsFetcher().fetch_trends)
+    logger.info(f"Fetched {len(items)} items from Trends")
+    if await upsert_workflows(items):
+        await refresh_leaderboards()
+    return items
+
+async def _rebuild_scores_and_leaderboards(batch_size):
+    count = await rebuild_scores(batch_size=batch_size)
+    await refresh_leaderboards()
+    return count
 
 @app.task(bind=True, name="ingest.fetch_youtube")
 def task_fetch_youtube(self, region="US"):
     logger.info(f"Starting YouTube fetch for {region}")
     try:
         with TASK_DURATION_SECONDS.labels(task_name="fetch_youtube").time():
-            fetcher = YouTubeFetcher()
-            items = fetcher.search_videos(region=region)
-            logger.info(f"Fetched {len(items)} items from YouTube")
-            
-            run_async(upsert_workflows(items))
+            items = run_async(fetch_and_upsert_youtube(region))
             FETCH_COUNT_TOTAL.labels(platform="YouTube").inc(len(items))
             
             return {"status": "ok", "count": len(items)}
@@ -85,11 +228,7 @@ def task_fetch_forum(self, pages=3):
     logger.info(f"Starting Discourse fetch for {pages} pages")
     try:
         with TASK_DURATION_SECONDS.labels(task_name="fetch_forum").time():
-            fetcher = DiscourseFetcher()
-            items = fetcher.fetch_latest_topics(pages=pages)
-            logger.info(f"Fetched {len(items)} items from Discourse")
-            
-            run_async(upsert_workflows(items))
+            items = run_async(fetch_and_upsert_forum(pages))
             FETCH_COUNT_TOTAL.labels(platform="Discourse").inc(len(items))
             return {"status": "ok", "count": len(items)}
     except Exception as e:
@@ -101,17 +240,141 @@ def task_fetch_trends(self):
     logger.info("Starting Google Trends fetch")
     try:
         with TASK_DURATION_SECONDS.labels(task_name="fetch_trends").time():
-            fetcher = TrendsFetcher()
-            items = fetcher.fetch_trends()
-            logger.info(f"Fetched {len(items)} items from Trends")
-            
-            run_async(upsert_workflows(items))
+            items = run_async(fetch_and_upsert_trends())
             FETCH_COUNT_TOTAL.labels(platform="GoogleTrends").inc(len(items))
             return {"status": "ok", "count": len(items)}
     except Exception as e:
         FETCH_FAILURES_TOTAL.labels(platform="GoogleTrends").inc()
         raise e
 
-@app.task(name="ingest.process_pending")
-def task_process_pending():
-    pass
+@app.task(bind=True, name="ingest.rebuild_scores")
+def task_rebuild_scores(self, batch_size=5000):
+    logger.info("Rebuilding workflow scores")
+    with TASK_DURATION_SECONDS.labels(task_name="rebuild_scores").time():
+        count = run_async(_rebuild_scores_and_leaderboards(batch_size))
+        return {"status": "ok", "count": count}
+
+@app.task(bind=True, name="ingest.backfill_clusters")
+def task_backfill_clusters(self, batch_size=2000):
+    logger.info("Clustering unassigned workflows")
+    with TASK_DURATION_SECONDS.labels(task_name="backfill_clusters").time():
+        count = run_async(backfill_clusters(batch_size=batch_size))
+        return {"status": "ok", "count": count}
+
+@app.task(bind=True, name="ingest.compact_snapshots")
+def task_compact_snapshots(self):
+    logger.info("Compacting metric snapshots")
+    with TASK_DURATION_SECONDS.labels(task_name="compact_snapshots").time():
+        result = run_async(compact_snapshots())
+        return {"status": "ok", **result}
+
+# Fan-out pipeline: schedule_youtube starts one fetch task per region in a
+# chord. Each fetch task replaces itself with a group of process_pending
+# chunks, so upserts spread over every worker. finish_run runs once all
+# chunks are in.
+
+def _run_key(run_id, region, index):
+    return f"ingest:done:{run_id}:{region}:{index}"
+
+def chunk_jobs(items, run_id, region, observed_at, chunk_size=None):
+    """process_pending signatures for ``items``, one per chunk."""
+    chunk_size = chunk_size or PROCESS_CHUNK_SIZE
+    return [
+        task_process_pending.s(chunk, _run_key(run_id, region, index), observed_at)
+        for index, chunk in enumerate(_chunked(items, chunk_size))
+    ]
+
+def region_quota_budgets(regions, total=None):
+    """Split the per-run YouTube quota budget evenly across ``regions``.
+
+    Every region task has its own fetcher, so without a split a run could
+    spend len(regions) times the budget.
+    """
+    total = total or YOUTUBE_QUOTA_BUDGET
+    regions = list(regions)
+    if not regions:
+        return {}
+    share, extra = divmod(total, len(regions))
+    return {region: share + (1 if i < extra else 0) for i, region in enumerate(regions)}
+
+def summarize_results(results):
+    """Flatten the chord results (fetch errors or lists of chunk results)."""
+    summary = {"count": 0, "chunks": 0, "skipped": 0, "empty_regions": [], "failed_regions": [], "failed_chunks": []}
+    for result in results or []:
+        for item in result if isinstance(result, list) else [result]:
+            if not isinstance(item, dict):
+                continue
+            if item.get("status") == "error":
+                target = "failed_regions" if "region" in item else "failed_chunks"
+                summary[target].append(item)
+            elif item.get("status") == "skipped":
+                summary["skipped"] += 1
+            elif item.get("status") == "empty":
+                summary["empty_regions"].append(item["region"])
+            else:
+                summary["chunks"] += 1
+                summary["count"] += item.get("count", 0)
+    return summary
+
+@app.task(bind=True, name="ingest.schedule_youtube")
+def task_schedule_youtube(self, regions=None):
+    regions = list(dict.fromkeys(regions or YOUTUBE_REGIONS))
+    run_id = self.request.id or uuid.uuid4().hex
+    # One observation time for the whole run, retried chunks write the same snapshots
+    observed_at = datetime.now(timezone.utc).isoformat()
+    budgets = region_quota_budgets(regions)
+    logger.info(f"Scheduling YouTube fetch {run_id} for {regions}, quota per region {budgets}")
+    header = [task_fetch_youtube_region.s(region, run_id, observed_at, budgets[region]) for region in regions]
+    chord(header)(task_finish_run.s(run_id))
+    return {"status": "scheduled", "run_id": run_id, "regions": list(regions)}
+
+@app.task(bind=True, name="ingest.fetch_youtube_region")
+def task_fetch_youtube_region(self, region, run_id, observed_at, quota_budget=None):
+    try:
+        with TASK_DURATION_SECONDS.labels(task_name="fetch_youtube_region").time():
+            items = run_async(fetch_youtube_items(region, quota_budget))
+    except Exception as e:
+        # Reported to finish_run instead of failing the chord for every region
+        FETCH_FAILURES_TOTAL.labels(platform="YouTube").inc()
+        logger.error(f"YouTube fetch for {region} failed: {e}")
+        return {"status": "error", "region": region, "error": str(e)}
+
+    FETCH_COUNT_TOTAL.labels(platform="YouTube").inc(len(items))
+    jobs = chunk_jobs(items, run_id, region, observed_at)
+    if not jobs:
+        # Replacing with an empty group would leave the chord nothing to wait on
+        return {"status": "empty", "region": region, "count": 0}
+    raise self.replace(group(jobs))
+
+@app.task(bind=True, name="ingest.process_pending", max_retries=PROCESS_MAX_RETRIES, default_retry_delay=10)
+def task_process_pending(self, items, key=None, observed_at=None):
+    """Upsert one chunk. ``key`` makes redelivered or replayed chunks no-ops."""
+    redis = _redis()
+    if key and redis.exists(key):
+        return {"status": "skipped", "key": key}
+
+    try:
+        with TASK_DURATION_SECONDS.labels(task_name="process_pending").time():
+            observed = datetime.fromisoformat(observed_at) if observed_at else None
+            count = run_async(upsert_workflows(items, observed_at=observed))
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        logger.error(f"Giving up on chunk {key}: {e}")
+        return {"status": "error", "key": key, "error": str(e)}
+
+    if key:
+        redis.set(key, 1, ex=IDEMPOTENCY_TTL)
+    return {"status": "ok", "key": key, "count": count}
+
+@app.task(bind=True, name="ingest.finish_run")
+def task_finish_run(self, results, run_id=None):
+    summary = summarize_results(results)
+    if summary["count"]:
+        run_async(refresh_leaderboards())
+    logger.info(
+        f"Run {run_id}: {summary['count']} rows in {summary['chunks']} chunks, "
+        f"{len(summary['failed_regions'])} failed regions, {len(summary['failed_chunks'])} failed chunks"
+    )
+    status = "ok" if not (summary["failed_regions"] or summary["failed_chunks"]) else "partial"
+    return {"status": status, "run_id": run_id, **summary}
@@ -0,0 +1,81 @@
+import os
+import math
+from typing import Any, Dict
+from sqlalchemy import Float, and_, case, cast, func, literal, or_
+from api.db.models import Workflow
+
+# Time for the trending score to lose half its weight to newer observations
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 24))
+# Floor on the gap between observations, so near-simultaneous runs don't explode rates
+VELOCITY_MIN_HOURS = float(os.getenv("VELOCITY_MIN_HOURS", 0.25))
+
+VELOCITY_SIGNALS = ("views", "likes", "comments")
+
+def decay_factor(hours: float, half_life: float = TRENDING_HALF_LIFE_HOURS) -> float:
+    return math.exp(-math.log(2) * hours / half_life)
+
+def trending_update(previous: float, score_rate: float, hours: float) -> float:
+    """EWMA step of the trending score, the Python twin of velocity_set()."""
+    decay = decay_factor(max(hours, VELOCITY_MIN_HOURS))
+    return decay * previous + (1 - decay) * max(score_rate, 0.0)
+
+def _metric(metrics, name):
+    return func.coalesce(cast(metrics[name].astext, Float), 0.0)
+
+def metrics_set(excluded) -> Dict[str, Any]:
+    """ON CONFLICT SET entries for the observed metrics and their score.
+
+    Only an observation at least as recent as the stored one replaces them.
+    A late, older one (e.g. a retried chunk from an earlier run) keeps the
+    stored values, so the next velocity delta has the right baseline.
+    """
+    table = Workflow.__table__.c
+    current = or_(
+        table.metrics_observed_at.is_(None),
+        excluded.metrics_observed_at >= table.metrics_observed_at,
+    )
+    return {
+        name: case((current, excluded[name]), else_=table[name])
+        for name in ("latest_metrics", "popularity_metrics", "score")
+    }
+
+def velocity_set(excluded) -> Dict[str, Any]:
+    """ON CONFLICT SET entries deriving velocity from the stored and incoming row.
+
+    Per-hour deltas of views/likes/comments, plus a trending score: an
+    exponentially decayed average of the score's growth rate. The score is
+    linear in the metrics, so its rate already carries the platform weights.
+    Re-delivered or out-of-order observations leave the velocity untouched;
+    together with metrics_set() they leave the whole row untouched.
+    """
+    table = Workflow.__table__.c
+    newer = and_(
+        table.metrics_observed_at.isnot(None),
+        excluded.metrics_observed_at > table.metrics_observed_at,
+    )
+    hours = cast(func.greatest(
+        func.extract("epoch", excluded.metrics_observed_at - table.metrics_observed_at) / 3600.0,
+        VELOCITY_MIN_HOURS,
+    ), Float)
+
+    def rate(new, old):
+        # Counters only grow, a drop means a recount at the source
+        return func.greatest(new - old, 0.0) / hours
+
+    decay = func.exp(-math.log(2) * hours / TRENDING_HALF_LIFE_HOURS)
+    score_rate = rate(cast(excluded.score, Float), cast(table.score, Float))
+
+    updates = {
+        f"{name}_per_hour": case(
+            (newer, rate(_metric(excluded.latest_metrics, name), _metric(table.latest_metrics, name))),
+            else_=table[f"{name}_per_hour"],
+        )
+        for name in VELOCITY_SIGNALS
+    }
+    updates["trending_score"] = case(
+        (newer, decay * table.trending_score + (literal(1.0) - decay) * score_rate),
+        else_=table.trending_score,
+    )
+    updates["previous_metrics"] = case((newer, table.latest_metrics), else_=table.previous_metrics)
+    updates["metrics_observed_at"] = func.greatest(table.metrics_observed_at, excluded.metrics_observed_at)
+    return updates
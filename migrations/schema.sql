@@ -1,3 +1,28 @@
+-- Schema of a fresh database. Databases created by an older release are
+-- upgraded in place (new columns and indexes) by api.db.migrate.ensure_schema
+-- at API startup.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Clusters of near-duplicate workflows across platforms, see ingest/clustering.py
+CREATE TABLE canonical_workflows (
+  id BIGSERIAL PRIMARY KEY,
+  title TEXT NOT NULL,
+  member_count INTEGER NOT NULL DEFAULT 0,
+  platforms VARCHAR(32)[],
+  total_views BIGINT NOT NULL DEFAULT 0,
+  total_likes BIGINT NOT NULL DEFAULT 0,
+  total_comments BIGINT NOT NULL DEFAULT 0,
+  total_score NUMERIC NOT NULL DEFAULT 0,
+  max_score NUMERIC NOT NULL DEFAULT 0,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  CONSTRAINT uq_canonical_title UNIQUE (title)
+);
+
+CREATE INDEX idx_canonical_title_trgm ON canonical_workflows USING gin (title gin_trgm_ops);
+CREATE INDEX idx_canonical_total_score ON canonical_workflows (total_score DESC, id DESC);
+
 CREATE TABLE workflows (
   id BIGSERIAL PRIMARY KEY,
   platform VARCHAR(32) NOT NULL,
@@ -6,17 +31,59 @@ CREATE TABLE workflows (
   workflow TEXT NOT NULL,
   normalized_title TEXT,
   country VARCHAR(32),
+  canonical_id BIGINT REFERENCES canonical_workflows (id) ON DELETE SET NULL,
   popularity_metrics JSONB NOT NULL,
   latest_metrics JSONB,
-  score NUMERIC DEFAULT 0,
+  score NUMERIC NOT NULL DEFAULT 0,
+  previous_metrics JSONB,
+  metrics_observed_at TIMESTAMP WITH TIME ZONE,
+  views_per_hour DOUBLE PRECISION NOT NULL DEFAULT 0,
+  likes_per_hour DOUBLE PRECISION NOT NULL DEFAULT 0,
+  comments_per_hour DOUBLE PRECISION NOT NULL DEFAULT 0,
+  trending_score DOUBLE PRECISION NOT NULL DEFAULT 0,
   first_seen TIMESTAMP WITH TIME ZONE DEFAULT now(),
-  last_seen TIMESTAMP WITH TIME ZONE DEFAULT now(),
+  last_seen TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
   inserted_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
   updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
   raw_snapshots JSONB[],
+  search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', coalesce(normalized_title, ''))) STORED,
   UNIQUE (platform, source_id)
 );
 
 CREATE INDEX idx_platform_country ON workflows (platform, country);
-CREATE INDEX idx_score ON workflows (score DESC);
-CREATE INDEX idx_normalized_title_gin ON workflows USING gin (to_tsvector('english', normalized_title));
+CREATE INDEX idx_score ON workflows (score DESC, id DESC);
+CREATE INDEX idx_last_seen ON workflows (last_seen DESC, id DESC);
+CREATE INDEX idx_platform_country_score ON workflows (platform, country, score DESC, id DESC);
+CREATE INDEX idx_platform_country_last_seen ON workflows (platform, country, last_seen DESC, id DESC);
+CREATE INDEX idx_search_vector ON workflows USING gin (search_vector);
+CREATE INDEX idx_canonical_id ON workflows (canonical_id);
+CREATE INDEX idx_trending_score ON workflows (trending_score DESC, id DESC);
+CREATE INDEX idx_updated_at ON workflows (updated_at);
+-- GET /workflows/stats; queries must spell the expressions exactly like this
+CREATE INDEX idx_latest_views ON workflows (((latest_metrics ->> 'views')::float));
+CREATE INDEX idx_latest_likes ON workflows (((latest_metrics ->> 'likes')::float));
+CREATE INDEX idx_latest_like_ratio ON workflows (((latest_metrics ->> 'like_to_view_ratio')::float));
+
+-- Metric history, partitioned by month. ingest.history creates upcoming
+-- partitions on demand and drops expired ones (ingest.compact_snapshots).
+CREATE TABLE workflow_metric_snapshots (
+  workflow_id BIGINT NOT NULL REFERENCES workflows (id) ON DELETE CASCADE,
+  collected_at TIMESTAMP WITH TIME ZONE NOT NULL,
+  metrics JSONB NOT NULL,
+  PRIMARY KEY (workflow_id, collected_at)
+) PARTITION BY RANGE (collected_at);
+
+CREATE TABLE ingest_watermarks (
+  source VARCHAR(64) PRIMARY KEY,
+  high_water TIMESTAMP WITH TIME ZONE,
+  last_id INTEGER,
+  etag TEXT,
+  last_modified TEXT,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+-- workflow_leaderboards: top LEADERBOARD_SIZE workflows per (platform, country),
+-- platform, country and globally; '*' means any. Not created here: its size
+-- comes from the environment, so ingest.leaderboards.ensure_leaderboards
+-- creates it (view_sql()) at API startup or before a worker's first refresh,
+-- and rebuilds it when the size changes. Refreshed concurrently after each ingest run.
@@ -0,0 +1,15 @@
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).parent
+
+
+def pytest_collection_modifyitems(config, items):
+    # Benchmarks take minutes at the 1M sizes, only run them when asked for
+    if config.getoption("benchmark_only", default=False):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark-only")
+    for item in items:
+        if HERE in Path(item.fspath).parents:
+            item.add_marker(skip)
@@ -0,0 +1,83 @@
+"""Throughput of the normalization helpers, run with:
+
+    pip install -r requirements-dev.txt
+    pytest tests/benchmarks --benchmark-only
+
+Compare runs with --benchmark-autosave / --benchmark-compare.
+"""
+import random
+import re
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from ingest.normalize import (
+    compute_ratios,
+    compute_ratios_batch,
+    normalize_title,
+    normalize_titles,
+)
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+WORDS = ["n8n", "Workflow", "automation", "Slack", "Gmail", "webhook", "AI", "agent", "CRM", "tutorial", "Sheets"]
+
+
+def _legacy_normalize_title(title):
+    # The pre-compiled-pattern implementation, kept as the baseline
+    if not title:
+        return ""
+    t = title.strip().lower()
+    t = re.sub(r'\s+', ' ', t)
+    t = re.sub(r'\d{1,2}:\d{2}', '', t)
+    return t.strip()
+
+
+def _titles(n, distinct=5_000):
+    rng = random.Random(42)
+    pool = [
+        "  " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 9))) + f"  {rng.randint(0, 59)}:{rng.randint(10, 59)} "
+        for _ in range(distinct)
+    ]
+    return [pool[rng.randrange(distinct)] for _ in range(n)]
+
+
+def _metrics(n):
+    rng = random.Random(7)
+    return [(str(rng.randint(0, 10**6)), rng.randint(0, 10**4), rng.randint(-1, 500)) for _ in range(n)]
+
+
+def _run(benchmark, fn, *args):
+    return benchmark.pedantic(fn, args=args, rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_normalize_title_legacy(benchmark, size):
+    titles = _titles(size)
+    _run(benchmark, lambda ts: [_legacy_normalize_title(t) for t in ts], titles)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_normalize_titles_uncached(benchmark, size):
+    titles = _titles(size)
+    result = _run(benchmark, lambda ts: normalize_titles(ts, cache=False), titles)
+    assert result[:100] == [normalize_title(t) for t in titles[:100]]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_normalize_titles_cached(benchmark, size):
+    titles = _titles(size)
+    _run(benchmark, normalize_titles, titles)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_compute_ratios_per_item(benchmark, size):
+    rows = _metrics(size)
+    _run(benchmark, lambda rs: [compute_ratios(*r) for r in rs], rows)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_compute_ratios_batch(benchmark, size):
+    rows = _metrics(size)
+    _run(benchmark, compute_ratios_batch, rows)
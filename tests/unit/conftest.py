@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.cache import response_cache
+from api.db.base import get_read_db
+from api.main import app
+
+STAMP = datetime(2024, 3, 1, 12, 30, 15, 500000, tzinfo=timezone.utc)
+
+
+class FakeResult:
+    """Enough of a SQLAlchemy Result for the read endpoints."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def all(self):
+        return self.rows
+
+    def mappings(self):
+        return self
+
+    def scalars(self):
+        return self
+
+    def scalar_one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeReadDB:
+    """Read session stand-in: ``scalar`` (the conditional stamp lookups)
+    returns ``stamp``, ``execute`` returns ``rows``. Statements are recorded."""
+
+    def __init__(self):
+        self.stamp = STAMP
+        self.rows = []
+        self.scalar_statements = []
+        self.statements = []
+
+    async def scalar(self, stmt):
+        self.scalar_statements.append(stmt)
+        return self.stamp
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return FakeResult(self.rows)
+
+
+def _workflow_row(id, platform="YouTube", source_id=None, **fields):
+    """An ORM-like Workflow with every WorkflowRead field set."""
+    values = {
+        "source_id": source_id if source_id is not None else str(id), "source_url": None,
+        "workflow": f"Workflow {id}", "normalized_title": None, "country": "US",
+        "popularity_metrics": {"views": id}, "collected_at": None, "canonical_id": None, "score": 1.0,
+        "first_seen": STAMP, "last_seen": STAMP, "inserted_at": STAMP, "updated_at": STAMP,
+    }
+    return SimpleNamespace(id=id, platform=platform, **{**values, **fields})
+
+
+@pytest.fixture
+def workflow_row():
+    return _workflow_row
+
+
+@pytest.fixture
+def read_db():
+    """Overrides get_read_db with a FakeReadDB and starts from an empty response cache."""
+    db = FakeReadDB()
+
+    async def override():
+        yield db
+
+    response_cache.local.clear()
+    app.dependency_overrides[get_read_db] = override
+    yield db
+    app.dependency_overrides.pop(get_read_db, None)
+    response_cache.local.clear()
+
+
+@pytest.fixture
+def client(read_db):
+    return TestClient(app)
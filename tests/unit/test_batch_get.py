@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.fixture
+def rows(workflow_row):
+    return [workflow_row(1, "YouTube", "a"), workflow_row(2, "Discourse", "42")]
+
+
+def _post(client, read_db, body, rows=()):
+    read_db.rows = list(rows)
+    resp = client.post("/workflows/batch_get", json=body)
+    return resp, [str(stmt.compile(compile_kwargs={"literal_binds": True})) for stmt in read_db.statements]
+
+
+def test_batch_get_preserves_order_and_marks_missing(client, read_db, rows):
+    refs = [
+        {"platform": "Discourse", "source_id": "42"},
+        {"id": 99},
+        {"id": 1},
+        {"platform": "YouTube", "source_id": "missing"},
+        {"id": 1},
+    ]
+    resp, statements = _post(client, read_db, {"refs": refs}, rows)
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [item["found"] for item in body] == [True, False, True, False, True]
+    assert [item["workflow"]["id"] for item in body if item["found"]] == [2, 1, 1]
+    assert body[1]["workflow"] is None and body[1]["ref"]["id"] == 99
+    # Ids and source pairs are resolved by a single statement
+    assert len(statements) == 1
+    assert "workflows.id IN" in statements[0] and "(workflows.platform, workflows.source_id) IN" in statements[0]
+
+
+def test_batch_get_rejects_bad_refs(client, read_db):
+    for refs in ([], [{"id": 1, "platform": "YouTube"}], [{"platform": "YouTube"}]):
+        assert _post(client, read_db, {"refs": refs})[0].status_code == 422
+    assert read_db.statements == []
+
+
+def test_batch_get_caps_refs(client, read_db, monkeypatch):
+    monkeypatch.setattr("api.main.BATCH_GET_MAX_REFS", 2)
+    resp, statements = _post(client, read_db, {"refs": [{"id": i} for i in range(3)]})
+    assert resp.status_code == 400
+    assert statements == []
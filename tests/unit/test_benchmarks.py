@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from api.models.schemas import WorkflowCreate
+from benchmarks.datagen import generate_items
+from benchmarks.fake_servers import discourse_app, youtube_app
+from benchmarks import load
+from benchmarks.load import LoadDriver, parse_mix
+from benchmarks.report import percentile, summarize
+from ingest.fetchers.discourse import DiscourseFetcher
+from ingest.fetchers.youtube import YouTubeFetcher
+from ingest.http import AsyncHttp, HostRateLimiter
+
+
+def _http(app):
+    return AsyncHttp(transport=httpx.ASGITransport(app=app), rate_limiter=HostRateLimiter({}, default=0))
+
+
+def test_percentiles_use_nearest_rank():
+    samples = [i / 1000 for i in range(1, 101)]
+    assert percentile(samples, 50) == 0.05
+    assert percentile(samples, 99) == 0.099
+    summary = summarize(samples, elapsed=2.0, errors=3)
+    assert summary["requests"] == 100 and summary["errors"] == 3
+    assert summary["rps"] == 50.0
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert summarize([], elapsed=1.0)["p99_ms"] == 0.0
+
+
+def test_generated_items_are_deterministic_and_valid():
+    first = list(generate_items(200, seed=1))
+    assert first == list(generate_items(200, seed=1))
+    assert len({item["source_id"] for item in first}) == 200
+    for item in first:
+        WorkflowCreate.model_validate(item)
+    # Appended runs continue the id sequence
+    assert next(iter(generate_items(1, seed=1, start=200)))["source_id"] == "bench-200"
+
+
+def test_fetchers_run_against_fake_servers():
+    async def run():
+        async with _http(youtube_app(total_videos=120)) as http:
+            fetcher = YouTubeFetcher(api_key="bench", http=http, quota_budget=10**6, base_url="http://youtube")
+            videos = await fetcher.asearch_videos(max_results=120)
+        async with _http(discourse_app(pages=2, per_page=30)) as http:
+            topics = await DiscourseFetcher(base_url="http://forum", http=http).afetch_latest_topics(pages=3)
+        return videos, topics
+
+    videos, topics = asyncio.run(run())
+    assert len(videos) == 120 and len({v["source_id"] for v in videos}) == 120
+    assert videos[0]["popularity_metrics"]["views"] > 0
+    # The third page 404s and ends the listing
+    assert len(topics) == 60
+
+
+def test_load_driver_reports_each_scenario():
+    seen = []
+
+    async def listing(request: Request):
+        seen.append("list")
+        return JSONResponse([{"id": i} for i in range(1, 6)])
+
+    async def detail(request: Request):
+        seen.append("detail")
+        return JSONResponse({"id": int(request.path_params["id"])})
+
+    async def import_(request: Request):
+        seen.append("import")
+        rows = [json.loads(line) for line in (await request.body()).splitlines()]
+        return JSONResponse({"inserted": len(rows)}, status_code=201)
+
+    app = Starlette(routes=[
+        Route("/workflows", listing),
+        Route("/workflows/import", import_, methods=["POST"]),
+        Route("/workflows/{id:int}", detail),
+    ])
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+            driver = LoadDriver(client, parse_mix("list=1,detail=1,import=1"), import_batch=5)
+            await driver.sample_ids(pages=1)
+            return driver.ids, await driver.run(duration=0.2, concurrency=2)
+
+    ids, results = asyncio.run(run())
+    assert ids == [1, 2, 3, 4, 5]
+    assert set(results) == {"list", "detail", "import", "all"}
+    assert {"detail", "import"} <= set(seen)
+    assert results["all"]["requests"] == sum(results[name]["requests"] for name in ("list", "detail", "import"))
+    assert results["all"]["errors"] == 0
+
+
+def test_measured_imports_do_not_replay_warmup_source_ids(monkeypatch):
+    imported = []
+
+    async def import_(request: Request):
+        imported.extend(json.loads(line)["source_id"] for line in (await request.body()).splitlines())
+        return JSONResponse({"inserted": 5}, status_code=201)
+
+    app = Starlette(routes=[Route("/workflows/import", import_, methods=["POST"])])
+    client = httpx.AsyncClient
+
+    def asgi_client(**kwargs):
+        kwargs.pop("limits")
+        return client(transport=httpx.ASGITransport(app=app), **kwargs)
+
+    monkeypatch.setattr(load.httpx, "AsyncClient", asgi_client)
+    asyncio.run(load.run_load("http://api", 0.1, 1, parse_mix("import=1"), 5, seed=42, warmup=0.1))
+
+    # Warmup and measured imports draw from one range, every row is an insert
+    assert len(imported) > 5
+    assert len(imported) == len(set(imported))
@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+from api import cache
+from api.cache import VERSION_KEY, TTLCache, bump_data_version, make_key, response_cache
+
+ROW = {"id": 1, "workflow": "W", "score": 2}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_entries=2, ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_make_key_normalizes_params():
+    assert make_key("workflows", {"platform": None, "limit": 50}, 1) == make_key("workflows", {"limit": 50, "country": ""}, 1)
+    assert make_key("workflows", {"limit": 50}, 1) != make_key("workflows", {"limit": 50}, 2)
+
+
+
+class FakeRedis:
+    """The shared version key, as seen by the API and the workers."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+
+    async def aclose(self):
+        pass
+
+
+def _cache_status(client):
+    return client.get("/workflows", params={"fields": "id,workflow"}).headers["x-cache"]
+
+
+def test_upsert_in_this_process_invalidates(client, read_db):
+    read_db.rows = [SimpleNamespace(_mapping=ROW, **ROW)]
+    assert _cache_status(client) == "MISS"
+    assert _cache_status(client) == "HIT"
+
+    asyncio.run(bump_data_version())
+    assert _cache_status(client) == "MISS"
+    assert len(read_db.statements) == 2
+
+
+def test_upsert_in_a_worker_invalidates_through_redis(client, read_db, monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(response_cache, "shared_version", True)
+    monkeypatch.setattr(response_cache, "_redis", redis)
+    monkeypatch.setattr(response_cache, "_version", 0)
+    monkeypatch.setattr(response_cache, "_version_checked_at", 0.0)
+    monkeypatch.setattr(cache, "VERSION_POLL_SECONDS", 0)
+    monkeypatch.setattr(cache.aioredis, "from_url", lambda url: redis)
+    read_db.rows = [SimpleNamespace(_mapping=ROW, **ROW)]
+
+    assert _cache_status(client) == "MISS"
+    assert _cache_status(client) == "HIT"
+
+    # What bump_data_version does in a Celery worker after its upsert commits
+    asyncio.run(redis.incr(VERSION_KEY))
+    assert _cache_status(client) == "MISS"
+    assert _cache_status(client) == "HIT"
+
+    # And bumps made here reach the other processes
+    asyncio.run(bump_data_version())
+    assert redis.data[VERSION_KEY] == 2
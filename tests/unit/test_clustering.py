@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy.sql.dml import Insert, Update
+
+import ingest.scoring as scoring
+from ingest.clustering import assign_clusters, cluster_key
+
+
+class FakeSession:
+    """Answers the clustering statements: trigram matches, created clusters, row updates."""
+
+    def __init__(self, matches, created_ids):
+        self.matches = matches
+        self.created_ids = created_ids
+        self.calls = []
+
+    async def execute(self, stmt, params=None):
+        self.calls.append((stmt, params))
+        if isinstance(stmt, Insert):
+            titles = list(stmt.compile().params.values())
+            return [(self.created_ids[title], title) for title in titles]
+        if "similarity(c.title" in str(stmt):
+            return [(key, self.matches[key]) for key in params["keys"] if key in self.matches]
+        return None
+
+    def text_calls(self, fragment):
+        return [params for stmt, params in self.calls if fragment in str(stmt)]
+
+
+def _row(id, title, canonical_id=None):
+    return SimpleNamespace(id=id, normalized_title=title, canonical_id=canonical_id)
+
+
+def test_cluster_key_ignores_order_and_filler():
+    assert cluster_key("automating email with n8n") == cluster_key("Email automating - n8n")
+    assert cluster_key("n8n webhook tutorial") == "tutorial webhook"
+    assert cluster_key("n8n") == ""
+    assert cluster_key(None) == ""
+
+
+def test_assign_clusters_matches_then_creates():
+    session = FakeSession(matches={"email gmail sync": 10}, created_ids={"tutorial webhook": 20})
+    rows = [
+        _row(1, "sync gmail email"),
+        _row(2, "gmail email sync with n8n"),
+        _row(3, "n8n webhook tutorial"),
+        _row(4, "already clustered", canonical_id=30),
+        _row(5, "n8n"),  # no key, left alone
+    ]
+
+    touched = asyncio.run(assign_clusters(session, rows))
+
+    assert touched == [10, 20, 30]
+    # Every distinct key is looked up in one query
+    (lookup,) = session.text_calls("similarity(c.title")
+    assert sorted(lookup["keys"]) == ["email gmail sync", "tutorial webhook"]
+    # Only the unmatched key creates a cluster
+    inserts = [stmt for stmt, _ in session.calls if isinstance(stmt, Insert)]
+    assert len(inserts) == 1 and "tutorial webhook" in inserts[0].compile().params.values()
+
+    (params,) = [params for stmt, params in session.calls if isinstance(stmt, Update)]
+    assert sorted(params, key=lambda p: p["id"]) == [
+        {"id": 1, "canonical_id": 10}, {"id": 2, "canonical_id": 10}, {"id": 3, "canonical_id": 20},
+    ]
+    (refresh,) = session.text_calls("UPDATE canonical_workflows")
+    assert refresh["ids"] == [10, 20, 30]
+
+
+def test_assign_clusters_without_new_keys_only_refreshes():
+    session = FakeSession(matches={}, created_ids={})
+    assert asyncio.run(assign_clusters(session, [_row(1, "x y", canonical_id=7)])) == [7]
+    assert session.text_calls("similarity(c.title") == []
+    assert session.text_calls("UPDATE canonical_workflows")[0]["ids"] == [7]
+
+
+def test_rebuild_scores_refreshes_clusters_per_batch(monkeypatch):
+    batches = [
+        [SimpleNamespace(id=1, platform="YouTube", latest_metrics={"views": 10}, popularity_metrics={}, canonical_id=5),
+         SimpleNamespace(id=2, platform="YouTube", latest_metrics={"views": 20}, popularity_metrics={}, canonical_id=None)],
+        [],
+    ]
+    refreshed = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, stmt, params=None):
+            return SimpleNamespace(all=lambda: batches.pop(0)) if params is None else None
+
+        async def commit(self):
+            pass
+
+    async def fake_refresh(session, ids):
+        refreshed.append(list(ids))
+
+    monkeypatch.setattr(scoring, "AsyncSessionLocal", Session)
+    monkeypatch.setattr(scoring, "refresh_cluster_stats", fake_refresh)
+
+    assert asyncio.run(scoring.rebuild_scores(batch_size=2)) == 2
+    assert refreshed == [[5, None]]
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+ROW = {"id": 1, "workflow": "W", "score": 2}
+PARAMS = {"fields": "id,workflow", "country": "US"}
+
+
+def test_if_none_match_returns_304_without_querying(client, read_db):
+    read_db.rows = [SimpleNamespace(_mapping=ROW, **ROW)]
+
+    first = client.get("/workflows", params=PARAMS)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and len(read_db.statements) == 1
+    assert first.headers["last-modified"] == "Fri, 01 Mar 2024 12:30:15 GMT"
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    again = client.get("/workflows", params=PARAMS, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and len(read_db.statements) == 1
+    assert again.headers["etag"] == etag
+
+    since = client.get("/workflows", params=PARAMS, headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert since.status_code == 304
+
+    # New data changes the validator and bypasses the cached body
+    read_db.stamp = datetime(2024, 3, 2, tzinfo=timezone.utc)
+    changed = client.get("/workflows", params=PARAMS, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag and len(read_db.statements) == 2
+
+
+def test_etag_depends_on_params(client):
+    a = client.get("/workflows", params={"fields": "id", "country": "US"}).headers["etag"]
+    b = client.get("/workflows", params={"fields": "id", "country": "GB"}).headers["etag"]
+    assert a != b
+
+
+def test_if_none_match_star_does_not_hide_a_missing_row(client, read_db):
+    read_db.stamp = None
+    response = client.get("/workflows/404", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+
+
+def test_trending_window_is_truncated_to_the_hour():
+    from api.main import TRENDING_WINDOW_HOURS, trending_window_start
+
+    start = trending_window_start(datetime(2024, 3, 1, 12, 59, 30, tzinfo=timezone.utc))
+    assert start == datetime(2024, 3, 1, 12, tzinfo=timezone.utc) - timedelta(hours=TRENDING_WINDOW_HOURS)
+
+
+def test_trending_etag_changes_with_the_window(client, monkeypatch):
+    from api import main
+
+    start = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+    monkeypatch.setattr(main, "trending_window_start", lambda: start)
+    first = client.get("/workflows/trending").headers["etag"]
+    assert client.get("/workflows/trending").headers["etag"] == first
+
+    start += timedelta(hours=1)
+    assert client.get("/workflows/trending").headers["etag"] != first
@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from api.export import EXPORT_FIELDS, encode_csv, encode_ndjson, export_stmt
+from api.models.schemas import WorkflowRead
+
+ROW = (
+    7, "YouTube", "abc", "https://youtu.be/abc", "Sync CRM", "sync crm", "US",
+    {"views": 10}, {"views": 12}, None, Decimal("1.5"),
+    datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 2, tzinfo=timezone.utc),
+    datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 2, tzinfo=timezone.utc),
+)
+
+
+def test_encode_ndjson_one_object_per_line():
+    lines = encode_ndjson([ROW, ROW]).decode().splitlines()
+    assert len(lines) == 2
+    item = json.loads(lines[0])
+    assert list(item) == EXPORT_FIELDS
+    assert item["score"] == 1.5 and item["latest_metrics"] == {"views": 12}
+    assert item["last_seen"] == "2024-01-02T00:00:00+00:00"
+
+
+def test_encode_csv_header_and_json_cells():
+    body = encode_csv([], header=True) + encode_csv([ROW])
+    header, row = list(csv.reader(io.StringIO(body.decode())))
+    assert header == EXPORT_FIELDS
+    assert json.loads(row[EXPORT_FIELDS.index("popularity_metrics")]) == {"views": 10}
+    assert row[EXPORT_FIELDS.index("canonical_id")] == ""
+
+
+def test_export_stmt_streams_in_batches():
+    stmt = export_stmt(platform="YouTube")
+    assert stmt.get_execution_options()["yield_per"] > 0
+    assert "ORDER BY workflows.id" in str(stmt)
+
+
+def test_export_fields_are_workflow_read_plus_latest_metrics():
+    expected = [f for f in WorkflowRead.model_fields if f != "collected_at"] + ["latest_metrics"]
+    assert sorted(EXPORT_FIELDS) == sorted(expected)
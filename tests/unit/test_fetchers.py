@@ -0,0 +1,181 @@
+import asyncio
+
+import httpx
+
+from ingest.fetchers.discourse import DiscourseFetcher
+from ingest.fetchers.youtube import YouTubeFetcher
+from ingest.http import AsyncHttp, HostRateLimiter
+from ingest.incremental import Watermark, parse_timestamp
+
+
+def _http(handler):
+    return AsyncHttp(rate_limiter=HostRateLimiter(default=0), transport=httpx.MockTransport(handler))
+
+
+def _topic(i):
+    return {"id": i, "slug": f"t{i}", "title": f"Topic {i}", "views": 10, "like_count": 1, "posts_count": 2}
+
+
+def test_discourse_pages_stop_at_first_empty_page():
+    pages = {0: [_topic(1), _topic(2)], 1: [_topic(3)], 2: [], 3: [_topic(4)]}
+
+    def handler(request):
+        page = int(request.url.params["page"])
+        return httpx.Response(200, json={"topic_list": {"topics": pages[page]}})
+
+    async def main():
+        async with _http(handler) as http:
+            return await DiscourseFetcher(base_url="http://forum.test", http=http).afetch_latest_topics(pages=4)
+
+    items = asyncio.run(main())
+    assert [i["source_id"] for i in items] == ["1", "2", "3"]
+    assert items[0]["popularity_metrics"]["comments"] == 1
+
+
+def test_youtube_details_are_batched_by_50():
+    calls = []
+
+    def handler(request):
+        ids = request.url.params["id"].split(",")
+        calls.append(len(ids))
+        return httpx.Response(200, json={"items": [
+            {"id": i, "statistics": {"viewCount": "100"}, "snippet": {"title": i, "publishedAt": "2024-01-01T00:00:00Z"}}
+            for i in ids
+        ]})
+
+    async def main():
+        async with _http(handler) as http:
+            fetcher = YouTubeFetcher(api_key="test", http=http)
+            return await fetcher.aget_video_details([f"v{i}" for i in range(120)], "US")
+
+    items = asyncio.run(main())
+    assert sorted(calls) == [20, 50, 50]
+    assert [i["source_id"] for i in items] == [f"v{i}" for i in range(120)]
+
+
+def test_youtube_search_follows_page_tokens_within_quota():
+    search_calls = []
+
+    def handler(request):
+        if request.url.path.endswith("/search"):
+            token = request.url.params.get("pageToken", "0")
+            search_calls.append(token)
+            page = int(token)
+            return httpx.Response(200, json={
+                "items": [{"id": {"videoId": f"v{page}-{i}"}} for i in range(50)],
+                "nextPageToken": str(page + 1),
+            })
+        ids = request.url.params["id"].split(",")
+        return httpx.Response(200, json={"items": [
+            {"id": i, "statistics": {}, "snippet": {"title": i, "publishedAt": "2024-01-01T00:00:00Z"}} for i in ids
+        ]})
+
+    async def main():
+        async with _http(handler) as http:
+            # Room for 3 search pages (300 units) plus their 3 detail calls
+            fetcher = YouTubeFetcher(api_key="test", http=http, quota_budget=310)
+            items = await fetcher.asearch_videos(max_results=1000)
+            return fetcher, items
+
+    fetcher, items = asyncio.run(main())
+    assert search_calls == ["0", "1", "2"]
+    assert len(items) == 150
+    assert fetcher.quota_used == 303
+
+
+def _bumped(i, bumped_at, **extra):
+    return {**_topic(i), "bumped_at": bumped_at, **extra}
+
+
+def test_discourse_incremental_stops_at_watermark():
+    pages = {
+        0: [_bumped(9, "2024-03-01T00:00:00.000Z", pinned=True), _bumped(5, "2024-02-10T00:00:00.000Z")],
+        1: [_bumped(4, "2024-02-05T00:00:00.000Z"), _bumped(3, "2024-01-20T00:00:00.000Z")],
+        2: [_bumped(2, "2024-01-10T00:00:00.000Z")],
+        3: [_bumped(1, "2024-01-01T00:00:00.000Z")],
+    }
+    requested = []
+
+    def handler(request):
+        page = int(request.url.params["page"])
+        requested.append(page)
+        return httpx.Response(200, json={"topic_list": {"topics": pages[page]}}, headers={"ETag": '"v2"'})
+
+    async def main():
+        mark = Watermark("discourse", high_water=parse_timestamp("2024-02-01T00:00:00Z"), etag='"v1"')
+        async with _http(handler) as http:
+            fetcher = DiscourseFetcher(base_url="http://forum.test", http=http)
+            return await fetcher.afetch_updated_topics(mark, max_pages=4, window=1)
+
+    items, new_mark = asyncio.run(main())
+    assert requested == [0, 1]
+    assert [i["source_id"] for i in items] == ["9", "5", "4", "3"]
+    assert new_mark.high_water == parse_timestamp("2024-02-10T00:00:00Z")
+    assert new_mark.last_id == 5 and new_mark.etag == '"v2"'
+
+
+def test_discourse_incremental_keeps_mark_when_pages_run_out():
+    pages = {
+        0: [_bumped(10, "2024-03-10T00:00:00.000Z")],
+        1: [_bumped(9, "2024-03-09T00:00:00.000Z")],
+        2: [_bumped(8, "2024-03-07T00:00:00.000Z")],
+        3: [_bumped(7, "2024-03-05T00:00:00.000Z")],
+        4: [_bumped(6, "2024-01-15T00:00:00.000Z")],
+    }
+    requested = []
+
+    def handler(request):
+        page = int(request.url.params["page"])
+        requested.append(page)
+        return httpx.Response(200, json={"topic_list": {"topics": pages[page]}}, headers={"ETag": '"v2"'})
+
+    mark = Watermark("discourse", high_water=parse_timestamp("2024-02-01T00:00:00Z"), last_id=6, etag='"v1"')
+
+    async def main():
+        async with _http(handler) as http:
+            fetcher = DiscourseFetcher(base_url="http://forum.test", http=http)
+            return await fetcher.afetch_updated_topics(mark, max_pages=3, window=1)
+
+    items, new_mark = asyncio.run(main())
+    assert requested == [0, 1, 2]
+    assert [i["source_id"] for i in items] == ["10", "9", "8"]
+    # Topic 7 is still unread: the mark and its validators must not move
+    assert new_mark == mark
+
+
+def test_discourse_incremental_not_modified():
+    def handler(request):
+        assert request.headers["If-None-Match"] == '"v1"'
+        return httpx.Response(304)
+
+    async def main():
+        mark = Watermark("discourse", etag='"v1"')
+        async with _http(handler) as http:
+            return await DiscourseFetcher(base_url="http://forum.test", http=http).afetch_updated_topics(mark)
+
+    items, new_mark = asyncio.run(main())
+    assert items == [] and new_mark.etag == '"v1"'
+
+
+def test_discourse_retries_server_errors(monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    # backoff waits with asyncio.sleep between tries
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["page"])
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"topic_list": {"topics": [_bumped(1, "2024-03-01T00:00:00.000Z")]}})
+
+    async def main():
+        async with _http(handler) as http:
+            fetcher = DiscourseFetcher(base_url="http://forum.test", http=http)
+            return await fetcher.afetch_updated_topics(Watermark("discourse"), max_pages=1)
+
+    items, new_mark = asyncio.run(main())
+    assert calls == ["0", "0"]
+    assert [i["source_id"] for i in items] == ["1"] and new_mark.last_id == 1
@@ -0,0 +1,48 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from ingest import history
+from ingest.history import _add_months, _expired, partition_name
+
+
+def test_add_months_wraps_years():
+    assert _add_months(date(2024, 11, 1), 2) == date(2025, 1, 1)
+    assert _add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_expired_partitions():
+    names = [partition_name(date(2023, m, 1)) for m in (10, 11, 12)] + ["workflow_metric_snapshots_default"]
+    assert _expired(names, date(2023, 12, 1)) == [
+        "workflow_metric_snapshots_202310",
+        "workflow_metric_snapshots_202311",
+    ]
+
+
+def test_ensure_partitions_locks_before_creating():
+    statements = []
+
+    class Session:
+        async def execute(self, stmt, params=None):
+            statements.append((str(stmt), params))
+
+    history._ensured_months.clear()
+    asyncio.run(history.ensure_partitions(Session(), datetime(2031, 5, 10, tzinfo=timezone.utc), months_ahead=0))
+
+    (lock, lock_params), (create, _) = statements
+    assert "pg_advisory_xact_lock" in lock and lock_params == {"name": "workflow_metric_snapshots_203105"}
+    assert create.startswith("CREATE TABLE IF NOT EXISTS workflow_metric_snapshots_203105")
+
+
+def test_history_etag_follows_compaction(client, read_db):
+    first = client.get("/workflows/1/history")
+    assert first.status_code == 200
+    sql = str(read_db.scalar_statements[0].compile(compile_kwargs={"literal_binds": True}))
+    assert "greatest(workflows.updated_at" in sql and f"'{history.COMPACTION_STAMP_SOURCE}'" in sql
+
+    # A compaction moves the stamp past the row's updated_at
+    read_db.stamp = read_db.stamp + timedelta(days=1)
+    again = client.get("/workflows/1/history", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 200 and again.headers["etag"] != first.headers["etag"]
+
+    read_db.stamp = None
+    assert client.get("/workflows/2/history").status_code == 404
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main
+from api.main import app
+
+
+@pytest.fixture
+def upserts(monkeypatch):
+    batches = []
+
+    async def fake_upsert(items):
+        batches.append(items)
+        return len(items)
+
+    monkeypatch.setattr(api.main, "upsert_workflows", fake_upsert)
+    monkeypatch.setattr(api.main, "IMPORT_CHUNK_SIZE", 2)
+    return batches
+
+
+def _line(i):
+    return json.dumps({"platform": "YouTube", "source_id": str(i), "workflow": f"W{i}", "popularity_metrics": {"views": i}})
+
+
+def test_ndjson_import_streams_in_chunks_and_reports_bad_lines(upserts):
+    body = "\n".join([_line(1), _line(2), "{not json", "", _line(3), json.dumps({"platform": "YouTube"})]) + "\n"
+    resp = TestClient(app).post(
+        "/workflows/import", content=body.encode(), headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["inserted"] == 3 and data["failed"] == 2
+    assert [e["line"] for e in data["errors"]] == [3, 6]
+    assert [[i["source_id"] for i in b] for b in upserts] == [["1", "2"], ["3"]]
+
+
+def test_json_import_still_validates(upserts):
+    client = TestClient(app)
+    assert client.post("/workflows/import", json=[json.loads(_line(1))]).json()["inserted"] == 1
+    assert client.post("/workflows/import", json=[{"platform": "YouTube"}]).status_code == 422
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from ingest import leaderboards
+from ingest.leaderboards import ensure_leaderboards, view_sql
+
+ENTRY = {
+    "rank": 1, "workflow_id": 7, "platform": "YouTube", "country": "US", "workflow": "Sync CRM",
+    "source_url": None, "canonical_id": None, "score": 12.5,
+    "last_seen": datetime(2024, 1, 1, tzinfo=timezone.utc),
+}
+
+
+def test_view_sql_keeps_top_k_per_scope():
+    sql = view_sql(size=25)
+    assert "PARTITION BY scope_platform, scope_country" in sql
+    assert "WHERE rank <= 25" in sql
+
+
+class FakeConn:
+    """Answers the view lookup with ``state`` and records the DDL."""
+
+    def __init__(self, present, comment):
+        self.state = (present, comment)
+        self.sql = []
+
+    async def execute(self, stmt, params=None):
+        self.sql.append(" ".join(str(stmt).split()))
+        return self
+
+    def one(self):
+        return self.state
+
+
+@pytest.mark.parametrize("present, comment, dropped", [
+    (False, None, False),
+    (True, "size=25", False),
+    (True, "size=100", True),
+    # Built by an older schema.sql, size unknown
+    (True, None, True),
+])
+def test_ensure_leaderboards_rebuilds_on_size_change(monkeypatch, present, comment, dropped):
+    monkeypatch.setattr(leaderboards, "_ensured_size", None)
+    conn = FakeConn(present, comment)
+    asyncio.run(ensure_leaderboards(conn, size=25))
+
+    assert conn.sql[0].startswith("SELECT pg_advisory_xact_lock")
+    assert ("DROP MATERIALIZED VIEW workflow_leaderboards" in conn.sql) == dropped
+    assert any("WHERE rank <= 25" in sql for sql in conn.sql)
+    assert "COMMENT ON MATERIALIZED VIEW workflow_leaderboards IS 'size=25'" in conn.sql
+
+
+def test_leaderboard_defaults_to_global_scope(client, read_db):
+    read_db.rows = [ENTRY]
+    resp = client.get("/leaderboards", params={"platform": "YouTube", "limit": 5})
+
+    assert resp.status_code == 200
+    assert resp.json()[0]["workflow_id"] == 7
+    sql = str(read_db.statements[0].compile(compile_kwargs={"literal_binds": True}))
+    assert "scope_platform = 'YouTube'" in sql and "scope_country = '*'" in sql
+    assert "ORDER BY workflow_leaderboards.rank" in sql
@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from api.main import app
+from ingest.metrics import instrument_engine
+
+
+def _count(name, labels):
+    return REGISTRY.get_sample_value(f"{name}_count", labels) or 0
+
+
+def test_request_latency_is_labelled_by_route_template():
+    labels = {"method": "GET", "route": "/workflows/{id}", "status": "422"}
+    before = _count("http_request_duration_seconds", labels)
+    TestClient(app).get("/workflows/not-a-number")
+    assert _count("http_request_duration_seconds", labels) == before + 1
+
+
+def test_unmatched_routes_share_one_series():
+    labels = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = _count("http_request_duration_seconds", labels)
+    TestClient(app).get("/no/such/path")
+    assert _count("http_request_duration_seconds", labels) == before + 1
+
+
+def test_instrumented_engine_times_statements():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    before = _count("db_statement_duration_seconds", {"operation": "SELECT"})
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert _count("db_statement_duration_seconds", {"operation": "SELECT"}) == before + 1
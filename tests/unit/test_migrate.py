@@ -0,0 +1,53 @@
+from api.db.base import Base
+from api.db.migrate import schema_upgrades
+
+# workflows as the first release created it
+BASELINE_WORKFLOWS = (
+    "id platform source_id source_url workflow normalized_title country popularity_metrics "
+    "latest_metrics score first_seen last_seen inserted_at updated_at raw_snapshots"
+).split()
+
+
+def _current_columns():
+    return {(table.name, column.name): column.nullable for table in Base.metadata.sorted_tables for column in table.columns}
+
+
+def _current_indexes():
+    return {
+        index.name: "(score DESC, id DESC)" if index.name == "idx_score" else "..."
+        for table in Base.metadata.sorted_tables for index in table.indexes
+    }
+
+
+def test_up_to_date_database_needs_nothing():
+    assert schema_upgrades(_current_columns(), _current_indexes()) == []
+
+
+def test_baseline_workflows_table_is_upgraded():
+    columns = {key: nullable for key, nullable in _current_columns().items() if key[0] != "workflows"}
+    columns.update({("workflows", name): name != "id" for name in BASELINE_WORKFLOWS})
+    indexes = {
+        name: definition for name, definition in _current_indexes().items()
+        if not name.startswith(("idx_", "ix_workflows")) or name.startswith("idx_canonical_t")
+    }
+    indexes.update({"idx_score": "(score DESC)", "idx_platform_country": "...", "idx_normalized_title_gin": "..."})
+
+    statements = schema_upgrades(columns, indexes)
+    added = [s.split()[8] for s in statements if s.startswith("ALTER TABLE workflows ADD COLUMN")]
+    assert added == [
+        "canonical_id", "previous_metrics", "metrics_observed_at", "views_per_hour",
+        "likes_per_hour", "comments_per_hour", "trending_score", "search_vector",
+    ]
+    assert (
+        "ALTER TABLE workflows ADD COLUMN IF NOT EXISTS canonical_id INTEGER "
+        "REFERENCES canonical_workflows (id) ON DELETE SET NULL"
+    ) in statements
+    assert "UPDATE workflows SET score = DEFAULT WHERE score IS NULL" in statements
+    assert "ALTER TABLE workflows ALTER COLUMN score SET NOT NULL" in statements
+
+    # The old single column idx_score is rebuilt, the old tsvector index dropped
+    rebuilt = statements.index("DROP INDEX idx_score")
+    assert statements[rebuilt + 1] == "CREATE INDEX IF NOT EXISTS idx_score ON workflows (score DESC, id DESC)"
+    assert "CREATE INDEX IF NOT EXISTS idx_search_vector ON workflows USING gin (search_vector)" in statements
+    assert not any("idx_platform_country ON" in s for s in statements)
+    assert statements[-1] == "DROP INDEX idx_normalized_title_gin"
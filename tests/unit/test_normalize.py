@@ -1,4 +1,4 @@
-from ingest.normalize import normalize_title, compute_ratios
+from ingest.normalize import normalize_title, compute_ratios, normalize_titles, compute_ratios_batch, ratios_to_dict
 
 def test_normalize_title():
     assert normalize_title("  Test  Title 12:34 ") == "test title"
@@ -14,3 +14,15 @@ def test_compute_ratios():
     # Zero division check
     metrics_zero = compute_ratios(0, 0, 0)
     assert metrics_zero["like_to_view_ratio"] == 0
+
+def test_normalize_titles_matches_normalize_title():
+    titles = ["  Test  Title 12:34 ", "n8n workflow", "", None, "A\tB\n 1:05 C", "n8n workflow"]
+    expected = [normalize_title(t) for t in titles]
+    assert normalize_titles(titles) == expected
+    assert normalize_titles(titles, cache=False) == expected
+
+def test_compute_ratios_batch_matches_compute_ratios():
+    rows = [(100, 10, 5), ("2500", "40", None), (0, 0, 0), (None, 3, -1), (7, 7, 7)]
+    batch = compute_ratios_batch(rows)
+    assert [ratios_to_dict(r) for r in batch] == [compute_ratios(*row) for row in rows]
+    assert batch[0] == (100, 10, 5, 0.1, 0.05)
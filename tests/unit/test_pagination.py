@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from api.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("score", Decimal("12.5"), 42)
+    assert decode_cursor(cursor, "score") == (Decimal("12.5"), 42)
+
+    seen = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor("last_seen", seen, 7), "last_seen") == (seen, 7)
+
+
+def test_cursor_rejects_garbage_and_other_sort():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", "score")
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor("score", Decimal("1"), 1), "last_seen")
@@ -0,0 +1,129 @@
+import ingest.tasks as tasks
+from ingest.tasks import _lock_order, chunk_jobs, region_quota_budgets, summarize_results, task_process_pending
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def exists(self, key):
+        return key in self.data
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def _items(n):
+    return [{"platform": "YouTube", "source_id": str(i), "workflow": f"W{i}", "popularity_metrics": {}} for i in range(n)]
+
+
+def test_chunk_jobs_keys_each_chunk():
+    jobs = chunk_jobs(_items(5), "run1", "US", "2024-01-01T00:00:00+00:00", chunk_size=2)
+    assert [len(job.args[0]) for job in jobs] == [2, 2, 1]
+    assert [job.args[1] for job in jobs] == [f"ingest:done:run1:US:{i}" for i in range(3)]
+    assert {job.args[2] for job in jobs} == {"2024-01-01T00:00:00+00:00"}
+
+
+def test_process_pending_is_idempotent(monkeypatch):
+    calls = []
+
+    async def fake_upsert(items, observed_at=None):
+        calls.append((len(items), observed_at))
+        return len(items)
+
+    monkeypatch.setattr(tasks, "_redis", lambda r=FakeRedis(): r)
+    monkeypatch.setattr(tasks, "upsert_workflows", fake_upsert)
+
+    first = task_process_pending(_items(3), "k1", "2024-01-01T00:00:00+00:00")
+    second = task_process_pending(_items(3), "k1", "2024-01-01T00:00:00+00:00")
+    assert first["status"] == "ok" and first["count"] == 3
+    assert second["status"] == "skipped"
+    assert len(calls) == 1 and calls[0][1].year == 2024
+
+
+def test_summarize_results_isolates_failed_regions():
+    results = [
+        [{"status": "ok", "count": 2}, {"status": "ok", "count": 1}, {"status": "skipped"}],
+        {"status": "error", "region": "GB", "error": "quota"},
+        [],
+        [{"status": "error", "key": "k", "error": "db"}],
+    ]
+    summary = summarize_results(results)
+    assert summary["count"] == 3 and summary["chunks"] == 2 and summary["skipped"] == 1
+    assert [r["region"] for r in summary["failed_regions"]] == ["GB"]
+    assert len(summary["failed_chunks"]) == 1
+
+
+def test_quota_budget_is_split_across_regions():
+    budgets = region_quota_budgets(["US", "GB", "IN"], total=2000)
+    assert sum(budgets.values()) == 2000
+    assert budgets == {"US": 667, "GB": 667, "IN": 666}
+    assert region_quota_budgets([], total=2000) == {}
+
+
+def test_schedule_passes_each_region_its_share(monkeypatch):
+    scheduled = []
+
+    def fake_chord(header):
+        scheduled.extend(header)
+        return lambda callback: None
+
+    monkeypatch.setattr(tasks, "chord", fake_chord)
+    monkeypatch.setattr(tasks, "YOUTUBE_QUOTA_BUDGET", 1000)
+    tasks.task_schedule_youtube(["US", "GB", "US"])
+    assert [(sig.args[0], sig.args[3]) for sig in scheduled] == [("US", 500), ("GB", 500)]
+
+
+def test_chunks_are_upserted_in_key_order():
+    items = [
+        {"platform": "YouTube", "source_id": "b"},
+        {"platform": "Discourse", "source_id": "9"},
+        {"platform": "YouTube", "source_id": None},
+        {"platform": "YouTube", "source_id": "a"},
+    ]
+    assert [(i["platform"], i["source_id"]) for i in _lock_order(items)] == [
+        ("Discourse", "9"), ("YouTube", "a"), ("YouTube", "b"), ("YouTube", None),
+    ]
+
+
+class Replaced(Exception):
+    def __init__(self, sig):
+        self.sig = sig
+
+
+def _run_signature(sig):
+    """Run a task signature in-process, following task.replace(group)."""
+    try:
+        return sig.type(*sig.args)
+    except Replaced as replaced:
+        return [_run_signature(task) for task in replaced.sig.tasks]
+
+
+def test_youtube_run_with_an_empty_region(monkeypatch):
+    async def fake_fetch(region, quota_budget=None):
+        return [] if region == "GB" else _items(3)
+
+    async def fake_upsert(items, observed_at=None):
+        return len(items)
+
+    refreshed = []
+
+    async def fake_refresh():
+        refreshed.append(True)
+
+    header = []
+    monkeypatch.setattr(tasks, "chord", lambda sigs: header.extend(sigs) or (lambda callback: None))
+    monkeypatch.setattr(tasks, "fetch_youtube_items", fake_fetch)
+    monkeypatch.setattr(tasks, "upsert_workflows", fake_upsert)
+    monkeypatch.setattr(tasks, "refresh_leaderboards", fake_refresh)
+    monkeypatch.setattr(tasks, "_redis", lambda r=FakeRedis(): r)
+    monkeypatch.setattr(tasks, "PROCESS_CHUNK_SIZE", 2)
+    monkeypatch.setattr(tasks.task_fetch_youtube_region, "replace", Replaced)
+
+    tasks.task_schedule_youtube(["US", "GB"])
+    results = [_run_signature(sig) for sig in header]
+    assert results[1] == {"status": "empty", "region": "GB", "count": 0}
+
+    summary = tasks.task_finish_run(results, "run1")
+    assert summary["status"] == "ok" and summary["count"] == 3 and summary["chunks"] == 2
+    assert summary["empty_regions"] == ["GB"] and refreshed == [True]
@@ -0,0 +1,47 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from api.models.schemas import WorkflowRead
+from api.projection import LIST_FIELDS, InvalidFields, dump_rows, list_columns, parse_fields
+
+VALUES = {
+    "id": 1, "platform": "YouTube", "source_id": "x", "source_url": None, "workflow": "W",
+    "normalized_title": "w", "country": "US", "popularity_metrics": {"views": 1}, "canonical_id": None,
+    "score": Decimal("3.5"), "first_seen": datetime(2024, 1, 1, tzinfo=timezone.utc),
+    "last_seen": datetime(2024, 1, 2, tzinfo=timezone.utc), "inserted_at": None, "updated_at": None,
+}
+
+
+def _row(values):
+    return SimpleNamespace(_mapping=values)
+
+
+def test_parse_fields_keeps_response_order_and_rejects_unknown():
+    assert parse_fields(None) == LIST_FIELDS
+    assert parse_fields("score, id,workflow") == ["workflow", "id", "score"]
+    with pytest.raises(InvalidFields):
+        parse_fields("id,raw_snapshots")
+
+
+def test_list_columns_adds_cursor_columns_once():
+    names = [c.name for c in list_columns(["workflow", "id"], required=("id", "score"))]
+    assert names == ["workflow", "id", "score"]
+
+
+def test_dump_rows_matches_pydantic_body():
+    expected = WorkflowRead.model_validate(VALUES).model_dump_json()
+    assert json.loads(dump_rows([_row(VALUES)], LIST_FIELDS)) == [json.loads(expected)]
+
+
+def test_dump_rows_sparse():
+    assert json.loads(dump_rows([_row(VALUES)], ["id", "score"])) == [{"id": 1, "score": 3.5}]
+
+
+def test_collected_at_is_accepted_and_null():
+    assert parse_fields("id,collected_at") == ["collected_at", "id"]
+    assert [c.name for c in list_columns(["id", "collected_at"])] == ["id"]
+    assert json.loads(dump_rows([_row(VALUES)], ["id", "collected_at"])) == [{"id": 1, "collected_at": None}]
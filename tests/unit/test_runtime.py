@@ -0,0 +1,15 @@
+import asyncio
+
+from ingest import runtime
+
+
+def test_run_async_reuses_one_loop_per_process():
+    async def current():
+        return asyncio.get_running_loop()
+
+    first = runtime.run_async(current())
+    assert runtime.run_async(current()) is first
+
+    runtime.shutdown_loop()
+    assert first.is_closed()
+    assert runtime.run_async(current()) is not first
@@ -0,0 +1,22 @@
+import numpy as np
+
+from ingest.normalize import compute_ratios
+from ingest.scoring import score_batch, score_metrics
+
+
+def test_score_metrics_follows_formula():
+    assert score_metrics("YouTube", compute_ratios(1000, 10, 2)) == 100 + 20 + 10
+    assert score_metrics("GoogleTrends", {"views": 5000, "trend_score": 50.0}) == 500
+    assert score_metrics("Discourse", {}) == 0
+
+
+def test_score_batch_matches_scalar():
+    platforms = ["YouTube", "Discourse", "GoogleTrends", "YouTube"]
+    metrics = [
+        compute_ratios(15000, 500, 50),
+        compute_ratios(120, 3, None),
+        {"views": 4200, "likes": 0, "comments": 0, "trend_score": 42.0},
+        {},
+    ]
+    expected = [score_metrics(p, m) for p, m in zip(platforms, metrics)]
+    np.testing.assert_allclose(score_batch(platforms, metrics), expected)
@@ -0,0 +1,149 @@
+import asyncio
+
+from sqlalchemy.dialects import postgresql
+
+import api.main
+from api.pagination import decode_cursor, encode_cursor
+from ingest import search
+from ingest.search import BulkIndexer, search_workflows
+
+
+class FakeClient:
+    def __init__(self, statuses):
+        # One list of per-document statuses per bulk call
+        self.statuses = list(statuses)
+        self.calls = []
+
+    async def bulk(self, body):
+        ids = [line["index"]["_id"] for line in body[::2]]
+        self.calls.append(ids)
+        statuses = self.statuses.pop(0)
+        return {"items": [{"index": {"_id": i, "status": s}} for i, s in zip(ids, statuses)]}
+
+
+def _item(source_id):
+    return {"platform": "YouTube", "source_id": source_id, "workflow": source_id, "popularity_metrics": {}}
+
+
+def _run(client, items, **kwargs):
+    async def main():
+        indexer = BulkIndexer(client=client, flush_interval=0, retry_backoff=0, **kwargs)
+        for item in items:
+            await indexer.add(item)
+        await indexer.close()
+        return indexer
+    return asyncio.run(main())
+
+
+def test_flushes_on_size_threshold():
+    client = FakeClient([[201, 201], [201]])
+    indexer = _run(client, [_item("a"), _item("b"), _item("c")], max_docs=2)
+    assert client.calls == [["YouTube-a", "YouTube-b"], ["YouTube-c"]]
+    assert indexer.indexed == 3
+
+
+def test_retries_then_dead_letters():
+    client = FakeClient([[201, 429, 400], [429], [429]])
+    indexer = _run(client, [_item("a"), _item("b"), _item("c")], max_retries=2)
+    assert client.calls[1:] == [["YouTube-b"], ["YouTube-b"]]
+    assert indexer.indexed == 1
+    assert sorted(d["id"] for d in indexer.dead_letters) == ["YouTube-b", "YouTube-c"]
+
+
+def test_documents_missing_from_the_response_are_retried():
+    # One item back for three documents, then no items at all, then all three
+    client = FakeClient([[201], [], [201, 201, 201]])
+    indexer = _run(client, [_item("a"), _item("b"), _item("c")], max_retries=2)
+    assert client.calls == [["YouTube-a", "YouTube-b", "YouTube-c"], ["YouTube-b", "YouTube-c"], ["YouTube-b", "YouTube-c"]]
+    assert indexer.indexed == 3 and indexer.dead_letters == []
+
+
+def test_documents_never_answered_are_dead_lettered():
+    client = FakeClient([[], []])
+    indexer = _run(client, [_item("a")], max_retries=1)
+    assert indexer.indexed == 0
+    assert indexer.dead_letters[0]["error"] == "missing from the bulk response"
+
+
+def test_create_index_maps_workflow_id_on_existing_index(monkeypatch):
+    calls = []
+
+    class Indices:
+        def exists(self, index):
+            return True
+
+        def put_mapping(self, index, body):
+            calls.append(body)
+
+    monkeypatch.setattr(search, "client", type("Client", (), {"indices": Indices()})())
+    search.create_index()
+    assert calls == [{"properties": {"workflow_id": {"type": "long"}}}]
+
+
+class FakeSearchClient:
+    def __init__(self, hits):
+        self.hits = hits
+        self.bodies = []
+
+    async def search(self, index, body):
+        self.bodies.append(body)
+        return {"hits": {"hits": self.hits}}
+
+
+def test_search_workflows_sorts_by_relevance_then_id():
+    client = FakeSearchClient([
+        {"_source": {"workflow_id": 7}, "_score": 3.5},
+        {"_source": {"workflow_id": 4}, "_score": 1.25},
+    ])
+    hits = asyncio.run(search_workflows("slack", platform="YouTube", limit=2, search_after=[4.0, 9], client=client))
+
+    assert hits == [(7, 3.5), (4, 1.25)]
+    body = client.bodies[0]
+    assert body["sort"] == [{"_score": "desc"}, {"workflow_id": "desc"}]
+    # search_after lines up with the sort: relevance first, then workflow_id
+    assert body["search_after"] == [4.0, 9]
+    assert {"term": {"platform": "YouTube"}} in body["query"]["function_score"]["query"]["bool"]["filter"]
+    assert body["size"] == 2
+
+
+def test_postgres_search_pages_by_rank_and_id(client, read_db, workflow_row):
+    read_db.rows = [(workflow_row(5), 0.75), (workflow_row(3), 0.5)]
+    first = client.get("/workflows/search", params={"q": "slack", "limit": 2})
+
+    assert first.status_code == 200
+    assert [(r["id"], r["rank"]) for r in first.json()] == [(5, 0.75), (3, 0.5)]
+    cursor = first.headers["X-Next-Cursor"]
+    assert decode_cursor(cursor, "postgres") == (0.5, 3)
+
+    second = client.get("/workflows/search", params={"q": "slack", "limit": 2, "cursor": cursor})
+    assert second.status_code == 200
+    compiled = read_db.statements[-1].compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "websearch_to_tsquery" in sql and "slack" in compiled.params.values()
+    assert ", workflows.id) < (" in sql and {0.5, 3} <= set(compiled.params.values())
+    assert "ORDER BY rank DESC, workflows.id DESC" in sql
+
+    # A cursor from the other backend is rejected
+    assert client.get("/workflows/search", params={"q": "slack", "cursor": encode_cursor("opensearch", 1.0, 1)}).status_code == 400
+
+
+def test_opensearch_search_keeps_hit_order(client, read_db, workflow_row, monkeypatch):
+    calls = []
+
+    async def fake_search(q, platform, country, limit, search_after=None):
+        calls.append(search_after)
+        return [(9, 2.0), (4, 1.5), (6, 1.0)]
+
+    monkeypatch.setattr(api.main, "USE_OPENSEARCH", True)
+    monkeypatch.setattr(api.main, "search_workflows", fake_search)
+    # Row 6 was deleted since it was indexed
+    read_db.rows = [workflow_row(4), workflow_row(9)]
+
+    cursor = encode_cursor("opensearch", 3.0, 12)
+    resp = client.get("/workflows/search", params={"q": "slack", "limit": 3, "cursor": cursor})
+
+    assert resp.status_code == 200
+    assert [(r["id"], r["rank"]) for r in resp.json()] == [(9, 2.0), (4, 1.5)]
+    assert calls == [[3.0, 12]]
+    # Short page, no next cursor
+    assert "X-Next-Cursor" not in resp.headers
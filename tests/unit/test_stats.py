@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from api.db.models import Workflow
+from api.stats import GROUP_COUNTRY, GROUP_FULL, GROUP_PLATFORM, GROUP_TOTAL, stats_stmt
+
+DAY1 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DAY2 = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+
+def _row(grouping_id, platform=None, country=None, bucket=None, count=0, views=0, likes=0, ratio=None):
+    return SimpleNamespace(
+        grouping_id=grouping_id, platform=platform, country=country, bucket=bucket,
+        count=count, total_views=views, total_likes=likes, avg_like_to_view_ratio=ratio,
+    )
+
+
+ROWS = [
+    _row(GROUP_FULL, "YouTube", "US", DAY2, 2, 300, 30, 0.1),
+    _row(GROUP_FULL, "YouTube", "US", DAY1, 1, 100, 5, 0.05),
+    _row(GROUP_FULL, "Discourse", "Global", DAY1, 4, 80, 8, 0.1),
+    _row(GROUP_PLATFORM, "YouTube", count=3, views=400, likes=35, ratio=0.083),
+    _row(GROUP_PLATFORM, "Discourse", count=4, views=80, likes=8, ratio=0.1),
+    _row(GROUP_COUNTRY, country="US", count=3, views=400, likes=35, ratio=0.083),
+    _row(GROUP_COUNTRY, country="Global", count=4, views=80, likes=8, ratio=0.1),
+    _row(GROUP_TOTAL, count=7, views=480, likes=43, ratio=0.093),
+]
+
+
+def test_stats_splits_grouping_sets_into_facets(client, read_db):
+    read_db.rows = ROWS
+    resp = client.get("/workflows/stats", params={"bucket": "day"})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["totals"] == {"count": 7, "total_views": 480, "total_likes": 43, "avg_like_to_view_ratio": 0.093}
+    assert [f["platform"] for f in body["platforms"]] == ["Discourse", "YouTube"]
+    assert [f["country"] for f in body["countries"]] == ["Global", "US"]
+    # Groups come back as a time series
+    assert [(g["bucket"][:10], g["platform"]) for g in body["groups"]] == [
+        ("2024-01-01", "Discourse"), ("2024-01-01", "YouTube"), ("2024-01-02", "YouTube"),
+    ]
+    assert len(read_db.statements) == 1
+    assert "ETag" in resp.headers
+
+
+def test_stats_revalidates_without_querying(client, read_db):
+    read_db.rows = ROWS
+    first = client.get("/workflows/stats", params={"bucket": "week"})
+    resp = client.get("/workflows/stats", params={"bucket": "week"}, headers={"If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 304
+    assert len(read_db.statements) == 1
+
+
+def test_stats_rejects_unknown_bucket(client):
+    assert client.get("/workflows/stats", params={"bucket": "year"}).status_code == 422
+
+
+def test_stats_query_uses_indexed_expressions():
+    sql = str(stats_stmt("month", platform="YouTube", min_views=100).compile(dialect=postgresql.dialect()))
+    assert "GROUP BY GROUPING SETS" in sql
+    assert sql.count("date_trunc('month', workflows.last_seen)") == 3
+
+    indexes = {
+        str(CreateIndex(index).compile(dialect=postgresql.dialect())).split("ON workflows ")[1]
+        for index in Workflow.__table__.indexes if index.name.startswith("idx_latest_")
+    }
+    assert len(indexes) == 3
+    for expression in indexes:
+        # Index expression text, without the outer parentheses, appears verbatim in the query
+        assert expression[1:-1].replace("latest_metrics", "workflows.latest_metrics") in sql
@@ -0,0 +1,58 @@
+import pytest
+
+from ingest.fetchers.trends import SeriesCache, StubTrendReq, Throttle, TrendsBudgetExceeded, TrendsFetcher, keyword_groups
+
+POPULARITY = {"n8n": 50, "a": 100, "b": 25, "c": 10, "d": 5, "e": 200, "f": 1}
+
+
+def _fetcher(tmp_path, budget=10, stub=None, **kwargs):
+    sleeps = []
+    throttle = Throttle(min_interval=5, budget=budget, clock=lambda: 0.0, sleep=sleeps.append)
+    fetcher = TrendsFetcher(
+        pytrends=stub or StubTrendReq(POPULARITY), anchor="n8n", throttle=throttle,
+        cache=SeriesCache(str(tmp_path)), **kwargs,
+    )
+    return fetcher, sleeps
+
+
+def test_keyword_groups_share_the_anchor():
+    groups = keyword_groups(["a", "b", "n8n", "c", "d", "e", "a"], "n8n")
+    assert groups == [["n8n", "a", "b", "c", "d"], ["n8n", "e"]]
+    assert all(len(g) <= 5 for g in groups)
+
+
+def test_scores_are_comparable_across_groups(tmp_path):
+    fetcher, _ = _fetcher(tmp_path)
+    scores = fetcher.fetch_scores(["a", "b", "c", "d", "e"])
+    # Relative to the anchor's level, whichever payload a keyword was in
+    assert scores["e"] / scores["n8n"] == pytest.approx(200 / 50, rel=0.02)
+    assert scores["a"] / scores["n8n"] == pytest.approx(100 / 50, rel=0.02)
+
+
+def test_geos_become_countries(tmp_path):
+    fetcher, _ = _fetcher(tmp_path, geos=["", "US"])
+    items = fetcher.fetch_trends(["a", "b"])
+    assert {(i["source_id"], i["country"]) for i in items} == {
+        ("kw-a", "Global"), ("kw-b", "Global"), ("kw-a-US", "US"), ("kw-b-US", "US"),
+    }
+    assert [p["geo"] for p in fetcher.pytrends.payloads] == ["", "US"]
+
+
+def test_cached_series_are_not_refetched(tmp_path):
+    stub = StubTrendReq(POPULARITY)
+    first, sleeps = _fetcher(tmp_path, stub=stub)
+    first.fetch_trends(["a", "e"], geos=[""])
+    second, _ = _fetcher(tmp_path, stub=stub)
+    second.fetch_trends(["a", "e"], geos=[""])
+    assert len(stub.payloads) == 1
+    assert sleeps == []
+
+
+def test_budget_returns_partial_results(tmp_path):
+    fetcher, sleeps = _fetcher(tmp_path, budget=2, geos=["", "US"])
+    items = fetcher.fetch_trends(["a", "b", "c", "d", "e", "f"])
+    assert fetcher.budget_exhausted
+    assert {i["country"] for i in items} == {"Global"}
+    assert sleeps == [5.0]
+    with pytest.raises(TrendsBudgetExceeded):
+        fetcher.throttle.wait()
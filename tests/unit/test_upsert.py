@@ -0,0 +1,35 @@
+from sqlalchemy.dialects import postgresql
+
+from ingest.tasks import _chunked, _dedupe, _workflow_row, build_upsert_stmt
+
+
+def _item(source_id, views=0):
+    return {
+        "platform": "YouTube",
+        "source_id": source_id,
+        "source_url": None,
+        "workflow": f"Workflow {source_id}",
+        "normalized_title": f"workflow {source_id}",
+        "country": "US",
+        "popularity_metrics": {"views": views},
+    }
+
+
+def test_dedupe_keeps_last_occurrence():
+    items = [_item("a", 1), _item("b", 2), _item("a", 3), _item(None), _item(None)]
+    deduped = _dedupe(items)
+    assert [i["source_id"] for i in deduped] == ["b", "a", None, None]
+    assert deduped[1]["popularity_metrics"]["views"] == 3
+
+
+def test_chunked():
+    assert [len(c) for c in _chunked(list(range(7)), 3)] == [3, 3, 1]
+
+
+def test_build_upsert_stmt_is_single_multirow_insert():
+    rows = [_workflow_row(_item(str(i))) for i in range(3)]
+    sql = str(build_upsert_stmt(rows).compile(dialect=postgresql.dialect()))
+    assert sql.count("INSERT INTO workflows") == 1
+    assert "ON CONFLICT (platform, source_id) DO UPDATE" in sql
+    assert "%(source_id_m2)s" in sql
+
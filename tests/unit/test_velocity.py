@@ -0,0 +1,42 @@
+import math
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from ingest.tasks import _workflow_row, build_upsert_stmt
+from ingest.velocity import TRENDING_HALF_LIFE_HOURS, VELOCITY_MIN_HOURS, decay_factor, trending_update
+
+
+def test_decay_halves_after_half_life():
+    assert decay_factor(TRENDING_HALF_LIFE_HOURS) == pytest.approx(0.5)
+    assert decay_factor(0) == 1
+
+
+def test_trending_update_moves_toward_current_rate():
+    after_half_life = trending_update(0.0, 100.0, TRENDING_HALF_LIFE_HOURS)
+    assert after_half_life == pytest.approx(50.0)
+    # A shrinking score does not count as negative growth
+    assert trending_update(10.0, -5.0, TRENDING_HALF_LIFE_HOURS) == pytest.approx(5.0)
+    # Back to back observations are spread over at least VELOCITY_MIN_HOURS
+    assert trending_update(0.0, 100.0, 0) == pytest.approx(100 * (1 - decay_factor(VELOCITY_MIN_HOURS)))
+    assert not math.isnan(trending_update(0.0, 0.0, 0))
+
+
+def test_upsert_computes_velocity_in_the_same_statement():
+    row = _workflow_row({"platform": "YouTube", "source_id": "a", "workflow": "W", "popularity_metrics": {"views": 1}})
+    assert row["metrics_observed_at"] is not None
+    sql = str(build_upsert_stmt([row]).compile(dialect=postgresql.dialect()))
+    for column in ("views_per_hour", "likes_per_hour", "comments_per_hour", "trending_score", "previous_metrics"):
+        assert f"{column} = CASE WHEN" in sql
+    assert "excluded.metrics_observed_at > workflows.metrics_observed_at" in sql
+
+
+def test_late_observations_do_not_overwrite_metrics():
+    row = _workflow_row({"platform": "YouTube", "source_id": "a", "workflow": "W", "popularity_metrics": {"views": 1}})
+    sql = str(build_upsert_stmt([row]).compile(dialect=postgresql.dialect()))
+    guard = (
+        "CASE WHEN (workflows.metrics_observed_at IS NULL "
+        "OR excluded.metrics_observed_at >= workflows.metrics_observed_at)"
+    )
+    for column in ("latest_metrics", "popularity_metrics", "score"):
+        assert f"{column} = {guard} THEN excluded.{column} ELSE workflows.{column} END" in sql